@@ -0,0 +1,240 @@
+"""Micro-benchmark of decoding and parsing a multi-product response.
+
+Compares the stdlib decoder with the separate check/parse loops against
+orjson with the compiled single-pass extractor, per product and per batch.
+
+Usage:
+    python -m benchmarks.extractor [--products 100] [--sizes 20] [--repeat 200]
+"""
+import argparse
+import json
+import timeit
+from typing import Any
+
+import orjson
+
+from src.constants import RESPONSE_KEY_MAPPING
+from src.exceptions import JSONKeyNotFound
+from src.extractor import product_extractor
+
+
+def make_payload(products: int, sizes: int) -> bytes:
+    """Builds a response body of the website with the given number of products."""
+    return json.dumps(
+        {
+            'data': {
+                'products': [
+                    {
+                        'id': nm_id,
+                        'root': nm_id,
+                        'subjectId': 626,
+                        'name': f'Футболка мужская {nm_id}',
+                        'brand': 'OKO-group',
+                        'brandId': 93472,
+                        'siteBrandId': 103472,
+                        'supplierId': 409934,
+                        'sale': 42,
+                        'priceU': 231100,
+                        'salePriceU': 134000,
+                        'pics': 12,
+                        'rating': 5,
+                        'feedbacks': 2240,
+                        'colors': [{'name': 'синий', 'id': 255}],
+                        'sizes': [
+                            {
+                                'name': str(size),
+                                'origName': str(size),
+                                'rank': size,
+                                'optionId': nm_id * 100 + size,
+                                'stocks': [
+                                    {'wh': 507, 'qty': 10},
+                                    {'wh': 117986, 'qty': 3},
+                                ],
+                            }
+                            for size in range(sizes)
+                        ],
+                    }
+                    for nm_id in range(products)
+                ],
+            },
+        }
+    ).encode()
+
+
+# The separate check/parse loops replaced by `ProductExtractor`, kept as the
+# baseline of the benchmark.
+
+
+def check_fetched_product_data_keys(fetched_product_data: dict[str, Any]) -> None:
+    """
+    Checks if the required keys are present in the fetched product data dictionary.
+
+    Args:
+    - fetched_product_data: The dictionary containing the fetched product data.
+
+    Raises:
+    - JSONKeyNotFound: If any of the required keys from RESPONSE_KEY_MAPPING values,
+    'colors' and 'sizes', are not found.
+    """
+    for response_key in RESPONSE_KEY_MAPPING.values():
+        if fetched_product_data.get(response_key, None) is None:
+            raise JSONKeyNotFound()
+
+    if fetched_product_data.get('colors', None) is None:
+        raise JSONKeyNotFound()
+
+    if fetched_product_data.get('sizes', None) is None:
+        raise JSONKeyNotFound()
+
+
+def parse_fetched_product_data(fetched_product_data: dict[str, Any]) -> dict[str, Any]:
+    """
+    Parses the fetched data from a product and extracts relevant information.
+
+    Args:
+    - fetched_product_data (dict): The dictionary containing the fetched product data.
+
+    Returns:
+    - A dictionary with the following keys and values:
+        - nm_id (int): The product ID.
+        - name (str): The name of the product.
+        - brand (str): The brand name of the product.
+        - brand_id (int): The brand ID of the product.
+        - site_brand_id (int): The site brand ID of the product.
+        - supplier_id (int): The supplier ID of the product.
+        - sale (float): The discount percentage for the product.
+        - price (int): The original price of the product.
+        - sale_price (int): The sale price of the product.
+        - rating (float): The rating of the product.
+        - feedbacks (int): The number of feedbacks for the product.
+    """
+    parsed_product_data = {}
+    for new_key, response_key in RESPONSE_KEY_MAPPING.items():
+        field_value = fetched_product_data.get(response_key)
+        parsed_product_data[new_key] = field_value
+
+    return parsed_product_data
+
+
+def parse_fetched_product_colors(
+    fetched_product_colors: list[dict[str, Any]]
+) -> list[str]:
+    """
+    Parses the colors data from the fetched product data dictionary.
+
+    Args:
+    - fetched_product_data (dict): The dictionary containing the fetched product data.
+
+    Raises:
+    - JSONKeyNotFound: If the 'name' key is not found in the 'colors' data.
+
+    Returns:
+    - A list of color names extracted from the fetched product data.
+    """
+    parsed_product_colors = []
+    for color in fetched_product_colors:
+        color_name = color.get('name', None)
+
+        if color_name is None:
+            raise JSONKeyNotFound()
+
+        parsed_product_colors.append(color_name)
+    return parsed_product_colors
+
+
+def parse_fetched_product_quantity(fetched_product_sizes: list[dict[str, Any]]) -> int:
+    """
+    Parses the total quantity of a product from the fetched product data dictionary.
+
+    Args:
+    - fetched_product_data (dict): The dictionary containing the fetched product data.
+
+    Raises:
+    - JSONKeyNotFound: If the 'stocks' key or 'qty' key is not found in the
+    'sizes' data.
+
+    Returns:
+    - The total quantity of the product extracted from the fetched product data.
+    """
+    total_quantity = 0
+    for size in fetched_product_sizes:
+        if size.get('stocks', None) is None:
+            raise JSONKeyNotFound()
+
+        for quantity in size['stocks']:
+            if quantity.get('qty', None) is None:
+                raise JSONKeyNotFound()
+
+            total_quantity += quantity['qty']
+
+    return total_quantity
+
+
+def parse_with_loops(body: bytes) -> list:
+    """Decodes and parses a response with the separate check/parse loops."""
+    results = []
+    for product in json.loads(body)['data']['products']:
+        check_fetched_product_data_keys(product)
+        parsed_product_data = parse_fetched_product_data(product)
+        colors = parse_fetched_product_colors(product['colors'])
+        parsed_product_data['quantity'] = parse_fetched_product_quantity(
+            product['sizes']
+        )
+        results.append((colors, parsed_product_data))
+    return results
+
+
+def parse_with_extractor(body: bytes) -> list:
+    """Decodes and parses a response with orjson and the compiled extractor."""
+    return [
+        product_extractor.extract(product)
+        for product in orjson.loads(body)['data']['products']
+    ]
+
+
+def parse_batch_with_extractor(body: bytes) -> list:
+    """Decodes and parses a response with orjson and the batch extractor."""
+    products = orjson.loads(body)['data']['products']
+    parsed_products, _ = product_extractor.extract_many(
+        {product['id']: product for product in products}
+    )
+    return list(parsed_products.values())
+
+
+def without_stocks(results: list) -> list:
+    """Drops the stocks breakdown the loops do not parse from the results."""
+    return [
+        (colors, {key: value for key, value in data.items() if key != 'stocks'})
+        for colors, data in results
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--sizes', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    body = make_payload(args.products, args.sizes)
+    assert (
+        parse_with_loops(body)
+        == without_stocks(parse_with_extractor(body))
+        == without_stocks(parse_batch_with_extractor(body))
+    )
+
+    print(f'payload: {args.products} products, {len(body) / 1024:.1f} KiB')
+    baseline = None
+    for name, func in (
+        ('stdlib json + loops', parse_with_loops),
+        ('orjson + extractor', parse_with_extractor),
+        ('orjson + extract_many', parse_batch_with_extractor),
+    ):
+        seconds = min(timeit.repeat(lambda: func(body), number=args.repeat, repeat=5))
+        per_call = seconds / args.repeat * 1e6
+        baseline = baseline or per_call
+        print(f'{name:>22}: {per_call:9.1f} us/payload  x{baseline / per_call:.2f}')
+
+
+if __name__ == '__main__':
+    main()
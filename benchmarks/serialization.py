@@ -0,0 +1,139 @@
+"""Benchmark of serializing product pages with and without raw responses.
+
+Compares the default path, where FastAPI validates rows against the response
+model and encodes them with `jsonable_encoder` and the stdlib encoder, with
+`RawJSONResponse` encoding the rows with orjson. With `--requests` it also
+measures requests per second of a single worker serving `/products/all` from
+the configured database in-process.
+
+Usage:
+    python -m benchmarks.serialization [--items 50] [--repeat 500]
+        [--requests 0] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import time
+import timeit
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from httpx import AsyncClient
+
+from benchmarks.stub_server import generate_product
+
+from src.config import settings
+from src.main import app
+from src.responses import RawJSONResponse
+from src.schemas import CountStrategy, ProductPage
+
+PAGE_FIELD = create_response_field(name='page', type_=ProductPage)
+
+
+def make_page(items: int) -> dict:
+    """Builds a page of product rows shaped as read from the database."""
+    rows = []
+    for nm_id in range(1, items + 1):
+        product = generate_product(nm_id)
+        rows.append(
+            {
+                'nm_id': nm_id,
+                'name': product['name'],
+                'brand': product['brand'],
+                'brand_id': product['brandId'],
+                'site_brand_id': product['siteBrandId'],
+                'supplier_id': product['supplierId'],
+                'sale': product['sale'],
+                'price': product['priceU'],
+                'sale_price': product['salePriceU'],
+                'rating': product['rating'],
+                'feedbacks': product['feedbacks'],
+                'quantity': 10,
+                'colors': [
+                    {'color_id': color['id'], 'name': color['name']}
+                    for color in product['colors']
+                ],
+            }
+        )
+    return {
+        'items': rows,
+        'total': 1000,
+        'page': 1,
+        'size': items,
+        'pages': 1000 // items,
+        'total_strategy': CountStrategy.EXACT,
+    }
+
+
+async def render_validated(page: dict) -> bytes:
+    """Renders a page the way FastAPI does for a response model."""
+    content = await serialize_response(field=PAGE_FIELD, response_content=page)
+    return JSONResponse(content).body
+
+
+async def render_raw(page: dict) -> bytes:
+    """Renders a page with `RawJSONResponse`."""
+    return RawJSONResponse(page).body
+
+
+async def measure_requests(requests: int, concurrency: int, size: int) -> float:
+    """Returns requests per second of serving `/products/all` in-process."""
+    async with AsyncClient(app=app, base_url='http://benchmark') as client:
+
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                response = await client.get(f'/products/all?size={size}')
+                response.raise_for_status()
+
+        started_at = time.perf_counter()
+        await asyncio.gather(
+            *(worker(requests // concurrency) for _ in range(concurrency))
+        )
+        return (
+            requests // concurrency * concurrency / (time.perf_counter() - started_at)
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=0)
+    parser.add_argument('--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    page = make_page(args.items)
+    loop = asyncio.new_event_loop()
+    assert loop.run_until_complete(render_validated(page)) == loop.run_until_complete(
+        render_raw(page)
+    )
+
+    print(f'page: {args.items} products')
+    baseline = None
+    for name, render in (
+        ('validated + stdlib json', render_validated),
+        ('raw rows + orjson', render_raw),
+    ):
+        seconds = min(
+            timeit.repeat(
+                lambda: loop.run_until_complete(render(page)),
+                number=args.repeat,
+                repeat=5,
+            )
+        )
+        per_page = seconds / args.repeat * 1e6
+        baseline = baseline or per_page
+        print(f'{name:>24}: {per_page:9.1f} us/page  x{baseline / per_page:.2f}')
+
+    if args.requests:
+        for raw_responses in (False, True):
+            settings.PRODUCT_RAW_RESPONSES = raw_responses
+            rps = loop.run_until_complete(
+                measure_requests(args.requests, args.concurrency, args.items)
+            )
+            print(f'raw responses {raw_responses!s:>5}: {rps:8.0f} requests/s')
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
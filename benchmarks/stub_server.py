@@ -0,0 +1,298 @@
+"""Local stand-in of the `cards/detail` endpoint of the website.
+
+Serves generated or recorded products for single and multi-id `nm=` lists with
+configurable latency, error rate and throttling, so the fetch, bulk and
+refresh paths can be exercised over real HTTP without network access.
+
+Usage:
+    python -m benchmarks.stub_server [--port 8001] [--profile realistic]
+        [--replay-dir DIR] [--record-from https://card.wb.ru] [--seed 0]
+
+Point the service at it with `UPSTREAM_BASE_URL=http://127.0.0.1:8001`.
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Query, Request, status
+from fastapi.responses import JSONResponse
+
+COLORS = ('белый', 'черный', 'серый', 'синий', 'красный', 'зеленый', 'бежевый')
+WAREHOUSES = (507, 117986, 120762, 686)
+
+
+@dataclass(frozen=True)
+class StubProfile:
+    """Behavior of the stub server.
+
+    Attributes:
+    - latency (float): The delay of every response in seconds.
+    - jitter (float): The maximum random delay added to the latency.
+    - error_rate (float): The share of requests answered with `error_status`.
+    - error_status (int): The status code of failed requests.
+    - rate_limit (float): Requests per second served before answering 429,
+      zero disables throttling.
+    - missing_every (int): Every n-th product id is reported as missing,
+      zero disables missing products.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = status.HTTP_503_SERVICE_UNAVAILABLE
+    rate_limit: float = 0.0
+    missing_every: int = 0
+
+
+PROFILES = {
+    'fast': StubProfile(),
+    'realistic': StubProfile(
+        latency=0.08, jitter=0.04, error_rate=0.01, rate_limit=50, missing_every=50
+    ),
+    'flaky': StubProfile(latency=0.05, jitter=0.1, error_rate=0.2),
+    'throttled': StubProfile(latency=0.02, rate_limit=5),
+}
+
+
+class Throttle:
+    """Rejects requests above `rate` per second with bursts of up to `rate`."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self._tokens = rate
+        self._updated_at = time.monotonic()
+
+    def allow(self) -> bool:
+        """Takes a token if one is available and returns whether it was taken."""
+        if self.rate <= 0:
+            return True
+
+        now = time.monotonic()
+        self._tokens = min(
+            self.rate, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+def generate_product(nm_id: int) -> dict[str, Any]:
+    """Builds a product of the website deterministically from its id."""
+    return {
+        'id': nm_id,
+        'root': nm_id // 10,
+        'subjectId': 626,
+        'name': f'Товар {nm_id}',
+        'brand': f'Бренд {nm_id % 97}',
+        'brandId': nm_id % 97,
+        'siteBrandId': 10000 + nm_id % 97,
+        'supplierId': nm_id % 1013,
+        'sale': nm_id % 70,
+        'priceU': 100000 + nm_id % 9000 * 100,
+        'salePriceU': 50000 + nm_id % 4500 * 100,
+        'pics': 5,
+        'rating': nm_id % 6,
+        'feedbacks': nm_id % 5000,
+        'colors': [
+            {'name': COLORS[(nm_id + shift) % len(COLORS)], 'id': shift}
+            for shift in range(nm_id % 3 + 1)
+        ],
+        'sizes': [
+            {
+                'name': str(size),
+                'origName': str(size),
+                'rank': size,
+                'optionId': nm_id * 10 + size,
+                'stocks': [
+                    {'wh': warehouse, 'qty': (nm_id + size + warehouse) % 50}
+                    for warehouse in WAREHOUSES[: size % len(WAREHOUSES) + 1]
+                ],
+            }
+            for size in range(nm_id % 5 + 1)
+        ],
+    }
+
+
+class ProductStore:
+    """Source of the products served by the stub server.
+
+    Products recorded in `replay_dir` as `<nm_id>.json` are served as they
+    are, other ids are generated by `generate_product` unless
+    `profile.missing_every` marks them as missing. With `record_url` set the
+    requests are proxied to that website instead and every returned product is
+    written to `replay_dir`.
+    """
+
+    def __init__(
+        self,
+        profile: StubProfile,
+        replay_dir: Path | None = None,
+        record_url: str | None = None,
+    ) -> None:
+        self.profile = profile
+        self.replay_dir = replay_dir
+        self.record_url = record_url
+        self._recorded: dict[int, dict[str, Any] | None] = {}
+
+    def get(self, nm_id: int) -> dict[str, Any] | None:
+        """Returns the product with the given id or None if it is missing."""
+        recorded = self._load(nm_id)
+        if recorded is not None:
+            return recorded
+        if self.profile.missing_every and nm_id % self.profile.missing_every == 0:
+            return None
+        return generate_product(nm_id)
+
+    async def products(self, nm_ids: list[int], query: str) -> list[dict[str, Any]]:
+        """Returns the products served for a request in the requested order."""
+        if self.record_url is not None:
+            return await self.record(query)
+        products = map(self.get, dict.fromkeys(nm_ids))
+        return [product for product in products if product is not None]
+
+    async def record(self, query: str) -> list[dict[str, Any]]:
+        """Proxies a request to `record_url` and records the returned products."""
+        async with httpx.AsyncClient(base_url=self.record_url or '') as client:
+            response = await client.get(f'/cards/detail?{query}')
+        response.raise_for_status()
+        products = response.json()['data']['products']
+        if self.replay_dir is not None:
+            self.replay_dir.mkdir(parents=True, exist_ok=True)
+            for product in products:
+                path = self.replay_dir / f'{product["id"]}.json'
+                path.write_text(json.dumps(product, ensure_ascii=False))
+                self._recorded[product['id']] = product
+        return products
+
+    def _load(self, nm_id: int) -> dict[str, Any] | None:
+        """Returns the product recorded in `replay_dir`, reading it once."""
+        if self.replay_dir is None:
+            return None
+        if nm_id not in self._recorded:
+            path = self.replay_dir / f'{nm_id}.json'
+            self._recorded[nm_id] = (
+                json.loads(path.read_text()) if path.is_file() else None
+            )
+        return self._recorded[nm_id]
+
+
+def create_app(
+    profile: StubProfile = PROFILES['fast'],
+    replay_dir: Path | None = None,
+    record_url: str | None = None,
+    seed: int | None = None,
+) -> FastAPI:
+    """Creates the stub server application.
+
+    Args:
+    - profile (StubProfile): The latency, error and throttling behavior.
+    - replay_dir (Path | None): The directory of recorded products.
+    - record_url (str | None): The website to proxy and record requests to.
+    - seed (int | None): The seed of the latency and error randomness.
+
+    Returns:
+    - FastAPI: The application serving `/cards/detail`.
+    """
+    app = FastAPI(title='cards/detail stub')
+    store = ProductStore(profile, replay_dir, record_url)
+    throttle = Throttle(profile.rate_limit)
+    rng = random.Random(seed)
+    app.state.requests = []
+
+    @app.get('/cards/detail')
+    async def cards_detail(request: Request, nm: str = Query('')):
+        try:
+            nm_ids = [int(nm_id) for nm_id in nm.split(';') if nm_id]
+        except ValueError:
+            nm_ids = []
+        app.state.requests.append(nm_ids)
+
+        if not throttle.allow():
+            return JSONResponse({}, status_code=status.HTTP_429_TOO_MANY_REQUESTS)
+        delay = profile.latency + rng.uniform(0, profile.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if rng.random() < profile.error_rate:
+            return JSONResponse({}, status_code=profile.error_status)
+        if not nm_ids:
+            return JSONResponse({}, status_code=status.HTTP_400_BAD_REQUEST)
+
+        products = await store.products(nm_ids, request.url.query)
+        return {'state': 0, 'data': {'products': products}}
+
+    return app
+
+
+class StubServer:
+    """Runs an application with uvicorn in a background thread.
+
+    Usage:
+        with StubServer(create_app()) as server:
+            httpx.get(f'{server.url}/cards/detail?nm=1')
+    """
+
+    def __init__(self, app: FastAPI, host: str = '127.0.0.1', port: int = 0) -> None:
+        self.app = app
+        self.host = host
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=port, log_level='warning')
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """Returns the base url of the running server."""
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        return f'http://{self.host}:{port}'
+
+    def __enter__(self) -> 'StubServer':
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError('The stub server failed to start.')
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--profile', choices=PROFILES, default='realistic')
+    parser.add_argument('--latency', type=float)
+    parser.add_argument('--error-rate', type=float)
+    parser.add_argument('--rate-limit', type=float)
+    parser.add_argument('--replay-dir', type=Path)
+    parser.add_argument('--record-from')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    overrides = {
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'rate_limit': args.rate_limit,
+    }
+    profile = replace(
+        PROFILES[args.profile],
+        **{name: value for name, value in overrides.items() if value is not None},
+    )
+    app = create_app(profile, args.replay_dir, args.record_from, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='info')
+
+
+if __name__ == '__main__':
+    main()
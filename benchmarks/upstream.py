@@ -0,0 +1,69 @@
+"""Load test of fetching products from the local stub of the website.
+
+Starts the stub server on a free port, points the shared upstream client at it
+and fetches the products in bulk chunks like the bulk endpoint does, reporting
+throughput, per-request outcomes and the state of the scheduler and breaker.
+
+Usage:
+    python -m benchmarks.upstream [--products 5000] [--profile realistic]
+        [--chunk 500] [--replay-dir DIR]
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.stub_server import PROFILES, StubServer, create_app
+
+from src.breaker import upstream_breaker
+from src.cache import upstream_cache
+from src.client import upstream_client
+from src.config import settings
+from src.limiter import upstream_scheduler
+from src.utils import chunked, get_products_data_from_website
+
+
+async def run(products: int, chunk: int) -> Counter:
+    """Fetches the products chunk by chunk and counts the outcomes."""
+    outcomes: Counter = Counter()
+    upstream_client.start()
+    try:
+        for nm_ids in chunked(list(range(1, products + 1)), chunk):
+            result = await get_products_data_from_website(nm_ids)
+            outcomes['fetched'] += len(result.products)
+            outcomes.update(type(error).__name__ for error in result.errors.values())
+    finally:
+        await upstream_client.close()
+    return outcomes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--chunk', type=int, default=500)
+    parser.add_argument('--profile', choices=PROFILES, default='realistic')
+    parser.add_argument('--replay-dir', type=Path)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(PROFILES[args.profile], args.replay_dir, seed=args.seed)
+    with StubServer(app) as server:
+        settings.UPSTREAM_BASE_URL = server.url
+        settings.UPSTREAM_CACHE_ENABLED = False
+        started_at = time.perf_counter()
+        outcomes = asyncio.run(run(args.products, args.chunk))
+        elapsed = time.perf_counter() - started_at
+
+    print(f'profile: {args.profile}, {args.products} products in {elapsed:.2f} s')
+    print(f'throughput: {args.products / elapsed:.0f} products/s')
+    print(f'upstream requests: {len(app.state.requests)}')
+    for outcome, count in sorted(outcomes.items()):
+        print(f'{outcome:>22}: {count}')
+    print(f'breaker: {upstream_breaker.metrics()}')
+    print(f'scheduler: {upstream_scheduler.metrics()}')
+    print(f'cache: {upstream_cache.stats.as_dict()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,9 @@
 """Imports of all models for Alembic."""
 from src.database import Base  # noqa
-from src.models import Color, Product  # noqa
+from src.models import (  # noqa
+    Color,
+    Product,
+    ProductSnapshot,
+    ProductStock,
+    ProductWarehouseStock,
+)
@@ -0,0 +1,127 @@
+import random
+import time
+from enum import Enum
+from typing import Callable
+
+from src.config import settings
+
+
+class CircuitState(str, Enum):
+    """States of a circuit breaker."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency and probes it back to health.
+
+    The breaker opens after `failure_threshold` consecutive failures and
+    rejects every call for `recovery_timeout` seconds. Then it becomes
+    half-open and lets up to `half_open_max_calls` probe calls through: a
+    successful probe closes the breaker, a failed one opens it again.
+
+    Methods:
+    - `allow_request`: Returns whether a call may be made now.
+    - `record_success`: Records a successful call.
+    - `record_failure`: Records a failed call.
+    - `release`: Frees the probe slot of a call that ended without an outcome.
+    - `metrics`: Returns the current state of the breaker.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        recovery_timeout: float,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self.reset()
+
+    @property
+    def state(self) -> CircuitState:
+        """Returns the current state, moving from open to half-open once the
+        recovery timeout has passed.
+        """
+        if (
+            self._state == CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.recovery_timeout
+        ):
+            self._state = CircuitState.HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def reset(self) -> None:
+        """Closes the breaker and forgets recorded failures."""
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    def allow_request(self) -> bool:
+        """Returns whether a call may be made in the current state."""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.OPEN:
+            return False
+        if self._half_open_calls >= self.half_open_max_calls:
+            return False
+        self._half_open_calls += 1
+        return True
+
+    def record_success(self) -> None:
+        """Records a successful call and closes the breaker."""
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._half_open_calls = 0
+
+    def record_failure(self) -> None:
+        """Records a failed call and opens the breaker if needed."""
+        self._failures += 1
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self._failures >= self.failure_threshold
+        ):
+            self._state = CircuitState.OPEN
+            self._opened_at = self._clock()
+
+    def release(self) -> None:
+        """Frees the half-open probe slot of an admitted call that ended
+        without a success or a failure, e.g. because it was cancelled.
+
+        Without it such a call would hold its slot forever and the half-open
+        breaker would reject every call.
+        """
+        if self.state == CircuitState.HALF_OPEN and self._half_open_calls:
+            self._half_open_calls -= 1
+
+    def metrics(self) -> dict[str, str | int]:
+        """Returns the state and the number of consecutive failures."""
+        return {'state': self.state.value, 'failures': self._failures}
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Returns a delay before a retry using exponential backoff with full jitter.
+
+    Args:
+    - attempt (int): The number of the retry, starting from zero.
+    - base (float): The delay of the first retry in seconds.
+    - cap (float): The maximum delay in seconds.
+
+    Returns:
+    - float: A random delay between zero and the exponential backoff.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+upstream_breaker = CircuitBreaker(
+    failure_threshold=settings.UPSTREAM_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.UPSTREAM_BREAKER_RECOVERY_TIMEOUT,
+    half_open_max_calls=settings.UPSTREAM_BREAKER_HALF_OPEN_CALLS,
+)
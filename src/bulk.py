@@ -0,0 +1,59 @@
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.exceptions import DetailedHTTPException, ProductNotFound
+from src.schemas import BulkItemResult, BulkItemStatus
+from src.service import product_service
+from src.utils import chunked, get_products_data_from_website
+
+
+async def import_products(
+    nm_ids: Sequence[int], session: AsyncSession
+) -> AsyncIterator[BulkItemResult]:
+    """Imports many products from the website and yields a result per product id.
+
+    Ids already stored in the database are found with a single query. The rest
+    are fetched from the website and written to the database in chunks of
+    `BULK_CHUNK_SIZE`, so results are produced while the import is running.
+
+    Args:
+    - nm_ids (Sequence[int]): The ids of the products to import.
+    - session (AsyncSession): The async SQLAlchemy session to use for database
+      operations.
+
+    Yields:
+    - BulkItemResult: The outcome of importing a single product id.
+    """
+    nm_ids = list(dict.fromkeys(nm_ids))
+    existing_ids = await product_service.get_existing_ids(nm_ids, session)
+    for nm_id in existing_ids:
+        yield BulkItemResult(nm_id=nm_id, status=BulkItemStatus.ALREADY_EXISTS)
+
+    missing_ids = [nm_id for nm_id in nm_ids if nm_id not in existing_ids]
+    for chunk in chunked(missing_ids, settings.BULK_CHUNK_SIZE):
+        batch = await get_products_data_from_website(chunk)
+        for nm_id, error in batch.errors.items():
+            yield _error_result(nm_id, error)
+
+        created_ids = await product_service.create_products_bulk(
+            batch.products.values(), session
+        )
+        for nm_id in batch.products:
+            status = (
+                BulkItemStatus.CREATED
+                if nm_id in created_ids
+                else BulkItemStatus.ALREADY_EXISTS
+            )
+            yield BulkItemResult(nm_id=nm_id, status=status)
+
+
+def _error_result(nm_id: int, error: DetailedHTTPException) -> BulkItemResult:
+    """Converts an exception raised for a product id into its result line."""
+    status = (
+        BulkItemStatus.NOT_FOUND
+        if isinstance(error, ProductNotFound)
+        else BulkItemStatus.UPSTREAM_ERROR
+    )
+    return BulkItemResult(nm_id=nm_id, status=status, detail=error.detail)
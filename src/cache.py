@@ -0,0 +1,157 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Iterable
+
+from src.config import settings
+
+
+@dataclass
+class CacheStats:
+    """Counters of a cache backend."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        """Returns the counters as a dictionary."""
+        return asdict(self)
+
+
+class CacheBackend(ABC):
+    """Interface of a key-value cache storing serialized values.
+
+    Values are stored as bytes, so a backend shared by several workers can
+    implement the same interface without knowing what is cached.
+
+    Methods:
+    - `get`: Retrieves a value by its key.
+    - `get_many`: Retrieves values of many keys.
+    - `set`: Stores a value under a key.
+    - `set_many`: Stores many values.
+    - `delete`: Removes a value by its key.
+    - `clear`: Removes all values.
+    """
+
+    stats: CacheStats
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Retrieves a value by its key, or None if it is missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Stores a value under a key for `ttl` seconds."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Removes a value by its key."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Removes all values."""
+
+    async def get_many(self, keys: Iterable[str]) -> dict[str, bytes]:
+        """Retrieves values of many keys, skipping the missing ones."""
+        values = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                values[key] = value
+        return values
+
+    async def set_many(
+        self, values: dict[str, bytes], ttl: float | None = None
+    ) -> None:
+        """Stores many values for `ttl` seconds."""
+        for key, value in values.items():
+            await self.set(key, value, ttl)
+
+
+class InMemoryCache(CacheBackend):
+    """Process-local cache with per-entry TTL and LRU eviction.
+
+    The least recently used entries are evicted when the cache holds more than
+    `max_entries` entries or more than `max_bytes` bytes of keys and values.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        default_ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+        entry_size = self._entry_size(key, value)
+        if entry_size > self.max_bytes or self.max_entries < 1:
+            return
+
+        expires_at = self._clock() + (self.default_ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self.stats.entries += 1
+        self.stats.size_bytes += entry_size
+
+        while (
+            self.stats.entries > self.max_entries
+            or self.stats.size_bytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self.stats.entries = 0
+        self.stats.size_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        """Removes an entry and updates the size counters."""
+        _, value = self._entries.pop(key)
+        self.stats.entries -= 1
+        self.stats.size_bytes -= self._entry_size(key, value)
+
+    @staticmethod
+    def _entry_size(key: str, value: bytes) -> int:
+        """Returns the number of bytes accounted for an entry."""
+        return len(key) + len(value)
+
+
+upstream_cache: CacheBackend = InMemoryCache(
+    max_entries=settings.UPSTREAM_CACHE_MAX_ENTRIES,
+    max_bytes=settings.UPSTREAM_CACHE_MAX_BYTES,
+    default_ttl=settings.UPSTREAM_CACHE_TTL,
+)
@@ -0,0 +1,85 @@
+import httpx
+
+from src.config import settings
+
+
+class UpstreamClient:
+    """Process-wide holder of the async HTTP client used to talk to the website.
+
+    A single `httpx.AsyncClient` is shared by every request handled by the
+    process, so connections to the website are pooled and kept alive between
+    requests instead of being opened for every fetch.
+
+    Methods:
+    - `start`: Creates the underlying client if it does not exist yet.
+    - `close`: Closes the underlying client and releases pooled connections.
+    - `get`: Performs a GET request with the shared client.
+    """
+
+    def __init__(self) -> None:
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Returns the shared client, creating it lazily on first use.
+
+        Returns:
+        - httpx.AsyncClient: The shared async HTTP client.
+
+        Raises:
+        - None.
+        """
+        if self._client is None or self._client.is_closed:
+            self.start()
+        return self._client  # type: ignore
+
+    def start(self) -> None:
+        """Creates the shared client with the configured base url, pool limits
+        and timeouts.
+
+        Raises:
+        - None.
+        """
+        if self._client is not None and not self._client.is_closed:
+            return
+
+        self._client = httpx.AsyncClient(
+            base_url=settings.UPSTREAM_BASE_URL,
+            limits=httpx.Limits(
+                max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                settings.UPSTREAM_READ_TIMEOUT,
+                connect=settings.UPSTREAM_CONNECT_TIMEOUT,
+                pool=settings.UPSTREAM_POOL_TIMEOUT,
+            ),
+        )
+
+    async def close(self) -> None:
+        """Closes the shared client and its pooled connections.
+
+        Raises:
+        - None.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, url: str) -> httpx.Response:
+        """Performs a GET request to the given url with the shared client.
+
+        Args:
+        - url (str): The url to request, relative to the configured base url.
+
+        Returns:
+        - httpx.Response: The response of the website.
+
+        Raises:
+        - httpx.HTTPError: If the request could not be completed.
+        """
+        return await self.client.get(url)
+
+
+upstream_client = UpstreamClient()
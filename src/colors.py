@@ -0,0 +1,105 @@
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import Color
+
+
+class ColorDictionary:
+    """Process-wide dictionary of color ids keyed by color names.
+
+    Colors are never deleted by the service, so a color id stays valid once
+    its row is committed. Known names are resolved without a query, unknown
+    names are upserted as a set against the unique index on `Color.name`.
+
+    Methods:
+    - `load`: Preloads the ids of every stored color.
+    - `resolve`: Retrieves ids of colors by their names, creating missing ones.
+    - `remember`: Stores committed color ids in the dictionary.
+    - `clear`: Forgets every stored color id.
+    """
+
+    def __init__(self) -> None:
+        self._color_ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._color_ids)
+
+    async def load(self, session: AsyncSession) -> None:
+        """Preloads the ids of every color stored in the database.
+
+        Args:
+        - session (AsyncSession): The async SQLAlchemy session to use for
+          database operations.
+        """
+        colors = await session.execute(select(Color.name, Color.color_id))
+        self._color_ids.update(colors.tuples().all())
+
+    async def resolve(
+        self, color_names: Iterable[str], session: AsyncSession
+    ) -> dict[str, int]:
+        """Retrieves ids of colors by their names, creating the missing colors.
+
+        Names missing from the dictionary are inserted with a single
+        `INSERT ... ON CONFLICT DO NOTHING RETURNING`, and the names that
+        conflicted with colors stored meanwhile are selected in one more query.
+        Names are inserted in sorted order, so concurrent transactions creating
+        the same colors lock them in the same order and can not deadlock.
+        Created colors are not remembered until `remember` is called after the
+        transaction is committed.
+
+        Args:
+        - color_names (Iterable[str]): The names of the colors.
+        - session (AsyncSession): The async SQLAlchemy session to use for
+          database operations.
+
+        Returns:
+        - dict[str, int]: The ids of the colors keyed by their names.
+        """
+        color_names = set(color_names)
+        color_ids = {
+            name: self._color_ids[name]
+            for name in color_names
+            if name in self._color_ids
+        }
+        missing_names = color_names - color_ids.keys()
+        if not missing_names:
+            return color_ids
+
+        created_colors = await session.execute(
+            pg_insert(Color)
+            .values([{'name': name} for name in sorted(missing_names)])
+            .on_conflict_do_nothing(index_elements=[Color.name])
+            .returning(Color.name, Color.color_id)
+        )
+        color_ids.update(created_colors.tuples().all())
+
+        conflicted_names = color_names - color_ids.keys()
+        if conflicted_names:
+            stored_colors = await session.execute(
+                select(Color.name, Color.color_id).where(
+                    Color.name.in_(conflicted_names)
+                )
+            )
+            stored_color_ids = dict(stored_colors.tuples().all())
+            self._color_ids.update(stored_color_ids)
+            color_ids.update(stored_color_ids)
+
+        return color_ids
+
+    def remember(self, color_ids: dict[str, int]) -> None:
+        """Stores color ids of a committed transaction in the dictionary.
+
+        Args:
+        - color_ids (dict[str, int]): The ids of the colors keyed by their names.
+        """
+        self._color_ids.update(color_ids)
+
+    def clear(self) -> None:
+        """Forgets every stored color id."""
+        self._color_ids.clear()
+
+
+color_dictionary = ColorDictionary()
@@ -1,6 +1,92 @@
+from dataclasses import asdict, dataclass
+from enum import Enum
 from functools import lru_cache
+from typing import Any
 
-from pydantic import BaseSettings
+from pydantic import BaseSettings, Field, root_validator
+from sqlalchemy.pool import NullPool
+
+
+class DBProfile(str, Enum):
+    """Named profiles of the database engine configuration."""
+
+    DEV = 'dev'
+    PROD = 'prod'
+    PGBOUNCER = 'pgbouncer'
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """Defaults of the database engine for a deployment profile.
+
+    Attributes:
+    - echo (bool): Whether every SQL statement is logged.
+    - pool_pre_ping (bool): Whether a connection is checked before it is used.
+    - statement_cache_size (int): The size of the prepared statement caches of
+      asyncpg and SQLAlchemy per connection, zero disables them for pgbouncer
+      in transaction mode.
+    - use_pool (bool): Whether connections are pooled by the application, the
+      pool is disabled when an external pooler manages connections.
+    - pool_size (int | None): The number of connections kept open by the pool.
+    - max_overflow (int | None): The number of connections opened above
+      `pool_size` under load.
+    - pool_timeout (float | None): Seconds to wait for a free connection.
+    - pool_recycle (int | None): Seconds after which a connection is reopened,
+      -1 disables recycling.
+
+    The `pool_*` options are only set for the profiles with `use_pool`.
+    """
+
+    echo: bool
+    pool_pre_ping: bool
+    statement_cache_size: int
+    use_pool: bool = True
+    pool_size: int | None = None
+    max_overflow: int | None = None
+    pool_timeout: float | None = None
+    pool_recycle: int | None = None
+
+
+POOL_SETTINGS = (
+    'DB_POOL_SIZE',
+    'DB_MAX_OVERFLOW',
+    'DB_POOL_TIMEOUT',
+    'DB_POOL_RECYCLE',
+)
+
+
+DB_PROFILES = {
+    DBProfile.DEV: EngineProfile(
+        echo=True,
+        pool_size=5,
+        max_overflow=5,
+        pool_timeout=30.0,
+        pool_recycle=-1,
+        pool_pre_ping=False,
+        statement_cache_size=100,
+    ),
+    DBProfile.PROD: EngineProfile(
+        echo=False,
+        pool_size=20,
+        max_overflow=10,
+        pool_timeout=10.0,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        statement_cache_size=500,
+    ),
+    # Disabling the caches is not enough for pgbouncer in transaction mode:
+    # asyncpg still prepares every statement under a name generated per
+    # connection and SQLAlchemy 2.0.9 can not override it with
+    # `prepared_statement_name_func`, so two clients sharing a server
+    # connection may collide with "prepared statement already exists". The
+    # profile requires pgbouncer 1.21+ with `max_prepared_statements` set.
+    DBProfile.PGBOUNCER: EngineProfile(
+        echo=False,
+        pool_pre_ping=False,
+        statement_cache_size=0,
+        use_pool=False,
+    ),
+}
 
 
 class AppSettings(BaseSettings):
@@ -14,10 +100,90 @@ class AppSettings(BaseSettings):
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
 
+    DB_PROFILE: DBProfile = DBProfile.PROD
+    DB_ECHO: bool | None = None
+    DB_POOL_SIZE: int | None = Field(None, ge=1)
+    DB_MAX_OVERFLOW: int | None = Field(None, ge=0)
+    DB_POOL_TIMEOUT: float | None = Field(None, gt=0)
+    DB_POOL_RECYCLE: int | None = Field(None, ge=-1)
+    DB_POOL_PRE_PING: bool | None = None
+    DB_STATEMENT_CACHE_SIZE: int | None = Field(None, ge=0)
+
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_HEALTH_INTERVAL: float = Field(5.0, gt=0)
+    DB_REPLICA_HEALTH_TIMEOUT: float = Field(2.0, gt=0)
+    DB_READ_YOUR_WRITES_WINDOW: float = Field(5.0, ge=0)
+
+    UPSTREAM_BASE_URL: str = 'https://card.wb.ru'
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY: float = 30.0
+    UPSTREAM_CONNECT_TIMEOUT: float = 5.0
+    UPSTREAM_READ_TIMEOUT: float = 10.0
+    UPSTREAM_POOL_TIMEOUT: float = 5.0
+    UPSTREAM_BATCH_SIZE: int = 100
+    UPSTREAM_RATE_LIMIT: float = 20.0
+    UPSTREAM_RATE_BURST: float = 20.0
+    UPSTREAM_CONCURRENCY_INITIAL: float = 8.0
+    UPSTREAM_CONCURRENCY_MIN: float = 1.0
+    UPSTREAM_CONCURRENCY_MAX: float = 64.0
+    UPSTREAM_CONCURRENCY_BACKOFF: float = 0.5
+    UPSTREAM_RETRIES: int = 2
+    UPSTREAM_RETRY_BACKOFF_BASE: float = 0.2
+    UPSTREAM_RETRY_BACKOFF_MAX: float = 2.0
+    UPSTREAM_BREAKER_FAILURE_THRESHOLD: int = 5
+    UPSTREAM_BREAKER_RECOVERY_TIMEOUT: float = 30.0
+    UPSTREAM_BREAKER_HALF_OPEN_CALLS: int = 1
+
+    UPSTREAM_CACHE_ENABLED: bool = True
+    UPSTREAM_CACHE_TTL: float = 300.0
+    UPSTREAM_CACHE_MAX_ENTRIES: int = 10000
+    UPSTREAM_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    PRODUCT_COUNT_CACHE_TTL: float = 30.0
+    PRODUCT_CACHE_ENABLED: bool = True
+    PRODUCT_CACHE_TTL: float = 60.0
+    PRODUCT_CACHE_MAX_ENTRIES: int = 10000
+    PRODUCT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    PRODUCT_CACHE_CHANNEL: str | None = None
+    PRODUCT_CACHE_RECONNECT_DELAY: float = Field(1.0, gt=0)
+    PRODUCT_CACHE_RECONNECT_MAX_DELAY: float = Field(30.0, gt=0)
+    PRODUCT_CACHE_CONTROL: str = 'public, no-cache'
+    PRODUCT_RAW_RESPONSES: bool = False
+
+    BULK_MAX_IDS: int = 10000
+    BULK_CHUNK_SIZE: int = 500
+
+    REFRESH_ENABLED: bool = False
+    REFRESH_INTERVAL: float = Field(300.0, gt=0)
+    REFRESH_BATCH_SIZE: int = Field(500, ge=1)
+    REFRESH_CONCURRENCY: int = Field(4, ge=1)
+
+    HISTORY_PARTITIONS_AHEAD: int = Field(2, ge=0)
+    HISTORY_RETENTION_MONTHS: int | None = Field(None, ge=1)
+    HISTORY_DEFAULT_DAYS: int = Field(30, ge=1)
+    HISTORY_MAX_POINTS: int = Field(5000, ge=1)
+
     class Config:
         env_file = '.env'
         env_file_encoding = 'utf-8'
 
+    @root_validator(skip_on_failure=True)
+    def check_pool_settings(cls, values: dict[str, Any]) -> dict[str, Any]:
+        """Rejects pool options set for a profile without a connection pool."""
+        if DB_PROFILES[values['DB_PROFILE']].use_pool:
+            return values
+
+        if pool_settings := [
+            name for name in POOL_SETTINGS if values.get(name) is not None
+        ]:
+            raise ValueError(
+                f'{", ".join(pool_settings)} can not be set with the '
+                f'{values["DB_PROFILE"].value} profile, which does not pool '
+                'connections.'
+            )
+        return values
+
     @property
     def database_url(self) -> str:
         """Url for connection to database.
@@ -36,6 +202,68 @@ class AppSettings(BaseSettings):
             f'@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}'
         )
 
+    @property
+    def engine_profile(self) -> EngineProfile:
+        """Engine configuration of the `DB_PROFILE` with the `DB_*` overrides.
+
+        Returns:
+        - EngineProfile: The defaults of the profile, every option set in the
+        settings replacing the default of the profile.
+
+        Raises:
+        - None.
+        """
+        overrides = {
+            'echo': self.DB_ECHO,
+            'pool_size': self.DB_POOL_SIZE,
+            'max_overflow': self.DB_MAX_OVERFLOW,
+            'pool_timeout': self.DB_POOL_TIMEOUT,
+            'pool_recycle': self.DB_POOL_RECYCLE,
+            'pool_pre_ping': self.DB_POOL_PRE_PING,
+            'statement_cache_size': self.DB_STATEMENT_CACHE_SIZE,
+        }
+        return EngineProfile(
+            **{
+                **asdict(DB_PROFILES[self.DB_PROFILE]),
+                **{
+                    name: value
+                    for name, value in overrides.items()
+                    if value is not None
+                },
+            }
+        )
+
+    @property
+    def engine_options(self) -> dict[str, Any]:
+        """Keyword arguments for `create_async_engine` of the `engine_profile`.
+
+        Returns:
+        - dict: The options of the engine and its connection pool.
+
+        Raises:
+        - None.
+        """
+        profile = self.engine_profile
+        options: dict[str, Any] = {
+            'echo': profile.echo,
+            'pool_pre_ping': profile.pool_pre_ping,
+            'connect_args': {
+                'statement_cache_size': profile.statement_cache_size,
+                'prepared_statement_cache_size': profile.statement_cache_size,
+            },
+        }
+        if not profile.use_pool:
+            options['poolclass'] = NullPool
+            return options
+
+        options.update(
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_timeout=profile.pool_timeout,
+            pool_recycle=profile.pool_recycle,
+        )
+        return options
+
 
 @lru_cache
 def get_settings():
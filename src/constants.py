@@ -1,4 +1,8 @@
-URL_LINK = 'https://card.wb.ru/cards/detail?curr=rub&dest=-1257786&spp=0&nm={nm_id}'
+UPSTREAM_QUERY = 'curr=rub&dest=-1257786&spp=0'
+URL_LINK = f'/cards/detail?{UPSTREAM_QUERY}&nm={{nm_id}}'
+UPSTREAM_CACHE_KEY = f'product:{UPSTREAM_QUERY}:{{nm_id}}'
+PRODUCT_CACHE_KEY = 'product:{nm_id}'
+CLIENT_ID_HEADER = 'X-Client-Id'
 
 RESPONSE_KEY_MAPPING = {
     'nm_id': 'id',
@@ -28,10 +32,38 @@ class ErrorCodes:
     PRODUCT_DOES_NOT_EXIST = 'Product does not exist.'
     PRODUCT_ALREADY_EXISTS = 'Product with this id already exists.'
     SMTH_WENT_WRONG = 'Something went wrong on requesting data from the website.'
+    UPSTREAM_UNAVAILABLE = 'The website is temporarily unavailable. Try again later.'
     PRODUCT_JSON_KEY_NOT_FOUND = (
         'An expected key was not found in response prodcut data or it was renamed. '
         'Unabled to parse fetched data.'
     )
+    INVALID_BULK_REQUEST = (
+        'Request body must be a JSON array or NDJSON lines of product ids '
+        'or objects with the "nm_id" key.'
+    )
+    TOO_MANY_BULK_IDS = 'Too many product ids in a single bulk request.'
+    INVALID_CURSOR = 'The pagination cursor is invalid.'
+    INVALID_TIME_RANGE = 'The start of the time range must be before its end.'
+
+
+BULK_REQUEST_BODY = {
+    'requestBody': {
+        'required': True,
+        'content': {
+            'application/json': {
+                'schema': {
+                    'type': 'array',
+                    'items': {'type': 'integer', 'minimum': 0},
+                },
+                'example': [139760619, 143422485],
+            },
+            'application/x-ndjson': {
+                'schema': {'type': 'string'},
+                'example': '{"nm_id": 139760619}\n143422485\n',
+            },
+        },
+    },
+}
 
 
 class AdditionalResponses:
@@ -47,6 +79,24 @@ class AdditionalResponses:
             'description': 'When a product does not exist in database.',
         }
     }
+    PRODUCT_LIST_CURSOR = {
+        400: {
+            'content': {
+                'application/json': {'example': {'detail': ErrorCodes.INVALID_CURSOR}},
+            },
+            'description': 'When the cursor was not returned by a previous page.',
+        }
+    }
+    PRODUCT_HISTORY = {
+        400: {
+            'content': {
+                'application/json': {
+                    'example': {'detail': ErrorCodes.INVALID_TIME_RANGE}
+                },
+            },
+            'description': 'When the start of the range is not before its end.',
+        }
+    }
     PRODUCT_CREATE = {
         400: {
             'content': {
@@ -73,4 +123,35 @@ class AdditionalResponses:
                 'make a proper request to the Wildberries website.'
             ),
         },
+        503: {
+            'content': {
+                'application/json': {
+                    'example': {'detail': ErrorCodes.UPSTREAM_UNAVAILABLE}
+                },
+            },
+            'description': (
+                'When the Wildberries website keeps failing and requests to it '
+                'are temporarily suspended.'
+            ),
+        },
+    }
+    PRODUCT_BULK_CREATE = {
+        200: {
+            'content': {
+                'application/x-ndjson': {
+                    'example': (
+                        '{"nm_id": 139760619, "status": "created", "detail": null}\n'
+                    )
+                },
+            },
+            'description': 'One JSON line with the result for every product id.',
+        },
+        400: {
+            'content': {
+                'application/json': {
+                    'example': {'detail': ErrorCodes.INVALID_BULK_REQUEST}
+                },
+            },
+            'description': 'When the request body can not be parsed.',
+        },
     }
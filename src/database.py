@@ -2,9 +2,24 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 from src.config import settings
+from src.replicas import ReplicaSet, RoutingSession
 
-engine = create_async_engine(settings.database_url, echo=True)
-async_session = async_sessionmaker(engine, expire_on_commit=False)
+engine = create_async_engine(settings.database_url, **settings.engine_options)
+replica_set = ReplicaSet(
+    engine,
+    [
+        create_async_engine(url, **settings.engine_options)
+        for url in settings.DB_REPLICA_URLS
+    ],
+    pin_window=settings.DB_READ_YOUR_WRITES_WINDOW,
+    health_timeout=settings.DB_REPLICA_HEALTH_TIMEOUT,
+)
+async_session = async_sessionmaker(
+    engine,
+    expire_on_commit=False,
+    sync_session_class=RoutingSession,
+    replica_set=replica_set,
+)
 
 
 class Base(DeclarativeBase):
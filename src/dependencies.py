@@ -1,17 +1,36 @@
-from typing import AsyncGenerator
+import json
+from typing import Any, AsyncGenerator
 
-from fastapi import Depends
+from fastapi import Depends, Request
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.database import async_session
-from src.exceptions import ProductAlreadyExists, ProductDoesNotExist
+from src.config import settings
+from src.constants import CLIENT_ID_HEADER
+from src.database import async_session, replica_set
+from src.exceptions import InvalidBulkRequest, ProductAlreadyExists, TooManyBulkIds
+from src.replicas import (
+    CLIENT_INFO_KEY,
+    PIN_COOKIE,
+    PINNED_INFO_KEY,
+    SESSION_INFO_STATE_KEY,
+)
 from src.schemas import ProductRequest
 from src.service import product_service
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """Returns an async generator that yields an async SQLAlchemy session.
 
+    The session is tagged with the client of the request, taken from the
+    `X-Client-Id` header, so reads of a client that has just written to this
+    worker are routed to the primary database instead of a replica. The reads of
+    a request carrying an unexpired pin token cookie, set after a write by
+    `ReadYourWritesMiddleware` of any worker, are routed to the primary too.
+
+    Args:
+    - request (Request): The incoming request.
+
     Yields:
     - AsyncSession: An async SQLAlchemy session.
 
@@ -22,36 +41,15 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     - This function should be used as a dependency in route functions that require
     a database session.
     """
-    async with async_session() as session:
+    info = {
+        CLIENT_INFO_KEY: request.headers.get(CLIENT_ID_HEADER),
+        PINNED_INFO_KEY: replica_set.is_token_pinned(request.cookies.get(PIN_COOKIE)),
+    }
+    async with async_session(info=info) as session:
+        setattr(request.state, SESSION_INFO_STATE_KEY, session.info)
         yield session
 
 
-async def validate_product_exists(
-    product_id: int, session: AsyncSession = Depends(get_async_session)
-) -> int:
-    """Validates that a product with the specified ID exists in the database.
-
-    Args:
-    - product_id (int): The ID of the product to validate.
-    - session (AsyncSession): The async SQLAlchemy session to use for database
-      operations.
-
-    Returns:
-    - int: The product ID if it exists in the database.
-
-    Raises:
-    - ProductDoesNotExist: If a product with the specified ID does not exist in the
-      database.
-
-    Note:
-    - This function can be used as a dependency in route functions that require
-    a product validation by ID.
-    """
-    if not await product_service.get_product(product_id, session):
-        raise ProductDoesNotExist()
-    return product_id
-
-
 async def validate_unique_product(
     product_id_in: ProductRequest, session: AsyncSession = Depends(get_async_session)
 ) -> ProductRequest:
@@ -75,6 +73,48 @@ async def validate_unique_product(
     - This function can be used as a dependency in route functions that require
     a unique product ID.
     """
-    if await product_service.get_product(product_id_in.nm_id, session):
+    if await product_service.product_exists(product_id_in.nm_id, session):
         raise ProductAlreadyExists()
     return product_id_in
+
+
+async def parse_bulk_request(request: Request) -> list[int]:
+    """Parses product ids from the body of a bulk request.
+
+    The body is either a JSON array or NDJSON lines (`application/x-ndjson`),
+    every item being a product id or an object with the `nm_id` key.
+
+    Args:
+    - request (Request): The incoming request.
+
+    Returns:
+    - list[int]: The product ids in the order they were sent.
+
+    Raises:
+    - InvalidBulkRequest: If the body can not be parsed.
+    - TooManyBulkIds: If the body contains more than `BULK_MAX_IDS` ids.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get('content-type', '').startswith('application/x-ndjson'):
+            items = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = json.loads(body)
+        if not isinstance(items, list):
+            raise InvalidBulkRequest()
+        nm_ids = [_parse_bulk_item(item) for item in items]
+    except (ValueError, ValidationError):
+        raise InvalidBulkRequest()
+
+    if len(nm_ids) > settings.BULK_MAX_IDS:
+        raise TooManyBulkIds()
+    return nm_ids
+
+
+def _parse_bulk_item(item: Any) -> int:
+    """Extracts a product id from a single item of a bulk request."""
+    if isinstance(item, dict):
+        return ProductRequest.parse_obj(item).nm_id
+    if isinstance(item, bool) or not isinstance(item, int):
+        raise ValueError(item)
+    return ProductRequest(nm_id=item).nm_id
@@ -57,9 +57,42 @@ class SomethingWentWrong(DetailedHTTPException):
     DETAIL = ErrorCodes.SMTH_WENT_WRONG
 
 
+class UpstreamUnavailable(DetailedHTTPException):
+    """Exception for the case when requests to the website are suspended by
+    the circuit breaker.
+    """
+
+    STATUS_CODE = status.HTTP_503_SERVICE_UNAVAILABLE
+    DETAIL = ErrorCodes.UPSTREAM_UNAVAILABLE
+
+
 class JSONKeyNotFound(NotFound):
     """Exception for the case when a key was not found
     in fetched json data.
     """
 
     DETAIL = ErrorCodes.PRODUCT_JSON_KEY_NOT_FOUND
+
+
+class InvalidBulkRequest(BadRequest):
+    """Exception for the case when a bulk request body can not be parsed."""
+
+    DETAIL = ErrorCodes.INVALID_BULK_REQUEST
+
+
+class TooManyBulkIds(BadRequest):
+    """Exception for the case when a bulk request contains too many ids."""
+
+    DETAIL = ErrorCodes.TOO_MANY_BULK_IDS
+
+
+class InvalidCursor(BadRequest):
+    """Exception for the case when a pagination cursor can not be decoded."""
+
+    DETAIL = ErrorCodes.INVALID_CURSOR
+
+
+class InvalidTimeRange(BadRequest):
+    """Exception for the case when a time range ends before it starts."""
+
+    DETAIL = ErrorCodes.INVALID_TIME_RANGE
@@ -0,0 +1,128 @@
+from operator import itemgetter
+from typing import Any
+
+from src.constants import RESPONSE_KEY_MAPPING
+from src.exceptions import JSONKeyNotFound
+
+ParsedProduct = tuple[list[str], dict[str, Any]]
+Stock = tuple[str, int, int]
+
+
+class ProductExtractor:
+    """Validates and projects fetched product data in a single pass.
+
+    The getter of the mapped keys is compiled once from the key mapping, so
+    extracting a product looks every key up only once instead of checking and
+    copying the fields in separate loops.
+
+    Methods:
+    - `extract`: Validates a fetched product and returns its colors and data.
+    - `extract_many`: Runs `extract` for every product of a batch.
+    """
+
+    def __init__(self, key_mapping: dict[str, str]) -> None:
+        self._field_names = tuple(key_mapping)
+        self._get_fields = itemgetter(*key_mapping.values(), 'colors', 'sizes')
+
+    def extract(self, fetched_product_data: dict[str, Any]) -> ParsedProduct:
+        """Validates and parses a single product fetched from a website.
+
+        Args:
+        - fetched_product_data (dict): The dictionary containing the fetched
+          product data.
+
+        Raises:
+        - JSONKeyNotFound: If a key from the key mapping, 'colors', 'sizes',
+          a color 'name', a size 'stocks' or a stock 'qty' is missing.
+
+        Returns:
+        - A tuple of the product colors and the parsed product data including
+          the total quantity of the product and its `stocks` as returned by
+          `aggregate_stocks`.
+        """
+        color_names, parsed_product_data, sizes = self._extract_fields(
+            fetched_product_data
+        )
+        stocks = aggregate_stocks(sizes)
+        if stocks is None:
+            raise JSONKeyNotFound()
+
+        parsed_product_data['quantity'] = sum(qty for *_, qty in stocks)
+        parsed_product_data['stocks'] = stocks
+        return color_names, parsed_product_data
+
+    def extract_many(
+        self, fetched_products: dict[int, dict[str, Any]]
+    ) -> tuple[dict[int, ParsedProduct], dict[int, JSONKeyNotFound]]:
+        """Validates and parses a batch of products fetched from a website.
+
+        Products are parsed one by one with `extract`, so a malformed product
+        does not prevent the rest of the batch from being parsed.
+
+        Args:
+        - fetched_products (dict): The fetched product data keyed by product id.
+
+        Returns:
+        - A tuple of the results of `extract` keyed by product id and
+          `JSONKeyNotFound` for every product that could not be parsed.
+        """
+        products, errors = {}, {}
+        for nm_id, fetched_product_data in fetched_products.items():
+            try:
+                products[nm_id] = self.extract(fetched_product_data)
+            except JSONKeyNotFound as error:
+                errors[nm_id] = error
+        return products, errors
+
+    def _extract_fields(
+        self, fetched_product_data: dict[str, Any]
+    ) -> tuple[list[str], dict[str, Any], list[dict[str, Any]]]:
+        """Projects the mapped fields and color names of a fetched product.
+
+        Raises:
+        - JSONKeyNotFound: If a key from the key mapping, 'colors', 'sizes' or
+          a color 'name' is missing.
+
+        Returns:
+        - A tuple of the color names, the parsed product data without quantity
+          and the raw sizes of the product.
+        """
+        try:
+            *field_values, colors, sizes = self._get_fields(fetched_product_data)
+            color_names = [color.get('name') for color in colors or ()]
+        except (KeyError, AttributeError):
+            raise JSONKeyNotFound()
+        if None in field_values or None in color_names or None in (colors, sizes):
+            raise JSONKeyNotFound()
+
+        return color_names, dict(zip(self._field_names, field_values)), sizes
+
+
+def aggregate_stocks(sizes: Any) -> list[Stock] | None:
+    """Collects `sizes[].stocks[]` of a product.
+
+    Quantities of a size in a warehouse are summed, so every pair of them
+    appears once. A size without a name is keyed by an empty name and a stock
+    without a warehouse by warehouse 0, so the stocks always sum up to the
+    total quantity. Empty stocks are dropped.
+
+    Args:
+    - sizes (Any): The raw sizes of the product.
+
+    Returns:
+    - list[Stock] | None: The `(size, warehouse, qty)` stocks sorted by size
+      and warehouse, or None if the sizes miss the 'stocks' or 'qty' key.
+    """
+    stocks = {}
+    try:
+        for size in sizes:
+            size_name = size.get('name') or ''
+            for stock in size['stocks']:
+                key = size_name, stock.get('wh') or 0
+                stocks[key] = stocks.get(key, 0) + stock['qty']
+    except (KeyError, TypeError, AttributeError):
+        return None
+    return sorted([(*key, qty) for key, qty in stocks.items() if qty])
+
+
+product_extractor = ProductExtractor(RESPONSE_KEY_MAPPING)
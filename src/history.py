@@ -0,0 +1,390 @@
+"""Append-only history of product prices and stock.
+
+Snapshots are written to the `product_snapshot` table only when the price,
+the sale or the quantity of a product changes. The table is partitioned by
+month of `captured_at`: queries of a time range read only the partitions of
+the range through their `(nm_id, captured_at)` primary key, and old history is
+dropped a whole partition at a time instead of being deleted row by row.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from src.config import settings
+from src.models import ProductSnapshot
+from src.schemas import HistoryInterval
+from src.utils import chunked
+
+SNAPSHOT_COLUMNS = ('price', 'sale_price', 'sale', 'quantity')
+PARTITION_PATTERN = re.compile(r'_p(\d{4})_(\d{2})$')
+
+
+def month_start(moment: datetime, months: int = 0) -> datetime:
+    """Returns the start of the month of a moment in UTC shifted by `months`."""
+    moment = moment.astimezone(timezone.utc)
+    year, month = divmod(moment.year * 12 + moment.month - 1 + months, 12)
+    return datetime(year, month + 1, 1, tzinfo=timezone.utc)
+
+
+class ProductHistory:
+    """Service class for the price and stock history of products.
+
+    Attributes:
+    - model: The SQLAlchemy model of the partitioned snapshot table.
+
+    Methods:
+    - `add_snapshots`: Writes snapshots of products with `COPY`.
+    - `changed_snapshots`: Selects the products whose snapshot columns changed.
+    - `get_history`: Retrieves the history of a product over a time range.
+    - `maintain`: Creates the upcoming partitions and drops the expired ones.
+    - `ensure_partitions`: Creates the monthly partitions of a period.
+    - `drop_partitions_before`: Drops the partitions older than a moment.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.table = model.__tablename__
+        self.default_partition = f'{self.table}_default'
+
+    def partition_name(self, month: datetime) -> str:
+        """Returns the name of the partition of a month."""
+        return f'{self.table}_p{month.year:04d}_{month.month:02d}'
+
+    async def _primary(self, session: AsyncSession) -> AsyncConnection:
+        """Returns the connection of the session to the primary database."""
+        return await session.connection(bind_arguments={'clause': insert(self.model)})
+
+    async def add_snapshots(
+        self,
+        products: Iterable[dict[str, Any]],
+        session: AsyncSession,
+        captured_at: datetime | None = None,
+    ) -> int:
+        """Writes snapshots of products in the transaction of the session.
+
+        Rows are sent with the binary `COPY` protocol of asyncpg, which costs a
+        single round trip and no statement parsing for any number of rows.
+
+        Args:
+        - products (Iterable[dict]): The data of the products with `nm_id` and
+          the `SNAPSHOT_COLUMNS`.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+        - captured_at (datetime | None): The time of the snapshots, now if not
+          given.
+
+        Raises:
+        - None
+
+        Returns:
+        - int: The number of written snapshots.
+        """
+        captured_at = captured_at or datetime.now(timezone.utc)
+        records = [
+            (
+                product['nm_id'],
+                captured_at,
+                *(product[name] for name in SNAPSHOT_COLUMNS),
+            )
+            for product in products
+        ]
+        if not records:
+            return 0
+
+        connection = await self._primary(session)
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            self.table,
+            records=records,
+            columns=('nm_id', 'captured_at', *SNAPSHOT_COLUMNS),
+        )
+        return len(records)
+
+    @staticmethod
+    def changed_snapshots(
+        products: Iterable[dict[str, Any]], previous: dict[int, tuple]
+    ) -> list[dict[str, Any]]:
+        """Selects the products whose snapshot columns changed.
+
+        Args:
+        - products (Iterable[dict]): The fresh data of the products.
+        - previous (dict[int, tuple]): The stored values of the
+          `SNAPSHOT_COLUMNS` keyed by the ids of the products.
+
+        Returns:
+        - list[dict]: The data of the products to write snapshots of.
+        """
+        return [
+            product
+            for product in products
+            if product['nm_id'] in previous
+            and tuple(product[name] for name in SNAPSHOT_COLUMNS)
+            != tuple(previous[product['nm_id']])
+        ]
+
+    async def get_history(
+        self,
+        product_id: int,
+        start: datetime,
+        end: datetime,
+        interval: HistoryInterval,
+        session: AsyncSession,
+    ) -> tuple[list[dict[str, Any]], bool]:
+        """Retrieves the history of a product over a time range.
+
+        Snapshots are downsampled in SQL into buckets of the `interval` in UTC
+        with the minimum, the maximum and the last value of every column, so
+        the size of the response depends on the range and not on the number
+        of snapshots. Buckets without snapshots are omitted. At most
+        `HISTORY_MAX_POINTS` first points are returned, one more point is read
+        to tell whether the history was truncated.
+
+        Args:
+        - product_id (int): The ID of the product.
+        - start (datetime): The start of the range, inclusive.
+        - end (datetime): The end of the range, exclusive.
+        - interval (HistoryInterval): The size of the buckets, `raw` for every
+          snapshot.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - tuple[list[dict], bool]: The fields of `ProductHistoryPoint` ordered by
+          time, and whether points after the last one were left out.
+        """
+        captured_at = self.model.captured_at
+        columns = [getattr(self.model, name) for name in SNAPSHOT_COLUMNS]
+        if interval == HistoryInterval.RAW:
+            time = captured_at.label('time')
+            stats = [(column, column, column) for column in columns]
+        else:
+            time = func.date_trunc(interval.value, captured_at, 'UTC').label('time')
+            stats = [
+                (
+                    func.min(column),
+                    func.max(column),
+                    array_agg(aggregate_order_by(column, captured_at.desc()))[1],
+                )
+                for column in columns
+            ]
+
+        stmt = (
+            select(time, *(stat for column_stats in stats for stat in column_stats))
+            .where(
+                self.model.nm_id == product_id,
+                captured_at >= start,
+                captured_at < end,
+            )
+            .order_by(time)
+            .limit(settings.HISTORY_MAX_POINTS + 1)
+        )
+        if interval != HistoryInterval.RAW:
+            stmt = stmt.group_by(time)
+
+        rows = (await session.execute(stmt)).all()
+        truncated = len(rows) > settings.HISTORY_MAX_POINTS
+        points = []
+        for time, *values in rows[: settings.HISTORY_MAX_POINTS]:
+            points.append(
+                {
+                    'time': time,
+                    **{
+                        name: dict(zip(('min', 'max', 'last'), column_stats))
+                        for name, column_stats in zip(
+                            SNAPSHOT_COLUMNS, chunked(values, 3)
+                        )
+                    },
+                }
+            )
+        return points, truncated
+
+    async def maintain(
+        self, session: AsyncSession, now: datetime | None = None
+    ) -> None:
+        """Creates the upcoming partitions and drops the expired ones.
+
+        Partitions are created for the current month and `HISTORY_PARTITIONS_AHEAD`
+        months after it. With `HISTORY_RETENTION_MONTHS` set, partitions that
+        ended before that many months ago are dropped.
+
+        Args:
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+        - now (datetime | None): The current time, for tests.
+        """
+        now = now or datetime.now(timezone.utc)
+        await self.ensure_partitions(
+            month_start(now),
+            month_start(now, settings.HISTORY_PARTITIONS_AHEAD + 1),
+            session,
+        )
+        if settings.HISTORY_RETENTION_MONTHS is not None:
+            await self.drop_partitions_before(
+                month_start(now, -settings.HISTORY_RETENTION_MONTHS), session
+            )
+
+    async def ensure_partitions(
+        self, start: datetime, end: datetime, session: AsyncSession
+    ) -> list[str]:
+        """Creates the missing monthly partitions of a period and commits.
+
+        Snapshots outside of the monthly partitions are kept in the default
+        partition. When it holds rows of a new partition, it is detached while
+        they are moved, since Postgres can not create a partition for the rows
+        of the default one.
+
+        Args:
+        - start (datetime): A moment in the first month of the period.
+        - end (datetime): The end of the period, exclusive.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - list[str]: The names of the created partitions.
+        """
+        connection = await self._primary(session)
+        await self._lock(connection)
+        created = []
+        month = month_start(start)
+        while month < end:
+            next_month = month_start(month, 1)
+            name = self.partition_name(month)
+            if not await connection.scalar(
+                text('SELECT to_regclass(:name)'), {'name': name}
+            ):
+                await self._create_partition(connection, name, month, next_month)
+                created.append(name)
+            month = next_month
+        await session.commit()
+        return created
+
+    async def drop_partitions_before(
+        self, moment: datetime, session: AsyncSession
+    ) -> list[str]:
+        """Drops the monthly partitions that ended before a moment and commits.
+
+        Snapshots before the moment kept in the default partition are deleted.
+
+        Args:
+        - moment (datetime): The oldest time of the history to keep.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - list[str]: The names of the dropped partitions.
+        """
+        connection = await self._primary(session)
+        await self._lock(connection)
+        partitions = await connection.scalars(
+            text(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE pg_inherits.inhparent = to_regclass(:table)'
+            ),
+            {'table': self.table},
+        )
+        dropped = []
+        for name in sorted(partitions):
+            match = PARTITION_PATTERN.search(name)
+            if match is None:
+                continue
+            year, month = map(int, match.groups())
+            if month_start(datetime(year, month, 1, tzinfo=timezone.utc), 1) <= moment:
+                await connection.execute(text(f'DROP TABLE {name}'))
+                dropped.append(name)
+        await connection.execute(
+            text(f'DELETE FROM {self.default_partition} WHERE captured_at < :moment'),
+            {'moment': moment},
+        )
+        await session.commit()
+        return dropped
+
+    async def _lock(self, connection: AsyncConnection) -> None:
+        """Serializes partition maintenance of all workers until commit."""
+        await connection.execute(
+            select(func.pg_advisory_xact_lock(func.hashtext(self.table)))
+        )
+
+    async def _create_partition(
+        self,
+        connection: AsyncConnection,
+        name: str,
+        start: datetime,
+        end: datetime,
+    ) -> None:
+        """Creates the partition of a month, moving its rows out of the default
+        partition."""
+        bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        in_range = 'captured_at >= :start AND captured_at < :end'
+        range_params = {'start': start, 'end': end}
+        has_rows = await connection.scalar(
+            text(
+                f'SELECT EXISTS (SELECT FROM {self.default_partition} '
+                f'WHERE {in_range})'
+            ),
+            range_params,
+        )
+        if not has_rows:
+            await connection.execute(
+                text(
+                    f'CREATE TABLE {name} PARTITION OF {self.table} '
+                    f'FOR VALUES {bounds}'
+                )
+            )
+            return
+
+        await connection.execute(
+            text(f'ALTER TABLE {self.table} DETACH PARTITION {self.default_partition}')
+        )
+        await connection.execute(
+            text(f'CREATE TABLE {name} PARTITION OF {self.table} FOR VALUES {bounds}')
+        )
+        await connection.execute(
+            text(
+                f'WITH moved AS (DELETE FROM {self.default_partition} '
+                f'WHERE {in_range} RETURNING *) '
+                f'INSERT INTO {name} SELECT * FROM moved'
+            ),
+            range_params,
+        )
+        await connection.execute(
+            text(
+                f'ALTER TABLE {self.table} ATTACH PARTITION '
+                f'{self.default_partition} DEFAULT'
+            )
+        )
+
+
+def default_history_range(
+    start: datetime | None, end: datetime | None
+) -> tuple[datetime, datetime]:
+    """Fills in the bounds of a history range omitted in a request.
+
+    The range ends now and spans `HISTORY_DEFAULT_DAYS` days by default, naive
+    bounds are taken as UTC.
+    """
+    if end is None:
+        end = datetime.now(timezone.utc)
+    elif end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if start is None:
+        start = end - timedelta(days=settings.HISTORY_DEFAULT_DAYS)
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return start, end
+
+
+product_history = ProductHistory(ProductSnapshot)
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from src.config import settings
+
+
+class TokenBucket:
+    """Limits the rate of operations to `rate` per second with bursts of
+    up to `capacity` operations.
+
+    A rate of zero or less disables the limit.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._lock = asyncio.Lock()
+
+    @property
+    def tokens(self) -> float:
+        """Returns the number of tokens currently available."""
+        self._refill()
+        return self._tokens
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and takes it."""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    def _refill(self) -> None:
+        """Adds the tokens accumulated since the last refill."""
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits the number of concurrent operations with an AIMD window.
+
+    The window grows additively by `increase` per window of successful
+    operations and shrinks multiplicatively by `backoff` on every overload
+    signal, staying between `min_limit` and `max_limit`.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float,
+        min_limit: float,
+        max_limit: float,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+    ) -> None:
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.window = min(max(initial_limit, min_limit), max_limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        """Returns the current number of allowed concurrent operations."""
+        return max(1, int(self.window))
+
+    async def acquire(self) -> None:
+        """Waits until the number of operations in flight is under the limit."""
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+
+    async def release(self, success: bool | None) -> None:
+        """Releases an operation and adapts the window to its outcome.
+
+        Args:
+        - success (bool | None): True for a successful operation, False for an
+          overload signal and None for an outcome that must not affect the
+          window.
+        """
+        async with self._condition:
+            self.in_flight -= 1
+            if success:
+                self.window = min(
+                    self.max_limit, self.window + self.increase / self.window
+                )
+            elif success is not None:
+                self.window = max(self.min_limit, self.window * self.backoff)
+            self._condition.notify_all()
+
+
+class UpstreamSlot:
+    """Outcome holder of a single operation scheduled by `UpstreamScheduler`."""
+
+    def __init__(self) -> None:
+        self.overloaded = False
+
+
+class UpstreamScheduler:
+    """Process-wide scheduler of requests to the website.
+
+    Every request waits for a free place in the adaptive concurrency window and
+    then for a token of the rate limit budget.
+
+    Methods:
+    - `slot`: Context manager wrapping a single request.
+    - `metrics`: Returns the current state of the scheduler.
+    """
+
+    def __init__(
+        self, bucket: TokenBucket, limiter: AdaptiveConcurrencyLimiter
+    ) -> None:
+        self.bucket = bucket
+        self.limiter = limiter
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[UpstreamSlot]:
+        """Waits for a place to run a request and releases it afterwards.
+
+        The request is reported as overloaded when `overloaded` of the yielded
+        slot is set, as neutral when it raises an exception and as successful
+        otherwise.
+
+        Yields:
+        - UpstreamSlot: The outcome holder of the request.
+        """
+        await self.limiter.acquire()
+        slot = UpstreamSlot()
+        success = None
+        try:
+            await self.bucket.acquire()
+            yield slot
+            success = True
+        finally:
+            if slot.overloaded:
+                success = False
+            await self.limiter.release(success)
+
+    def metrics(self) -> dict[str, float]:
+        """Returns the queue depth, window and budget of the scheduler."""
+        return {
+            'queue_depth': self.limiter.waiting,
+            'in_flight': self.limiter.in_flight,
+            'window': round(self.limiter.window, 2),
+            'limit': self.limiter.limit,
+            'tokens': round(self.bucket.tokens, 2),
+        }
+
+
+upstream_scheduler = UpstreamScheduler(
+    bucket=TokenBucket(
+        rate=settings.UPSTREAM_RATE_LIMIT,
+        capacity=settings.UPSTREAM_RATE_BURST,
+    ),
+    limiter=AdaptiveConcurrencyLimiter(
+        initial_limit=settings.UPSTREAM_CONCURRENCY_INITIAL,
+        min_limit=settings.UPSTREAM_CONCURRENCY_MIN,
+        max_limit=settings.UPSTREAM_CONCURRENCY_MAX,
+        backoff=settings.UPSTREAM_CONCURRENCY_BACKOFF,
+    ),
+)
@@ -1,13 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.breaker import CircuitState, upstream_breaker
+from src.cache import upstream_cache
+from src.client import upstream_client
+from src.colors import color_dictionary
 from src.config import settings
+from src.database import async_session, engine, replica_set
+from src.history import product_history
+from src.limiter import upstream_scheduler
+from src.product_cache import product_cache
+from src.refresher import product_refresher
+from src.replicas import ReadYourWritesMiddleware
 from src.router import router as product_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Opens shared resources on startup and releases them on shutdown."""
+    upstream_client.start()
+    async with async_session() as session:
+        await color_dictionary.load(session)
+        await product_history.maintain(session)
+    tasks = []
+    if replica_set.replicas:
+        tasks.append(
+            asyncio.create_task(
+                replica_set.run_health_checks(settings.DB_REPLICA_HEALTH_INTERVAL)
+            )
+        )
+    if product_cache.channel is not None:
+        tasks.append(asyncio.create_task(product_cache.listen(engine)))
+    if settings.REFRESH_ENABLED:
+        tasks.append(asyncio.create_task(product_refresher.run()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        await upstream_client.close()
+        for replica in replica_set.replicas:
+            await replica.dispose()
+        await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(product_router)
 
+app.add_middleware(ReadYourWritesMiddleware, replica_set=replica_set)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
@@ -21,3 +69,24 @@ app.add_middleware(
     ),
     allow_headers=('*'),
 )
+
+
+@app.get('/health', tags=['Health'])
+async def health():
+    """Endpoint to report the state of the service and its upstream counters."""
+    return {
+        'status': (
+            'ok' if upstream_breaker.state == CircuitState.CLOSED else 'degraded'
+        ),
+        'upstream_breaker': upstream_breaker.metrics(),
+        'upstream_cache': upstream_cache.stats.as_dict(),
+        'upstream_scheduler': upstream_scheduler.metrics(),
+        'product_cache': product_cache.backend.stats.as_dict(),
+        'product_refresh': (
+            product_refresher.last_stats and product_refresher.last_stats.as_dict()
+        ),
+        'database_replicas': {
+            'configured': len(replica_set.replicas),
+            'healthy': len(replica_set.healthy),
+        },
+    }
@@ -0,0 +1,26 @@
+"""Product content hash
+
+Revision ID: 9a4c7e2b1d58
+Revises: 5e1f8a3b9c62
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c7e2b1d58'
+down_revision = '5e1f8a3b9c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'product', sa.Column('content_hash', sa.LargeBinary(length=16), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('product', 'content_hash')
@@ -0,0 +1,28 @@
+"""Product sale price keyset index
+
+Revision ID: 7c2d9e4f1a35
+Revises: 3b8e51c2d4a7
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2d9e4f1a35'
+down_revision = '3b8e51c2d4a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_product_sale_price_nm_id',
+        'product',
+        ['sale_price', sa.text('nm_id DESC')],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_sale_price_nm_id', table_name='product')
@@ -0,0 +1,37 @@
+"""Product snapshot history
+
+Revision ID: 3b8e6d1f4a27
+Revises: 9a4c7e2b1d58
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e6d1f4a27'
+down_revision = '9a4c7e2b1d58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'product_snapshot',
+        sa.Column('nm_id', sa.Integer(), nullable=False),
+        sa.Column('captured_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('price', sa.Integer(), nullable=False),
+        sa.Column('sale_price', sa.Integer(), nullable=False),
+        sa.Column('sale', sa.Integer(), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('nm_id', 'captured_at'),
+        postgresql_partition_by='RANGE (captured_at)',
+    )
+    op.execute(
+        'CREATE TABLE product_snapshot_default PARTITION OF product_snapshot DEFAULT'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('product_snapshot')
@@ -0,0 +1,44 @@
+"""Product stocks per size and warehouse
+
+Revision ID: 6d2f9b4e8c13
+Revises: 3b8e6d1f4a27
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6d2f9b4e8c13'
+down_revision = '3b8e6d1f4a27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'product_stock',
+        sa.Column('nm_id', sa.Integer(), nullable=False),
+        sa.Column('size', sa.String(length=64), nullable=False),
+        sa.Column('warehouse', sa.Integer(), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['nm_id'], ['product.nm_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('nm_id', 'size', 'warehouse'),
+    )
+    op.create_table(
+        'product_warehouse_stock',
+        sa.Column('nm_id', sa.Integer(), nullable=False),
+        sa.Column('warehouse', sa.Integer(), nullable=False),
+        sa.Column('qty', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['nm_id'], ['product.nm_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('nm_id', 'warehouse'),
+    )
+    # Existing products have no stocks yet: clearing their content hashes makes
+    # the next refresh rewrite every product, stocks included.
+    op.execute('UPDATE product SET content_hash = NULL')
+
+
+def downgrade() -> None:
+    op.drop_table('product_warehouse_stock')
+    op.drop_table('product_stock')
@@ -0,0 +1,34 @@
+"""Product updated_at version column
+
+Revision ID: 5e1f8a3b9c62
+Revises: 7c2d9e4f1a35
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1f8a3b9c62'
+down_revision = '7c2d9e4f1a35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'product',
+        sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('now()'),
+            nullable=False,
+        ),
+    )
+    op.create_index('ix_product_updated_at', 'product', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_product_updated_at', table_name='product')
+    op.drop_column('product', 'updated_at')
@@ -0,0 +1,56 @@
+"""Unique color name
+
+Revision ID: 3b8e51c2d4a7
+Revises: f9a06b99767c
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e51c2d4a7'
+down_revision = 'f9a06b99767c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Relink products from duplicate colors to the first color with the same
+    # name, then drop the duplicates before the constraint is created.
+    op.execute(
+        sa.text(
+            '''
+            CREATE TEMPORARY TABLE color_duplicate ON COMMIT DROP AS
+            SELECT color_id, first_color_id FROM (
+                SELECT color_id,
+                       min(color_id) OVER (PARTITION BY name) AS first_color_id
+                FROM color
+            ) AS colors
+            WHERE color_id <> first_color_id
+            '''
+        )
+    )
+    op.execute(
+        sa.text(
+            '''
+            INSERT INTO product_color_bridge_table (nm_id, color_id)
+            SELECT bridge.nm_id, duplicate.first_color_id
+            FROM product_color_bridge_table AS bridge
+            JOIN color_duplicate AS duplicate USING (color_id)
+            ON CONFLICT DO NOTHING
+            '''
+        )
+    )
+    op.execute(
+        sa.text(
+            'DELETE FROM color USING color_duplicate '
+            'WHERE color.color_id = color_duplicate.color_id'
+        )
+    )
+    op.create_unique_constraint('color_name_key', 'color', ['name'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('color_name_key', 'color', type_='unique')
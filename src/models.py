@@ -1,4 +1,18 @@
-from sqlalchemy import Column, ForeignKey, String, Table
+from datetime import datetime
+
+from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    LargeBinary,
+    String,
+    Table,
+    event,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.database import Base
@@ -35,6 +49,10 @@ class Product(Base):
         cascade='all, delete',
     )
     quantity: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+    content_hash: Mapped[bytes | None] = mapped_column(LargeBinary(16))
 
     def __repr__(self) -> str:
         """String representation of a Product model."""
@@ -45,13 +63,17 @@ class Product(Base):
         )
 
 
+Index('ix_product_sale_price_nm_id', Product.sale_price, Product.nm_id.desc())
+Index('ix_product_updated_at', Product.updated_at)
+
+
 class Color(Base):
     """Color model."""
 
     __tablename__ = 'color'
 
     color_id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(String(64))
+    name: Mapped[str] = mapped_column(String(64), unique=True)
     products: Mapped[list['Product']] = relationship(
         secondary=product_color_bridge_table,
         back_populates='colors',
@@ -62,3 +84,105 @@ class Color(Base):
         """String representation of a Color model."""
 
         return f'Color | {self.name}'
+
+
+class ProductSnapshot(Base):
+    """Price and stock of a product from the time they changed.
+
+    The table is partitioned by month of `captured_at`. Rows outside of the
+    monthly partitions, which are managed by `src.history`, go to the default
+    partition.
+    """
+
+    __tablename__ = 'product_snapshot'
+    __table_args__ = {'postgresql_partition_by': 'RANGE (captured_at)'}
+
+    nm_id: Mapped[int] = mapped_column(primary_key=True)
+    captured_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    price: Mapped[int]
+    sale_price: Mapped[int]
+    sale: Mapped[int]
+    quantity: Mapped[int]
+
+    def __repr__(self) -> str:
+        """String representation of a ProductSnapshot model."""
+
+        return (
+            f'ProductSnapshot(id={self.nm_id}), At={self.captured_at}, '
+            f'Price={self.price}, Quantity={self.quantity}'
+        )
+
+
+event.listen(
+    ProductSnapshot.__table__,
+    'after_create',
+    DDL('CREATE TABLE product_snapshot_default PARTITION OF product_snapshot DEFAULT'),
+)
+
+
+class ProductStock(Base):
+    """Quantity of a size of a product in a warehouse.
+
+    The `quantity` of a product is the sum of its stocks.
+    """
+
+    __tablename__ = 'product_stock'
+
+    nm_id: Mapped[int] = mapped_column(
+        ForeignKey('product.nm_id', ondelete='CASCADE'), primary_key=True
+    )
+    size: Mapped[str] = mapped_column(String(64), primary_key=True)
+    warehouse: Mapped[int] = mapped_column(primary_key=True)
+    qty: Mapped[int]
+
+    def __repr__(self) -> str:
+        """String representation of a ProductStock model."""
+
+        return (
+            f'ProductStock(id={self.nm_id}), Size={self.size}, '
+            f'Warehouse={self.warehouse}, Qty={self.qty}'
+        )
+
+
+class ProductWarehouseStock(Base):
+    """Quantity of a product in a warehouse summed over its sizes.
+
+    Rows are recomputed from `product_stock` whenever the stocks of the product
+    change.
+    """
+
+    __tablename__ = 'product_warehouse_stock'
+
+    nm_id: Mapped[int] = mapped_column(
+        ForeignKey('product.nm_id', ondelete='CASCADE'), primary_key=True
+    )
+    warehouse: Mapped[int] = mapped_column(primary_key=True)
+    qty: Mapped[int]
+
+    def __repr__(self) -> str:
+        """String representation of a ProductWarehouseStock model."""
+
+        return (
+            f'ProductWarehouseStock(id={self.nm_id}), '
+            f'Warehouse={self.warehouse}, Qty={self.qty}'
+        )
+
+
+class ProductListVersion(Base):
+    """Version of the whole product list.
+
+    The single row is bumped after every transaction that creates, changes or
+    removes products, so the version identifies the content of the list.
+    """
+
+    __tablename__ = 'product_list_version'
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    version: Mapped[int] = mapped_column(BigInteger)
+
+    def __repr__(self) -> str:
+        """String representation of a ProductListVersion model."""
+
+        return f'ProductListVersion(version={self.version})'
@@ -0,0 +1,119 @@
+import base64
+import binascii
+import time
+from typing import Callable
+
+import orjson
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.exceptions import InvalidCursor
+from src.models import Product
+from src.schemas import CountStrategy
+
+INT4_MIN, INT4_MAX = -(2**31), 2**31 - 1
+
+
+def encode_cursor(sale_price: int, nm_id: int) -> str:
+    """Encodes the sort key of the last product of a page into an opaque cursor.
+
+    Args:
+    - sale_price (int): The sale price of the last product of the page.
+    - nm_id (int): The ID of the last product of the page.
+
+    Returns:
+    - str: The URL-safe cursor of the next page.
+    """
+    return base64.urlsafe_b64encode(orjson.dumps([sale_price, nm_id])).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """Decodes a cursor returned by `encode_cursor`.
+
+    Args:
+    - cursor (str): The cursor of the page.
+
+    Raises:
+    - InvalidCursor: If the cursor was not produced by `encode_cursor` or its
+      values are outside of the `integer` range of the sort key columns.
+
+    Returns:
+    - tuple[int, int]: The sale price and the ID of the last product of the
+      previous page.
+    """
+    try:
+        key = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, binascii.Error):
+        raise InvalidCursor()
+    if (
+        not isinstance(key, list)
+        or len(key) != 2
+        or not all(
+            type(value) is int and INT4_MIN <= value <= INT4_MAX for value in key
+        )
+    ):
+        raise InvalidCursor()
+    return key[0], key[1]
+
+
+class ProductCounter:
+    """Counts all products with one of the `CountStrategy` strategies.
+
+    - `exact` runs `SELECT count(*)` over the product table.
+    - `cached` reuses an exact count for `ttl` seconds. The count is invalidated
+      when products are created or removed by this process.
+    - `estimate` reads the planner estimate `pg_class.reltuples`, falling back to
+      an exact count while the table has never been analyzed.
+
+    Methods:
+    - `count`: Counts all products with the requested strategy.
+    - `invalidate`: Forgets the cached exact count.
+    """
+
+    def __init__(self, ttl: float, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._cached: tuple[int, float] | None = None
+
+    async def count(
+        self, strategy: CountStrategy, session: AsyncSession
+    ) -> tuple[int, CountStrategy]:
+        """Counts all products with the requested strategy.
+
+        Args:
+        - strategy (CountStrategy): The requested strategy.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Returns:
+        - tuple[int, CountStrategy]: The number of products and the strategy that
+          actually produced it.
+        """
+        if strategy == CountStrategy.ESTIMATE:
+            estimate = await session.scalar(
+                select(text('reltuples::bigint'))
+                .select_from(text('pg_class'))
+                .where(text('oid = CAST(:table AS regclass)'))
+                .params(table=Product.__tablename__)
+            )
+            if estimate is not None and estimate >= 0:
+                return estimate, CountStrategy.ESTIMATE
+            strategy = CountStrategy.EXACT
+
+        if strategy == CountStrategy.CACHED and self._cached is not None:
+            total, counted_at = self._cached
+            if self._clock() - counted_at < self.ttl:
+                return total, CountStrategy.CACHED
+
+        total = await session.scalar(select(func.count()).select_from(Product))
+        if strategy == CountStrategy.CACHED:
+            self._cached = total, self._clock()
+        return total, strategy
+
+    def invalidate(self) -> None:
+        """Forgets the cached exact count."""
+        self._cached = None
+
+
+product_counter = ProductCounter(ttl=settings.PRODUCT_COUNT_CACHE_TTL)
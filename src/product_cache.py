@@ -0,0 +1,203 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Iterable, NamedTuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.sql import func
+
+from src.breaker import backoff_delay
+from src.cache import CacheBackend, InMemoryCache
+from src.config import settings
+from src.constants import PRODUCT_CACHE_KEY
+from src.utils import chunked
+
+logger = logging.getLogger(__name__)
+
+
+class SerializedProduct(NamedTuple):
+    """A product serialized as `ProductResponse` JSON with its version.
+
+    Attributes:
+    - updated_at (datetime): The time the product was last changed.
+    - body (bytes): The JSON of the product.
+    """
+
+    updated_at: datetime
+    body: bytes
+
+    def pack(self) -> bytes:
+        """Encodes the product to a single cache value."""
+        return self.updated_at.isoformat().encode() + b'\n' + self.body
+
+    @classmethod
+    def unpack(cls, value: bytes) -> 'SerializedProduct':
+        """Decodes a cache value produced by `pack`."""
+        updated_at, body = value.split(b'\n', 1)
+        return cls(datetime.fromisoformat(updated_at.decode()), body)
+
+
+class ProductCache:
+    """Read-through cache of serialized products.
+
+    Products are only changed when they are created, refreshed or removed, so
+    entries are invalidated explicitly by those paths and the TTL only bounds
+    how long a missed invalidation can serve a stale product. With a
+    notification `channel`, invalidations are published with Postgres `NOTIFY`
+    and applied by every worker listening on the channel.
+
+    Methods:
+    - `get`: Retrieves the serialized product.
+    - `set`: Stores a serialized product unless it was invalidated meanwhile.
+    - `generation`: The invalidation counter to pass to `set`.
+    - `publish`: Notifies the other workers of changed products.
+    - `invalidate`: Removes changed products from the cache of this worker.
+    - `listen`: Applies invalidations published by the other workers.
+    """
+
+    NOTIFY_CHUNK_SIZE = 500
+
+    def __init__(self, backend: CacheBackend, channel: str | None = None) -> None:
+        self.backend = backend
+        self.channel = channel
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """The number of invalidations applied by this process."""
+        return self._generation
+
+    async def get(self, product_id: int) -> SerializedProduct | None:
+        """Retrieves the serialized product, or None if it is not cached."""
+        value = await self.backend.get(PRODUCT_CACHE_KEY.format(nm_id=product_id))
+        return None if value is None else SerializedProduct.unpack(value)
+
+    async def set(
+        self, product_id: int, product: SerializedProduct, generation: int
+    ) -> None:
+        """Stores a serialized product read at the given generation.
+
+        The value is dropped when an invalidation was applied after the product
+        was read, so a read racing with a write can not cache the old product.
+
+        Args:
+        - product_id (int): The ID of the product.
+        - product (SerializedProduct): The serialized product.
+        - generation (int): The `generation` taken before reading the product.
+        """
+        if generation == self._generation:
+            await self.backend.set(
+                PRODUCT_CACHE_KEY.format(nm_id=product_id), product.pack()
+            )
+
+    async def publish(self, product_ids: Iterable[int], session: AsyncSession) -> None:
+        """Notifies the other workers of changed products.
+
+        Must be called within the transaction changing the products, Postgres
+        delivers the notifications when the transaction commits.
+
+        Args:
+        - product_ids (Iterable[int]): The IDs of the changed products.
+        - session (AsyncSession): The session of the transaction.
+        """
+        if self.channel is None:
+            return
+
+        for chunk in chunked(product_ids, self.NOTIFY_CHUNK_SIZE):
+            payload = ','.join(map(str, chunk))
+            await session.execute(select(func.pg_notify(self.channel, payload)))
+
+    async def invalidate(self, product_ids: Iterable[int]) -> None:
+        """Removes changed products from the cache of this worker.
+
+        Must be called after the transaction changing the products commits.
+
+        Args:
+        - product_ids (Iterable[int]): The IDs of the changed products.
+        """
+        await self._forget(product_ids)
+
+    async def listen(self, engine: AsyncEngine) -> None:
+        """Applies invalidations published on the channel until cancelled.
+
+        A lost connection is reopened with exponential backoff between
+        `PRODUCT_CACHE_RECONNECT_DELAY` and `PRODUCT_CACHE_RECONNECT_MAX_DELAY`
+        seconds. Notifications sent while the worker was not listening are
+        lost, so the local cache is cleared every time the worker starts
+        listening.
+
+        Args:
+        - engine (AsyncEngine): The engine of the primary database to listen on.
+        """
+        attempt = 0
+        while True:
+            try:
+                await self._listen_once(engine)
+                logger.warning('Product cache listener connection was closed')
+            except Exception as error:
+                logger.warning('Product cache listener failed: %r', error)
+            else:
+                attempt = 0
+            await asyncio.sleep(
+                backoff_delay(
+                    attempt,
+                    settings.PRODUCT_CACHE_RECONNECT_DELAY,
+                    settings.PRODUCT_CACHE_RECONNECT_MAX_DELAY,
+                )
+            )
+            attempt += 1
+
+    async def _listen_once(self, engine: AsyncEngine) -> None:
+        """Applies invalidations until the listening connection is closed."""
+        async with engine.connect() as connection:
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            closed = asyncio.Event()
+
+            def on_termination(_: Any) -> None:
+                closed.set()
+
+            driver_connection.add_termination_listener(on_termination)
+            await driver_connection.add_listener(self.channel, self._on_notification)
+            await self._reset()
+            try:
+                await closed.wait()
+            finally:
+                if driver_connection.is_closed():
+                    await connection.invalidate()
+                else:
+                    driver_connection.remove_termination_listener(on_termination)
+                    await driver_connection.remove_listener(
+                        self.channel, self._on_notification
+                    )
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str):
+        """Schedules removal of the products of a notification."""
+        try:
+            product_ids = [int(product_id) for product_id in payload.split(',')]
+        except ValueError:
+            logger.warning('Invalid product cache notification: %r', payload)
+            return
+        asyncio.ensure_future(self._forget(product_ids))
+
+    async def _reset(self) -> None:
+        """Removes every product from the local cache."""
+        self._generation += 1
+        await self.backend.clear()
+
+    async def _forget(self, product_ids: Iterable[int]) -> None:
+        """Removes products from the local cache."""
+        self._generation += 1
+        for product_id in product_ids:
+            await self.backend.delete(PRODUCT_CACHE_KEY.format(nm_id=product_id))
+
+
+product_cache = ProductCache(
+    InMemoryCache(
+        max_entries=settings.PRODUCT_CACHE_MAX_ENTRIES,
+        max_bytes=settings.PRODUCT_CACHE_MAX_BYTES,
+        default_ttl=settings.PRODUCT_CACHE_TTL,
+    ),
+    channel=settings.PRODUCT_CACHE_CHANNEL,
+)
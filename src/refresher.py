@@ -0,0 +1,224 @@
+"""Background refresh of stored products from the website.
+
+Run it as a separate worker with:
+    python -m src.refresher [--once]
+
+or in-process with the API by setting `REFRESH_ENABLED`.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.client import upstream_client
+from src.config import settings
+from src.database import async_session
+from src.exceptions import ProductNotFound
+from src.history import product_history
+from src.service import product_service
+from src.utils import get_products_data_from_website
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RefreshStats:
+    """Counters of a refresh pass over all stored products.
+
+    Attributes:
+    - batches: The number of batches written.
+    - changed: The number of products updated with changed data.
+    - unchanged: The number of fetched products whose content hash did not
+      change, they are not written.
+    - not_found: The number of products no longer found on the website.
+    - failed: The number of products that could not be fetched or written.
+    - failed_batches: The number of batches that failed as a whole, their
+      products are counted as failed.
+    - duration: Seconds the pass took.
+    """
+
+    batches: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    not_found: int = 0
+    failed: int = 0
+    failed_batches: int = 0
+    duration: float = 0.0
+
+    def as_dict(self) -> dict[str, int | float]:
+        """Returns the counters as a dictionary."""
+        return asdict(self)
+
+
+class ProductRefresher:
+    """Refreshes every stored product from the website periodically.
+
+    A pass walks the product table in id order in batches of `batch_size` ids.
+    Every batch is fetched from the website with the batched path, bypassing
+    the upstream cache, and written back with a single bulk update. Up to
+    `concurrency` batches are processed at once, every one with its own
+    session. A batch that fails is logged and counted without stopping the
+    pass. Every pass first creates the upcoming partitions of the product
+    history.
+
+    Methods:
+    - `refresh_all`: Refreshes every stored product once.
+    - `refresh_batch`: Refreshes the products of a batch of ids.
+    - `run`: Refreshes all products every `interval` seconds until cancelled.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        interval: float,
+        batch_size: int,
+        concurrency: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.last_stats: RefreshStats | None = None
+        self._clock = clock
+
+    async def refresh_all(self) -> RefreshStats:
+        """Refreshes every stored product once.
+
+        The batches still running when the pass fails or is cancelled are
+        cancelled and awaited before it returns.
+
+        Returns:
+        - RefreshStats: The counters of the pass.
+        """
+        started_at = self._clock()
+        stats = RefreshStats()
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        async with self.session_factory() as session:
+            await product_history.maintain(session)
+
+        async def refresh(nm_ids: list[int]) -> None:
+            try:
+                await self.refresh_batch(nm_ids, stats)
+            finally:
+                slots.release()
+
+        last_id = None
+        try:
+            while nm_ids := await self._get_ids_after(last_id):
+                last_id = nm_ids[-1]
+                await slots.acquire()
+                tasks.append(asyncio.create_task(refresh(nm_ids)))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        stats.duration = self._clock() - started_at
+        self.last_stats = stats
+        return stats
+
+    async def refresh_batch(self, nm_ids: list[int], stats: RefreshStats) -> None:
+        """Refreshes the products of a batch of ids.
+
+        A batch that can not be fetched or written is logged and its products
+        are counted as failed, instead of failing the pass.
+
+        Args:
+        - nm_ids (list[int]): The ids of the products.
+        - stats (RefreshStats): The counters to update.
+        """
+        try:
+            batch = await get_products_data_from_website(nm_ids, use_cache=False)
+        except Exception:
+            logger.exception(
+                'Fetching refreshed products %s..%s failed', nm_ids[0], nm_ids[-1]
+            )
+            stats.failed += len(nm_ids)
+            stats.failed_batches += 1
+            return
+        for error in batch.errors.values():
+            if isinstance(error, ProductNotFound):
+                stats.not_found += 1
+            else:
+                stats.failed += 1
+
+        try:
+            async with self.session_factory() as session:
+                changed_ids = await product_service.refresh_products(
+                    batch.products.values(), session
+                )
+        except Exception:
+            logger.exception(
+                'Writing refreshed products %s..%s failed', nm_ids[0], nm_ids[-1]
+            )
+            stats.failed += len(batch.products)
+            stats.failed_batches += 1
+            return
+        stats.batches += 1
+        stats.changed += len(changed_ids)
+        stats.unchanged += len(batch.products) - len(changed_ids)
+
+    async def _get_ids_after(self, last_id: int | None) -> list[int]:
+        """Retrieves the next batch of ids in a short-lived session."""
+        async with self.session_factory() as session:
+            return await product_service.get_ids_after(
+                last_id, self.batch_size, session
+            )
+
+    async def run(self) -> None:
+        """Refreshes all products every `interval` seconds until cancelled.
+
+        A pass that fails is logged and retried at the next interval.
+        """
+        while True:
+            started_at = self._clock()
+            try:
+                stats = await self.refresh_all()
+            except Exception:
+                logger.exception('Product refresh failed')
+            else:
+                logger.info('Products refreshed: %s', stats.as_dict())
+            await asyncio.sleep(max(0.0, self.interval - (self._clock() - started_at)))
+
+
+product_refresher = ProductRefresher(
+    async_session,
+    interval=settings.REFRESH_INTERVAL,
+    batch_size=settings.REFRESH_BATCH_SIZE,
+    concurrency=settings.REFRESH_CONCURRENCY,
+)
+
+
+async def run_worker(once: bool) -> None:
+    """Runs the refresher outside of the API process."""
+    upstream_client.start()
+    try:
+        if once:
+            stats = await product_refresher.refresh_all()
+            logger.info('Products refreshed: %s', stats.as_dict())
+        else:
+            await product_refresher.run()
+    finally:
+        await upstream_client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        '--once', action='store_true', help='refresh all products once and exit'
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker(args.once))
+
+
+if __name__ == '__main__':
+    main()
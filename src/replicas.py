@@ -0,0 +1,249 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from typing import Any, Callable, Hashable, Sequence
+
+from sqlalchemy import Delete, Insert, Update, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CLIENT_INFO_KEY = 'client'
+WRITTEN_INFO_KEY = 'written'
+PINNED_INFO_KEY = 'pinned'
+PRIMARY_BIND_KEY = 'primary'
+SESSION_INFO_STATE_KEY = 'session_info'
+PIN_COOKIE = 'read_primary_until'
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicaSet:
+    """Primary database engine with optional read replicas.
+
+    Reads are spread over the healthy replicas round-robin and fall back to the
+    primary when no replica is healthy. A client that has written recently is
+    pinned to the primary for `pin_window` seconds, so it reads its own writes
+    regardless of the replication lag.
+
+    The pins of clients are kept by this process and hold only for the requests
+    handled by the same worker. Across workers, a client is pinned by the token
+    of `pin_token` it sends back with its next requests, the wall-clock time
+    the pin expires at.
+
+    Methods:
+    - `choose`: Returns the engine to run a read of a client on.
+    - `pin`: Pins a client to the primary after a write.
+    - `is_pinned`: Returns whether a client reads from the primary.
+    - `pin_token`: Returns a token pinning the reads of a client in any worker.
+    - `is_token_pinned`: Returns whether a pin token is still valid.
+    - `check_health`: Checks every replica with a trivial query.
+    - `run_health_checks`: Checks the replicas periodically.
+    """
+
+    MAX_PINS = 10000
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: Sequence[AsyncEngine] = (),
+        pin_window: float = 5.0,
+        health_timeout: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.pin_window = pin_window
+        self.health_timeout = health_timeout
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._healthy = list(self.replicas)
+        self._next = itertools.count()
+        self._pins: dict[Hashable, float] = {}
+
+    @property
+    def healthy(self) -> list[AsyncEngine]:
+        """Returns the replicas that passed the last health check."""
+        return list(self._healthy)
+
+    def choose(self, client: Hashable | None = None) -> AsyncEngine:
+        """Returns the engine to run a read of the client on.
+
+        Args:
+        - client (Hashable | None): The key of the client issuing the read.
+
+        Returns:
+        - AsyncEngine: The next healthy replica, or the primary when the client
+          is pinned or no replica is healthy.
+        """
+        healthy = self._healthy
+        if not healthy or self.is_pinned(client):
+            return self.primary
+        return healthy[next(self._next) % len(healthy)]
+
+    def pin(self, client: Hashable | None) -> None:
+        """Pins the client to the primary for `pin_window` seconds.
+
+        At most `MAX_PINS` clients are pinned. Once the limit is reached, the
+        expired pins are dropped and, if none has expired, the oldest pin is
+        evicted.
+        """
+        if client is None or self.pin_window <= 0:
+            return
+
+        now = self._clock()
+        self._pins.pop(client, None)
+        if len(self._pins) >= self.MAX_PINS:
+            self._pins = {
+                key: expires_at
+                for key, expires_at in self._pins.items()
+                if expires_at > now
+            }
+            if len(self._pins) >= self.MAX_PINS:
+                del self._pins[next(iter(self._pins))]
+        self._pins[client] = now + self.pin_window
+
+    def is_pinned(self, client: Hashable | None) -> bool:
+        """Returns whether reads of the client must go to the primary."""
+        if client is None:
+            return False
+        return self._pins.get(client, 0.0) > self._clock()
+
+    def pin_token(self) -> str:
+        """Returns a token pinning reads to the primary for `pin_window` seconds."""
+        return f'{self._wall_clock() + self.pin_window:.3f}'
+
+    def is_token_pinned(self, token: str | None) -> bool:
+        """Returns whether a token returned by `pin_token` has not expired.
+
+        A token expiring later than a pin issued now is rejected, so a forged
+        token can not pin a client to the primary for longer than `pin_window`.
+        """
+        if token is None:
+            return False
+        try:
+            expires_at = float(token)
+        except ValueError:
+            return False
+        now = self._wall_clock()
+        return now < expires_at <= now + self.pin_window
+
+    async def check_health(self) -> None:
+        """Checks every replica with `SELECT 1` and keeps the responsive ones."""
+        results = await asyncio.gather(
+            *(self._check_replica(replica) for replica in self.replicas)
+        )
+        self._healthy = [
+            replica for replica, healthy in zip(self.replicas, results) if healthy
+        ]
+
+    async def run_health_checks(self, interval: float) -> None:
+        """Checks the replicas every `interval` seconds until cancelled."""
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    async def _check_replica(self, replica: AsyncEngine) -> bool:
+        """Returns whether the replica answers a trivial query in time."""
+        try:
+            async with replica.connect() as connection:
+                await asyncio.wait_for(
+                    connection.execute(text('SELECT 1')), self.health_timeout
+                )
+        except Exception as error:
+            logger.warning('Replica %s is unhealthy: %r', replica.url, error)
+            return False
+        return True
+
+
+class RoutingSession(Session):
+    """Session sending reads to the replicas and writes to the primary.
+
+    The reads of a session stay on the replica chosen for its first read. Once
+    a session has written or flushed, every following statement of the session
+    runs on the primary and the client stored in `info` under `CLIENT_INFO_KEY`
+    is pinned to the primary for the read-your-writes window. The reads of a
+    session with `PINNED_INFO_KEY` set in `info` and a read executed with
+    `bind_arguments={PRIMARY_BIND_KEY: True}` run on the primary without
+    pinning the client.
+    """
+
+    def __init__(self, *args: Any, replica_set: ReplicaSet, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.replica_set = replica_set
+        self._read_engine: AsyncEngine | None = None
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Engine:
+        replica_set = self.replica_set
+        if not replica_set.replicas:
+            return replica_set.primary.sync_engine
+
+        if isinstance(clause, (Insert, Update, Delete)) or self.info.get(
+            WRITTEN_INFO_KEY
+        ):
+            self.mark_written()
+            return replica_set.primary.sync_engine
+        if kwargs.get(PRIMARY_BIND_KEY) or self.info.get(PINNED_INFO_KEY):
+            return replica_set.primary.sync_engine
+        if self._read_engine is None:
+            self._read_engine = replica_set.choose(self.info.get(CLIENT_INFO_KEY))
+        return self._read_engine.sync_engine
+
+    def mark_written(self) -> None:
+        """Routes the following statements to the primary and pins the client."""
+        self.info[WRITTEN_INFO_KEY] = True
+        self.replica_set.pin(self.info.get(CLIENT_INFO_KEY))
+
+    def close(self) -> None:
+        super().close()
+        self._read_engine = None
+
+
+@event.listens_for(RoutingSession, 'before_flush')
+def mark_flush_written(session: RoutingSession, *args: Any) -> None:
+    """Routes a flush and the statements following it to the primary."""
+    if session.replica_set.replicas:
+        session.mark_written()
+
+
+class ReadYourWritesMiddleware:
+    """Sets the pin token cookie on the responses of requests that wrote.
+
+    The session of a request stores its `info` in the request state under
+    `SESSION_INFO_STATE_KEY`. When the session has written by the time the
+    response starts, `PIN_COOKIE` is set to a token of `ReplicaSet.pin_token`,
+    so the next requests of the client read from the primary in every worker.
+    """
+
+    def __init__(self, app: ASGIApp, replica_set: ReplicaSet) -> None:
+        self.app = app
+        self.replica_set = replica_set
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        replica_set = self.replica_set
+        if (
+            scope['type'] != 'http'
+            or not replica_set.replicas
+            or replica_set.pin_window <= 0
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                info = scope.get('state', {}).get(SESSION_INFO_STATE_KEY) or {}
+                if info.get(WRITTEN_INFO_KEY):
+                    MutableHeaders(scope=message).append(
+                        'set-cookie',
+                        f'{PIN_COOKIE}={replica_set.pin_token()}; '
+                        f'Max-Age={math.ceil(replica_set.pin_window)}; Path=/; '
+                        'HttpOnly; SameSite=lax',
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
@@ -0,0 +1,103 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+import orjson
+from fastapi import Request, status
+from fastapi.responses import Response
+
+from src.config import settings
+
+
+class RawJSONResponse(Response):
+    """JSON response rendered straight from plain data with orjson.
+
+    The content is not validated against a response model, so it must already
+    have the shape and the field order of the schema it stands for. For such
+    content the body is byte-identical to the one of `JSONResponse`. Content
+    that is already encoded is sent as it is.
+    """
+
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        """Encodes the content to JSON bytes."""
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content)
+
+
+def make_etag(*parts: Any) -> str:
+    """Builds a strong entity tag from the parts identifying a representation.
+
+    Args:
+    - parts: The values the representation is fully determined by.
+
+    Returns:
+    - str: The quoted entity tag.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b'\0')
+    return f'"{digest.hexdigest()}"'
+
+
+def cache_headers(etag: str, last_modified: datetime | None = None) -> dict[str, str]:
+    """Returns the validator and `Cache-Control` headers of a response.
+
+    Args:
+    - etag (str): The entity tag of the representation.
+    - last_modified (datetime | None): The time the representation last changed.
+
+    Returns:
+    - dict[str, str]: The headers of the response.
+    """
+    headers = {'ETag': etag, 'Cache-Control': settings.PRODUCT_CACHE_CONTROL}
+    if last_modified is not None:
+        headers['Last-Modified'] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime | None = None
+) -> bool:
+    """Checks whether the client already has the current representation.
+
+    `If-None-Match` takes precedence over `If-Modified-Since`, which is only
+    evaluated when the representation has a modification time.
+
+    Args:
+    - request (Request): The incoming request.
+    - etag (str): The entity tag of the current representation.
+    - last_modified (datetime | None): The time the representation last changed.
+
+    Returns:
+    - bool: True if the response can be `304 Not Modified`.
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or etag in tags
+
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        modified_since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if modified_since.tzinfo is None:
+        return False
+    return last_modified.replace(microsecond=0) <= modified_since
+
+
+def not_modified_response(etag: str, last_modified: datetime | None = None) -> Response:
+    """Returns `304 Not Modified` with the validators of the representation."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cache_headers(etag, last_modified),
+    )
@@ -1,15 +1,40 @@
-from fastapi import APIRouter, Depends, status
-from fastapi_pagination import Page
+from typing import Any
+
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.constants import AdditionalResponses
+from src.bulk import import_products
+from src.config import settings
+from src.constants import BULK_REQUEST_BODY, AdditionalResponses
 from src.dependencies import (
     get_async_session,
-    validate_product_exists,
+    parse_bulk_request,
     validate_unique_product,
 )
-from src.schemas import CustomParams, ProductRequest, ProductResponse
+from src.exceptions import InvalidTimeRange, ProductDoesNotExist
+from src.history import default_history_range, product_history
+from src.responses import (
+    RawJSONResponse,
+    cache_headers,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+)
+from src.schemas import (
+    CursorParams,
+    CustomParams,
+    HistoryParams,
+    ProductCursorPage,
+    ProductHistory,
+    ProductPage,
+    ProductRequest,
+    ProductResponse,
+    ProductStocksResponse,
+)
 from src.service import product_service
+from src.singleflight import SingleFlight
+from src.stocks import stock_service
 from src.utils import get_product_data_from_website
 
 router = APIRouter(
@@ -19,13 +44,101 @@ router = APIRouter(
     ],
 )
 
+product_creation = SingleFlight()
+
+
+def raw_response(
+    content: dict[str, Any], response: Response, headers: dict[str, str]
+) -> dict[str, Any] | RawJSONResponse:
+    """Returns rows read from the database as JSON bytes when
+    `PRODUCT_RAW_RESPONSES` is enabled.
+
+    The rows already have the shape and the field order of the response model,
+    so they are encoded by orjson without validating and converting them again.
+    Otherwise the content is returned as it is and FastAPI validates it against
+    the response model of the endpoint.
+
+    Args:
+    - content (dict): A product or a page of products read from the database.
+    - response (Response): The response of the endpoint to add headers to.
+    - headers (dict): The headers of the response.
+
+    Returns:
+    - The response rendered from the content, or the content itself.
+    """
+    if settings.PRODUCT_RAW_RESPONSES:
+        return RawJSONResponse(content, headers=headers)
+    response.headers.update(headers)
+    return content
+
+
+async def get_list_etag(request: Request, session: AsyncSession) -> str:
+    """Builds the entity tag of a page of the product list.
+
+    The tag is derived from the version of the whole list and the query of the
+    page, so it is checked without reading the page.
+    """
+    version = await product_service.get_products_version(session)
+    return make_etag(request.url.path, request.url.query, version)
+
 
-@router.get('/all', response_model=Page[ProductResponse])
+@router.get('/all', response_model=ProductPage)
 async def get_all_products(
-    params: CustomParams = Depends(), session: AsyncSession = Depends(get_async_session)
+    request: Request,
+    response: Response,
+    params: CustomParams = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Endpoint to retrieve all products from the database.
+
+    - **count** (str): The strategy of counting all products: `exact`, `cached`
+      for an exact count reused for a short time or `estimate` for the planner
+      estimate. `total_strategy` of the page tells which one produced `total`.
+
+    Responds with `304 Not Modified` when `If-None-Match` has the `ETag` of the
+    page.
+    """
+    etag = await get_list_etag(request, session)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return raw_response(
+        await product_service.get_product_multi(params, session),
+        response,
+        cache_headers(etag),
+    )
+
+
+@router.get(
+    '/all/cursor',
+    response_model=ProductCursorPage,
+    responses={**AdditionalResponses.PRODUCT_LIST_CURSOR},
+)
+async def get_products_page(
+    request: Request,
+    response: Response,
+    params: CursorParams = Depends(),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    """Endpoint to retrieve all products from the database."""
-    return await product_service.get_product_multi(params, session)
+    """
+    Endpoint to iterate over all products with keyset pagination.
+
+    - **size** (int): The number of products on a page.
+    - **cursor** (str): The `next_cursor` of the previous page, omit it for the
+      first page.
+    - **count** (str): The strategy of counting all products, omit it to skip
+      counting.
+
+    Responds with `304 Not Modified` when `If-None-Match` has the `ETag` of the
+    page.
+    """
+    etag = await get_list_etag(request, session)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return raw_response(
+        await product_service.get_product_page(params, session),
+        response,
+        cache_headers(etag),
+    )
 
 
 @router.get(
@@ -34,14 +147,96 @@ async def get_all_products(
     responses={**AdditionalResponses.PRODUCT_GET_DELETE},
 )
 async def get_single_product(
-    product_id: int = Depends(validate_product_exists),
+    request: Request,
+    product_id: int,
     session: AsyncSession = Depends(get_async_session),
 ):
     """Endpoint to retrieve a single product by ID from the database.
 
     - **product_id** (int): The ID of the product to be retrieved (path parameter).
+
+    Responds with `304 Not Modified` when `If-None-Match` has the `ETag` of the
+    product or it has not changed since `If-Modified-Since`. The check reads
+    only the version of the product.
     """
-    return await product_service.get_product(product_id, session)
+    if 'if-none-match' in request.headers or 'if-modified-since' in request.headers:
+        updated_at = await product_service.get_product_version(product_id, session)
+        if updated_at is None:
+            raise ProductDoesNotExist()
+        etag = make_etag(product_id, updated_at)
+        if is_not_modified(request, etag, updated_at):
+            return not_modified_response(etag, updated_at)
+
+    product = await product_service.get_product_json(product_id, session)
+    if product is None:
+        raise ProductDoesNotExist()
+    return RawJSONResponse(
+        product.body,
+        headers=cache_headers(
+            make_etag(product_id, product.updated_at), product.updated_at
+        ),
+    )
+
+
+@router.get(
+    '/{product_id}/history',
+    response_model=ProductHistory,
+    responses={**AdditionalResponses.PRODUCT_HISTORY},
+)
+async def get_product_history(
+    product_id: int,
+    params: HistoryParams = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Endpoint to retrieve the price and stock history of a product.
+
+    - **product_id** (int): The ID of the product (path parameter).
+    - **start** (datetime): The start of the range, 30 days before its end by
+      default.
+    - **end** (datetime): The end of the range, now by default.
+    - **interval** (str): `hour`, `day` or `week` to downsample the history into
+      the minimum, maximum and last values of every bucket in UTC, `raw` for
+      every change.
+
+    History is kept for removed products as well, an unknown product has no
+    points. At most `HISTORY_MAX_POINTS` first points are returned, `truncated`
+    tells that the range has more of them.
+    """
+    start, end = default_history_range(params.start, params.end)
+    if start >= end:
+        raise InvalidTimeRange()
+    points, truncated = await product_history.get_history(
+        product_id, start, end, params.interval, session
+    )
+    return {
+        'nm_id': product_id,
+        'start': start,
+        'end': end,
+        'interval': params.interval,
+        'points': points,
+        'truncated': truncated,
+    }
+
+
+@router.get(
+    '/{product_id}/stocks',
+    response_model=ProductStocksResponse,
+    responses={**AdditionalResponses.PRODUCT_GET_DELETE},
+)
+async def get_product_stocks(
+    product_id: int, session: AsyncSession = Depends(get_async_session)
+):
+    """Endpoint to retrieve the stocks of a product per size and warehouse.
+
+    - **product_id** (int): The ID of the product (path parameter).
+
+    `quantity` is the total of all stocks and `warehouses` has the totals of
+    every warehouse over all sizes.
+    """
+    stocks = await stock_service.get_stocks(product_id, session)
+    if stocks is None:
+        raise ProductDoesNotExist()
+    return stocks
 
 
 @router.post(
@@ -60,9 +255,40 @@ async def create_new_product(
 
     - **product_id** (int): The ID of the product to be fetched and created
       (query parameter).
+
+    Concurrent requests for the same ID share a single fetch and insert.
     """
-    colors, product_info = get_product_data_from_website(product_id.nm_id)
-    return await product_service.create_product(product_info, colors, session)
+
+    async def create_product():
+        colors, product_info = await get_product_data_from_website(product_id.nm_id)
+        return await product_service.create_product(product_info, colors, session)
+
+    return await product_creation.do(product_id.nm_id, create_product)
+
+
+@router.post(
+    '/bulk',
+    response_class=StreamingResponse,
+    responses={**AdditionalResponses.PRODUCT_BULK_CREATE},
+    openapi_extra=BULK_REQUEST_BODY,
+)
+async def create_products_bulk(
+    nm_ids: list[int] = Depends(parse_bulk_request),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Endpoint to import many products from the website at once.
+
+    Accepts a JSON array or NDJSON lines of product ids and streams back one
+    NDJSON line per id with its status: `created`, `already_exists`,
+    `not_found` or `upstream_error`.
+    """
+
+    async def stream_results():
+        async for result in import_products(nm_ids, session):
+            yield result.json() + '\n'
+
+    return StreamingResponse(stream_results(), media_type='application/x-ndjson')
 
 
 @router.delete(
@@ -71,11 +297,11 @@ async def create_new_product(
     responses={**AdditionalResponses.PRODUCT_GET_DELETE},
 )
 async def delete_product(
-    product_id: int = Depends(validate_product_exists),
-    session: AsyncSession = Depends(get_async_session),
+    product_id: int, session: AsyncSession = Depends(get_async_session)
 ):
     """Endpoint to delete a product by ID.
 
     - **product_id** (int): The ID of the product to be deleted (path parameter).
     """
-    return await product_service.remove_product(product_id, session)
+    if not await product_service.remove_product(product_id, session):
+        raise ProductDoesNotExist()
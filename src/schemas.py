@@ -1,12 +1,36 @@
+from datetime import datetime
+from enum import Enum
+
 from fastapi import Query
-from fastapi_pagination import Params
+from fastapi_pagination import Page, Params
 from pydantic import BaseModel, Field, NonNegativeInt
 
 
+class CountStrategy(str, Enum):
+    """Strategy of counting all products of a paginated listing."""
+
+    EXACT = 'exact'
+    CACHED = 'cached'
+    ESTIMATE = 'estimate'
+
+
 class CustomParams(Params):
     """Custom parameters for all products pagination."""
 
     size: int = Query(10, ge=1, le=50, description="Page size")
+    count: CountStrategy = Query(
+        CountStrategy.EXACT, description="Strategy of counting all products"
+    )
+
+
+class CursorParams(BaseModel):
+    """Parameters for all products keyset pagination."""
+
+    size: int = Query(10, ge=1, le=50, description="Page size")
+    cursor: str | None = Query(None, description="Cursor of the next page")
+    count: CountStrategy | None = Query(
+        None, description="Strategy of counting all products, omit to skip counting"
+    )
 
 
 class ORMMode(BaseModel):
@@ -97,3 +121,131 @@ class ProductRequest(BaseModel):
         schema_extra = {
             'example': {'nm_id': 139760619},
         }
+
+
+class BulkItemStatus(str, Enum):
+    """Outcome of importing a single product in a bulk request."""
+
+    CREATED = 'created'
+    ALREADY_EXISTS = 'already_exists'
+    NOT_FOUND = 'not_found'
+    UPSTREAM_ERROR = 'upstream_error'
+
+
+class BulkItemResult(BaseModel):
+    """Result line of a bulk product import."""
+
+    nm_id: NonNegativeInt
+    status: BulkItemStatus
+    detail: str | None = None
+
+
+class HistoryInterval(str, Enum):
+    """Size of the buckets the history of a product is downsampled into."""
+
+    RAW = 'raw'
+    HOUR = 'hour'
+    DAY = 'day'
+    WEEK = 'week'
+
+
+class HistoryParams(BaseModel):
+    """Parameters of the history of a product."""
+
+    start: datetime | None = Query(
+        None, description="Start of the range, 30 days before the end by default"
+    )
+    end: datetime | None = Query(None, description="End of the range, now by default")
+    interval: HistoryInterval = Query(
+        HistoryInterval.DAY, description="Size of the buckets, raw for every change"
+    )
+
+
+class SnapshotStats(BaseModel):
+    """Minimum, maximum and last value of a column in a history bucket."""
+
+    min: int
+    max: int
+    last: int
+
+
+class ProductHistoryPoint(BaseModel):
+    """Price and stock of a product in a history bucket."""
+
+    time: datetime
+    price: SnapshotStats
+    sale_price: SnapshotStats
+    sale: SnapshotStats
+    quantity: SnapshotStats
+
+
+class ProductHistory(BaseModel):
+    """History of the price and stock of a product over a time range.
+
+    `truncated` is set when the range has more than `HISTORY_MAX_POINTS` points
+    and only the first of them are returned.
+    """
+
+    nm_id: int
+    start: datetime
+    end: datetime
+    interval: HistoryInterval
+    points: list[ProductHistoryPoint]
+    truncated: bool = False
+
+
+class StockResponse(BaseModel):
+    """Quantity of a size of a product in a warehouse."""
+
+    size: str
+    warehouse: int
+    qty: int
+
+
+class WarehouseStockResponse(BaseModel):
+    """Quantity of a product in a warehouse over all its sizes."""
+
+    warehouse: int
+    qty: int
+
+
+class ProductStocksResponse(BaseModel):
+    """Stocks of a product per size and warehouse with the warehouse totals."""
+
+    nm_id: int
+    quantity: int
+    warehouses: list[WarehouseStockResponse]
+    stocks: list[StockResponse]
+
+    class Config:
+        schema_extra = {
+            'example': {
+                'nm_id': 111,
+                'quantity': 12,
+                'warehouses': [
+                    {'warehouse': 507, 'qty': 10},
+                    {'warehouse': 117986, 'qty': 2},
+                ],
+                'stocks': [
+                    {'size': '44', 'warehouse': 507, 'qty': 7},
+                    {'size': '44', 'warehouse': 117986, 'qty': 2},
+                    {'size': '46', 'warehouse': 507, 'qty': 3},
+                ],
+            }
+        }
+
+
+class ProductCursorPage(BaseModel):
+    """Page of products retrieved with keyset pagination."""
+
+    items: list[ProductResponse]
+    size: int
+    next_cursor: str | None = None
+    total: int | None = None
+    total_strategy: CountStrategy | None = None
+
+
+class ProductPage(Page[ProductResponse]):
+    """Page of products retrieved with offset pagination."""
+
+    total_strategy: CountStrategy
@@ -1,12 +1,92 @@
-from typing import Any, Sequence
+import hashlib
+from datetime import datetime
+from math import ceil
+from typing import Any, Iterable
 
-from fastapi_pagination.ext.sqlalchemy import paginate
-from sqlalchemy import delete, desc, select
+import orjson
+from sqlalchemy import (
+    JSON,
+    Select,
+    cast,
+    delete,
+    desc,
+    exists,
+    func,
+    insert,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 
-from src.models import Color, Product
-from src.schemas import CustomParams, ProductCreate
+from src.colors import color_dictionary
+from src.config import settings
+from src.exceptions import ProductAlreadyExists
+from src.history import SNAPSHOT_COLUMNS, product_history
+from src.models import Color, Product, ProductListVersion, product_color_bridge_table
+from src.pagination import decode_cursor, encode_cursor, product_counter
+from src.product_cache import SerializedProduct, product_cache
+from src.replicas import PRIMARY_BIND_KEY
+from src.schemas import CursorParams, CustomParams, ProductCreate
+from src.stocks import stock_service
+
+PRODUCTS_INFO_KEY = 'products'
+HIDDEN_COLUMNS = {'updated_at', 'content_hash'}
+REFRESHED_COLUMNS = (
+    'name',
+    'brand',
+    'brand_id',
+    'site_brand_id',
+    'supplier_id',
+    'sale',
+    'price',
+    'sale_price',
+    'rating',
+    'feedbacks',
+    'quantity',
+)
+
+
+def content_hash(product_data: dict[str, Any], colors: Iterable[str | None]) -> bytes:
+    """Computes a stable hash of the stored content of a product.
+
+    The hash covers the `REFRESHED_COLUMNS` of the parsed product data, the
+    set of its color names and its stocks, so it changes exactly when a
+    refresh has to write the product, its colors or its stocks.
+
+    Args:
+    - product_data (dict): The parsed data of the product.
+    - colors (Iterable[str | None]): The color names of the product.
+
+    Returns:
+    - bytes: The 16 bytes BLAKE2b digest of the content.
+    """
+    content = orjson.dumps(
+        [
+            [product_data[name] for name in REFRESHED_COLUMNS],
+            sorted(set(colors), key=str),
+            product_data['stocks'],
+        ]
+    )
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def product_row(
+    product_data: dict[str, Any], colors: Iterable[str | None]
+) -> dict[str, Any]:
+    """Builds the row of a product from its parsed data.
+
+    The stocks of the product are stored in `product_stock`, the row keeps
+    their total `quantity` and the `content_hash` of the product.
+    """
+    row = {name: value for name, value in product_data.items() if name != 'stocks'}
+    row['content_hash'] = content_hash(product_data, colors)
+    return row
 
 
 class ProductService:
@@ -17,47 +97,240 @@ class ProductService:
 
     Methods:
     - `get_product`: Retrieves a product from the database by its unique identifier.
+    - `get_product_json`: Retrieves a serialized product through the product cache.
+    - `get_product_version`: Retrieves the time a product was last changed.
+    - `get_products_version`: Retrieves the version of the whole product list.
+    - `bump_products_version`: Moves the version of the product list forward.
+    - `select_products`: Builds a query of products with their colors aggregated.
+    - `product_exists`: Checks whether a product is stored without loading it.
     - `get_product_multi`: Retrieves multiple products from the database.
+    - `get_product_page`: Retrieves a page of products with keyset pagination.
     - `create_product`: Creates a new product in the database with the provided data.
+    - `create_products_bulk`: Creates many products with multi-row inserts.
+    - `get_existing_ids`: Retrieves which of the given product ids are stored.
+    - `get_ids_after`: Retrieves a batch of stored product ids in id order.
+    - `refresh_products`: Updates changed products with a single bulk update.
+    - `replace_product_colors`: Writes the changed links of products to colors.
     - `remove_product`: Removes a product from the database by its unique identifier.
-    - `get_color_by_name`: Retrieves a color from the database by its name.
+    - `add_product_colors`: Links products to their colors with multi-row inserts.
     """
 
     def __init__(self, model):
         self.model = model
 
     async def get_product(
-        self, product_id: int, session: AsyncSession
-    ) -> Product | None:
+        self, product_id: int, session: AsyncSession, primary: bool = False
+    ) -> dict[str, Any] | None:
         """Retrieves a product from the database by its unique identifier.
 
         Args:
         - product_id (int): The ID of the product to retrieve.
         - session (AsyncSession): The async SQLAlchemy session to use for database
           operations.
+        - primary (bool): Whether the product is read from the primary database
+          instead of a replica.
 
         Raises:
         - None
 
         Returns:
-        - Union[Product, None]: The product with the specified ID if it exists in
-          the database, or None if it does not exist.
+        - Union[dict, None]: The fields of the product with its colors and
+          `updated_at` if it exists in the database, or None if it does not exist.
+
+        Note:
+        - Retrieved products are kept in the `info` of the session, so repeated
+          lookups within a request are served without a query. Reads from the
+          primary always query it.
         """
+        products = session.info.setdefault(PRODUCTS_INFO_KEY, {})
+        if primary or product_id not in products:
+            product = await session.execute(
+                self.select_products()
+                .add_columns(self.model.updated_at)
+                .where(self.model.nm_id == product_id),
+                bind_arguments={PRIMARY_BIND_KEY: primary},
+            )
+            product = product.mappings().first()
+            if product is None:
+                return None
+            products[product_id] = dict(product)
+        return products[product_id]
 
-        stmt = (
-            select(self.model)
-            .options(selectinload(self.model.colors))
-            .where(self.model.nm_id == product_id)
+    async def get_product_json(
+        self, product_id: int, session: AsyncSession
+    ) -> SerializedProduct | None:
+        """Retrieves a product serialized as `ProductResponse` JSON.
+
+        Products are read through `product_cache` when `PRODUCT_CACHE_ENABLED`
+        is set, so repeated reads of a product are served without a query.
+        Cache misses are read from the primary database: an invalidation is
+        applied once the write commits on the primary, so a product read from
+        a lagging replica after it could be cached for the whole TTL.
+
+        Args:
+        - product_id (int): The ID of the product to retrieve.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - Union[SerializedProduct, None]: The JSON of the product with the time
+          it was last changed if it exists in the database, or None if it does
+          not exist.
+        """
+        if settings.PRODUCT_CACHE_ENABLED:
+            cached = await product_cache.get(product_id)
+            if cached is not None:
+                return cached
+
+        generation = product_cache.generation
+        product = await self.get_product(
+            product_id, session, primary=settings.PRODUCT_CACHE_ENABLED
+        )
+        if product is None:
+            return None
+
+        product = dict(product)
+        updated_at = product.pop('updated_at')
+        serialized = SerializedProduct(updated_at, orjson.dumps(product))
+        if settings.PRODUCT_CACHE_ENABLED:
+            await product_cache.set(product_id, serialized, generation)
+        return serialized
+
+    async def get_product_version(
+        self, product_id: int, session: AsyncSession
+    ) -> datetime | None:
+        """Retrieves the time a product was last changed without loading it.
+
+        Args:
+        - product_id (int): The ID of the product.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - Union[datetime, None]: The `updated_at` of the product from the
+          product cache or the primary key index, or None if it does not exist.
+        """
+        if settings.PRODUCT_CACHE_ENABLED:
+            cached = await product_cache.get(product_id)
+            if cached is not None:
+                return cached.updated_at
+        return await session.scalar(
+            select(self.model.updated_at).where(self.model.nm_id == product_id)
         )
-        product_db = await session.execute(stmt)
-        return product_db.scalars().first()
+
+    async def get_products_version(self, session: AsyncSession) -> int:
+        """Retrieves the version of the product list without loading products.
+
+        The version is a single row bumped by `bump_products_version` after
+        every transaction changing products, so reading it costs one primary key
+        lookup and any committed change of a page of the list changes it.
+
+        Args:
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - int: The version of the product list, 0 if it was never changed.
+        """
+        version = await session.scalar(
+            select(ProductListVersion.version).where(ProductListVersion.id == 1)
+        )
+        return version or 0
+
+    async def bump_products_version(self, session: AsyncSession) -> None:
+        """Moves the version of the product list forward.
+
+        Must be called once the transaction changing the products has committed.
+        The version is bumped in a short transaction of its own, so concurrent
+        writers hold the version row only for a single statement instead of
+        being serialized for the whole of their transactions, and a reader never
+        sees a new version before the changed products.
+
+        Args:
+        - session (AsyncSession): The session that committed the changes.
+        """
+        stmt = pg_insert(ProductListVersion).values(id=1, version=1)
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[ProductListVersion.id],
+                set_={'version': ProductListVersion.version + 1},
+            )
+        )
+        await session.commit()
+
+    def select_products(self) -> Select:
+        """Builds a query of product fields with their colors aggregated in SQL.
+
+        Colors of every product are aggregated by a correlated `json_agg` over
+        the bridge table, so products and their colors are read in a single
+        round trip and rows map straight into `ProductResponse`. Columns in
+        `HIDDEN_COLUMNS` are not part of the response and are not selected.
+
+        Returns:
+        - Select: The query of product rows with the `colors` column.
+        """
+        colors = (
+            select(
+                func.coalesce(
+                    func.json_agg(
+                        aggregate_order_by(
+                            func.json_build_object(
+                                'color_id', Color.color_id, 'name', Color.name
+                            ),
+                            Color.color_id,
+                        )
+                    ),
+                    literal_column("'[]'::json"),
+                    type_=JSON,
+                )
+            )
+            .join_from(product_color_bridge_table, Color)
+            .where(product_color_bridge_table.c.nm_id == self.model.nm_id)
+            .scalar_subquery()
+        )
+        return select(
+            *(
+                column
+                for column in self.model.__table__.columns
+                if column.key not in HIDDEN_COLUMNS
+            ),
+            colors.label('colors'),
+        )
+
+    async def product_exists(self, product_id: int, session: AsyncSession) -> bool:
+        """Checks whether a product is stored without loading it.
+
+        Args:
+        - product_id (int): The ID of the product to look up.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - bool: True if the product exists in the database.
+        """
+        stmt = select(exists().where(self.model.nm_id == product_id))
+        return bool(await session.scalar(stmt))
 
     async def get_product_multi(
         self, params: CustomParams, session: AsyncSession
-    ) -> Sequence[Product]:
+    ) -> dict[str, Any]:
         """Retrieves multiple products from the database.
 
         Args:
+        - params (CustomParams): The page, its size and the strategy of counting
+          all products.
         - session (AsyncSession): The async SQLAlchemy session to use for database
           operations.
 
@@ -65,20 +338,85 @@ class ProductService:
         - None
 
         Returns:
-        - Union[Sequence[Product], None]: A sequence of products if there are any
-          in the database, or None if the database is empty.
+        - dict: The fields of `ProductPage` in their order: the products of the
+          page, the number of all products and the strategy that produced it.
         """
+        raw_params = params.to_raw_params()
         stmt = (
-            select(self.model)
-            .options(selectinload(self.model.colors))
-            .group_by(self.model.brand, self.model.nm_id)
+            self.select_products()
             .order_by(
                 self.model.sale_price,
                 desc(self.model.nm_id),
             )
+            .limit(raw_params.limit)
+            .offset(raw_params.offset)
         )
-        products_db = await paginate(conn=session, query=stmt, params=params)
-        return products_db
+        products = (await session.execute(stmt)).mappings().all()
+        total, total_strategy = await product_counter.count(params.count, session)
+        return {
+            'items': [dict(product) for product in products],
+            'total': total,
+            'page': params.page,
+            'size': params.size,
+            'pages': ceil(total / params.size),
+            'total_strategy': total_strategy,
+        }
+
+    async def get_product_page(
+        self, params: CursorParams, session: AsyncSession
+    ) -> dict[str, Any]:
+        """Retrieves a page of products after the cursor of the previous page.
+
+        Products are ordered by sale price and then by ID descending. The page
+        starts right after the sort key encoded in the cursor, so every page is
+        read from the `ix_product_sale_price_nm_id` index in O(page size).
+
+        Args:
+        - params (CursorParams): The size of the page, the cursor of the previous
+          page and the strategy of counting all products, if any.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - InvalidCursor: If the cursor can not be decoded.
+
+        Returns:
+        - dict: The fields of `ProductCursorPage` in their order: the products of
+          the page and the cursor of the next page, or None if it is the last
+          page.
+        """
+        stmt = (
+            self.select_products()
+            .order_by(self.model.sale_price, desc(self.model.nm_id))
+            .limit(params.size + 1)
+        )
+        if params.cursor is not None:
+            sale_price, nm_id = decode_cursor(params.cursor)
+            stmt = stmt.where(
+                self.model.sale_price >= sale_price,
+                or_(self.model.sale_price > sale_price, self.model.nm_id < nm_id),
+            )
+        products = (await session.execute(stmt)).mappings().all()
+
+        next_cursor = None
+        if len(products) > params.size:
+            products = products[: params.size]
+            last_product = products[-1]
+            next_cursor = encode_cursor(
+                last_product['sale_price'], last_product['nm_id']
+            )
+
+        total = total_strategy = None
+        if params.count is not None:
+            total, total_strategy = await product_counter.count(params.count, session)
+
+        return {
+            'items': [dict(product) for product in products],
+            'size': params.size,
+            'next_cursor': next_cursor,
+            'total': total,
+            'total_strategy': total_strategy,
+        }
 
     async def create_product(
         self,
@@ -88,6 +426,11 @@ class ProductService:
     ) -> ProductCreate:
         """Create a new product in the database with the provided data.
 
+        The product is inserted with `INSERT ... ON CONFLICT DO NOTHING RETURNING`,
+        so an existing product is detected by the insert itself. Its stocks are
+        stored and the first snapshot of its price and stock is written to the
+        product history.
+
         Args:
         - product_data_in (dict): A dictionary containing the data for the new
           product.
@@ -96,29 +439,217 @@ class ProductService:
         - session (AsyncSession): An async SQLAlchemy session.
 
         Raises:
-        - None
+        - ProductAlreadyExists: If a product with the same id already exists.
 
         Returns:
         - ProductCreate: A Pydantic schema representing the newly created product.
         """
-        db_product = self.model(**product_data_in)
-        db_product.colors = []
-        for color_name in colors:
-            color = await self.get_color_by_name(color_name, session)
-            if color is None:
-                color = Color(name=color_name)
-                session.add(color)
-            db_product.colors.append(color)
+        db_product = await session.scalar(
+            pg_insert(self.model)
+            .values(product_row(product_data_in, colors))
+            .on_conflict_do_nothing(index_elements=[self.model.nm_id])
+            .returning(self.model)
+        )
+        if db_product is None:
+            await session.rollback()
+            raise ProductAlreadyExists()
 
-        session.add(db_product)
+        color_ids = await self.add_product_colors(
+            {db_product.nm_id: set(colors)}, session
+        )
+        await stock_service.replace_stocks(
+            {db_product.nm_id: product_data_in['stocks']}, session
+        )
+        await product_history.add_snapshots([product_data_in], session)
+        await product_cache.publish([db_product.nm_id], session)
         await session.commit()
+        await self.bump_products_version(session)
+        color_dictionary.remember(color_ids)
+        product_counter.invalidate()
+        await product_cache.invalidate([db_product.nm_id])
+
+        set_committed_value(
+            db_product,
+            'colors',
+            [
+                Color(color_id=color_ids[name], name=name)
+                for name in dict.fromkeys(colors)
+            ],
+        )
         return db_product
 
-    async def remove_product(self, product_id: int, session: AsyncSession) -> None:
-        """Removes a product from the database by its unique identifier.
+    async def create_products_bulk(
+        self,
+        products: Iterable[tuple[list[str] | list[None], dict[str, Any]]],
+        session: AsyncSession,
+    ) -> set[int]:
+        """Creates many products and their colors with multi-row inserts.
+
+        Products which already exist in the database are skipped. The stocks of
+        the created ones are stored and their first snapshots are written to
+        the product history. Rows are inserted in the order of their ids, so
+        concurrent imports of overlapping products lock them in the same order
+        and wait for each other instead of deadlocking.
 
         Args:
-        - product_id (int): The ID of the product to remove.
+        - products (Iterable[tuple]): Pairs of color names and product data as
+          returned by `get_product_data_from_website`.
+        - session (AsyncSession): An async SQLAlchemy session.
+
+        Raises:
+        - None
+
+        Returns:
+        - set[int]: The ids of the products that were created.
+        """
+        products = sorted(products, key=lambda product: product[1]['nm_id'])
+        if not products:
+            return set()
+
+        stmt = (
+            pg_insert(self.model)
+            .values(
+                [product_row(product_data, colors) for colors, product_data in products]
+            )
+            .on_conflict_do_nothing(index_elements=[self.model.nm_id])
+            .returning(self.model.nm_id)
+        )
+        created_ids = set((await session.scalars(stmt)).all())
+
+        color_ids = await self.add_product_colors(
+            {
+                product_data['nm_id']: set(colors)
+                for colors, product_data in products
+                if product_data['nm_id'] in created_ids
+            },
+            session,
+        )
+        await stock_service.replace_stocks(
+            {
+                product_data['nm_id']: product_data['stocks']
+                for _, product_data in products
+                if product_data['nm_id'] in created_ids
+            },
+            session,
+        )
+        await product_history.add_snapshots(
+            (
+                product_data
+                for _, product_data in products
+                if product_data['nm_id'] in created_ids
+            ),
+            session,
+        )
+        await product_cache.publish(created_ids, session)
+        await session.commit()
+        if created_ids:
+            await self.bump_products_version(session)
+        color_dictionary.remember(color_ids)
+        if created_ids:
+            product_counter.invalidate()
+            await product_cache.invalidate(created_ids)
+        return created_ids
+
+    async def add_product_colors(
+        self, product_colors: dict[int, set[str]], session: AsyncSession
+    ) -> dict[str, int]:
+        """Links products to their colors with a single multi-row insert.
+
+        The colors of every product are resolved together as one set, missing
+        colors are created. Links are inserted sorted by product and color, so
+        concurrent transactions lock them in the same order.
+
+        Args:
+        - product_colors (dict[int, set[str]]): The color names keyed by the ids
+          of the products.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - dict[str, int]: The ids of the linked colors keyed by their names.
+        """
+        color_ids = await color_dictionary.resolve(
+            set().union(*product_colors.values()), session
+        )
+        bridge_rows = [
+            {'nm_id': nm_id, 'color_id': color_id}
+            for nm_id, color_id in sorted(
+                (nm_id, color_ids[color_name])
+                for nm_id, color_names in product_colors.items()
+                for color_name in color_names
+            )
+        ]
+        if bridge_rows:
+            await session.execute(insert(product_color_bridge_table), bridge_rows)
+        return color_ids
+
+    async def get_existing_ids(
+        self, product_ids: Iterable[int], session: AsyncSession
+    ) -> set[int]:
+        """Retrieves which of the given product ids are stored in the database.
+
+        Args:
+        - product_ids (Iterable[int]): The ids of the products to look up.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - set[int]: The ids of the products that exist in the database.
+        """
+        stmt = select(self.model.nm_id).where(self.model.nm_id.in_(set(product_ids)))
+        return set((await session.scalars(stmt)).all())
+
+    async def get_ids_after(
+        self, after_id: int | None, limit: int, session: AsyncSession
+    ) -> list[int]:
+        """Retrieves the next batch of stored product ids in id order.
+
+        Args:
+        - after_id (int | None): The last id of the previous batch, None for the
+          first batch.
+        - limit (int): The maximum number of ids in the batch.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - list[int]: The ids of the batch, empty when all ids were retrieved.
+        """
+        stmt = select(self.model.nm_id).order_by(self.model.nm_id).limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(self.model.nm_id > after_id)
+        return list((await session.scalars(stmt)).all())
+
+    async def refresh_products(
+        self,
+        products: Iterable[tuple[list[str] | list[None], dict[str, Any]]],
+        session: AsyncSession,
+    ) -> set[int]:
+        """Writes fresh data of the changed products with a single bulk update.
+
+        The `content_hash` of every product is sent with its `REFRESHED_COLUMNS`
+        as one array parameter per column and joined with
+        `UPDATE ... FROM unnest(...)`, so a batch costs one statement with a
+        fixed number of parameters. Only rows whose stored hash differs are
+        written, unchanged products produce no row versions and keep their
+        `updated_at`. Colors and stocks are rewritten only for the changed
+        products.
+
+        The stored values are joined as `old` and returned by the update, so
+        snapshots are written to the product history only for the products
+        whose price, sale or quantity changed.
+
+        Args:
+        - products (Iterable[tuple]): Pairs of color names and product data as
+          returned by `get_products_data_from_website`.
         - session (AsyncSession): The async SQLAlchemy session to use for database
           operations.
 
@@ -126,18 +657,80 @@ class ProductService:
         - None
 
         Returns:
-        - None.
+        - set[int]: The ids of the products that changed.
         """
-        await session.execute(delete(self.model).where(self.model.nm_id == product_id))
+        products = list(products)
+        if not products:
+            return set()
+
+        columns = self.model.__table__.columns
+        rows = [product_row(product_data, colors) for colors, product_data in products]
+        names = ('nm_id', 'content_hash', *REFRESHED_COLUMNS)
+        fresh = (
+            func.unnest(
+                *(
+                    cast([row[name] for row in rows], ARRAY(columns[name].type))
+                    for name in names
+                )
+            )
+            .table_valued(*names)
+            .render_derived(name='fresh')
+        )
+        old = self.model.__table__.alias('old')
+        stmt = (
+            update(self.model.__table__)
+            .where(
+                columns.nm_id == fresh.c.nm_id,
+                columns.content_hash.is_distinct_from(fresh.c.content_hash),
+                old.c.nm_id == columns.nm_id,
+            )
+            .values({name: fresh.c[name] for name in names[1:]})
+            .returning(columns.nm_id, *(old.c[name] for name in SNAPSHOT_COLUMNS))
+        )
+        previous = {nm_id: values for nm_id, *values in await session.execute(stmt)}
+        updated_ids = set(previous)
+
+        color_ids = await self.replace_product_colors(
+            {
+                product_data['nm_id']: set(colors)
+                for colors, product_data in products
+                if product_data['nm_id'] in updated_ids
+            },
+            session,
+        )
+        await stock_service.replace_stocks(
+            {
+                product_data['nm_id']: product_data['stocks']
+                for _, product_data in products
+                if product_data['nm_id'] in updated_ids
+            },
+            session,
+        )
+        await product_history.add_snapshots(
+            product_history.changed_snapshots(
+                (product_data for _, product_data in products), previous
+            ),
+            session,
+        )
+        await product_cache.publish(updated_ids, session)
         await session.commit()
+        if updated_ids:
+            await self.bump_products_version(session)
+        color_dictionary.remember(color_ids)
+        await product_cache.invalidate(updated_ids)
+        return updated_ids
+
+    async def replace_product_colors(
+        self, product_colors: dict[int, set[str]], session: AsyncSession
+    ) -> dict[str, int]:
+        """Makes the colors of products match the given ones.
 
-    async def get_color_by_name(
-        self, color_name: str, session: AsyncSession
-    ) -> Color | None:
-        """Retrieves a color from the database by its name.
+        The stored links of all products are read with one query, then only the
+        links that are gone are deleted and only the new ones are inserted.
 
         Args:
-        - color_name (str): The name of the color to retrieve.
+        - product_colors (dict[int, set[str]]): The color names keyed by the ids
+          of the products.
         - session (AsyncSession): The async SQLAlchemy session to use for database
           operations.
 
@@ -145,11 +738,75 @@ class ProductService:
         - None
 
         Returns:
-        - Union[Color, None]: The color with the specified name if it exists in the
-          database, or None if it does not exist.
+        - dict[str, int]: The ids of the linked colors keyed by their names.
         """
-        color = await session.execute(select(Color).where(Color.name == color_name))
-        return color.scalars().first()
+        if not product_colors:
+            return {}
+
+        color_ids = await color_dictionary.resolve(
+            set().union(*product_colors.values()), session
+        )
+        bridge = product_color_bridge_table
+        links = {
+            (nm_id, color_ids[color_name])
+            for nm_id, color_names in product_colors.items()
+            for color_name in color_names
+        }
+        stored_links = set(
+            (
+                await session.execute(
+                    select(bridge.c.nm_id, bridge.c.color_id).where(
+                        bridge.c.nm_id.in_(product_colors)
+                    )
+                )
+            ).all()
+        )
+        if stale_links := stored_links - links:
+            await session.execute(
+                delete(bridge).where(
+                    tuple_(bridge.c.nm_id, bridge.c.color_id).in_(stale_links)
+                )
+            )
+        if new_links := links - stored_links:
+            await session.execute(
+                insert(bridge),
+                [
+                    {'nm_id': nm_id, 'color_id': color_id}
+                    for nm_id, color_id in sorted(new_links)
+                ],
+            )
+        return color_ids
+
+    async def remove_product(self, product_id: int, session: AsyncSession) -> bool:
+        """Removes a product from the database by its unique identifier.
+
+        Args:
+        - product_id (int): The ID of the product to remove.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - bool: True if the product was removed, False if it did not exist.
+        """
+        removed_id = await session.scalar(
+            delete(self.model)
+            .where(self.model.nm_id == product_id)
+            .returning(self.model.nm_id)
+        )
+        if removed_id is not None:
+            await product_cache.publish([removed_id], session)
+        await session.commit()
+        if removed_id is not None:
+            await self.bump_products_version(session)
+        session.info.get(PRODUCTS_INFO_KEY, {}).pop(product_id, None)
+        if removed_id is None:
+            return False
+        product_counter.invalidate()
+        await product_cache.invalidate([removed_id])
+        return True
 
 
 product_service = ProductService(Product)
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent calls made with the same key into a single call.
+
+    The first caller for a key runs the function, callers arriving while it is
+    in flight wait for it and receive the same result or exception. Once the
+    call completes the key is forgotten, so later callers run the function
+    again.
+
+    Methods:
+    - `do`: Runs the function for a key or joins the call already in flight.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future[T]] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Runs `func` for the key, or waits for the call already in flight.
+
+        Args:
+        - key (Hashable): The key identifying the call.
+        - func (Callable): A coroutine function producing the result.
+
+        Returns:
+        - The result of the call made for the key.
+
+        Raises:
+        - Any exception raised by the call made for the key.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                return await self.do(key, func)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as error:
+            future.set_exception(error)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
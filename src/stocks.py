@@ -0,0 +1,182 @@
+"""Stocks of products per size and warehouse.
+
+The stocks parsed from the website are stored in `product_stock`, one row per
+size of a product in a warehouse. Writes are diffs: only the rows whose
+quantity changed are upserted and only the rows that are gone are deleted, so
+a refresh of unchanged stocks writes nothing. The totals of every warehouse
+are kept precomputed in `product_warehouse_stock` for the changed products.
+"""
+from typing import Any
+
+from sqlalchemy import delete, exists, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.extractor import Stock
+from src.models import Product, ProductStock, ProductWarehouseStock
+
+
+class StockService:
+    """Service class for the stocks of products per size and warehouse.
+
+    Attributes:
+    - model: The SQLAlchemy model of the stocks.
+    - totals_model: The SQLAlchemy model of the warehouse totals.
+
+    Methods:
+    - `replace_stocks`: Makes the stored stocks of products match the given ones.
+    - `update_warehouse_totals`: Recomputes the warehouse totals of products.
+    - `get_stocks`: Retrieves the stocks of a product with its warehouse totals.
+    """
+
+    def __init__(self, model, totals_model):
+        self.model = model
+        self.totals_model = totals_model
+
+    async def replace_stocks(
+        self, product_stocks: dict[int, list[Stock]], session: AsyncSession
+    ) -> set[int]:
+        """Makes the stored stocks of products match the given ones.
+
+        The stored stocks of all products are read with one query, then the new
+        and changed rows are written by one upsert statement executed for every
+        row with `executemany` and the rows that are gone are deleted with a
+        single statement. The warehouse
+        totals are recomputed for the products whose stocks changed.
+
+        Args:
+        - product_stocks (dict[int, list[Stock]]): The `(size, warehouse, qty)`
+          stocks keyed by the ids of the products.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - set[int]: The ids of the products whose stocks changed.
+        """
+        if not product_stocks:
+            return set()
+
+        key = (self.model.nm_id, self.model.size, self.model.warehouse)
+        stocks = {
+            (nm_id, size, warehouse): qty
+            for nm_id, product_stock in product_stocks.items()
+            for size, warehouse, qty in product_stock
+        }
+        stored_stocks = {
+            (nm_id, size, warehouse): qty
+            for nm_id, size, warehouse, qty in await session.execute(
+                select(*key, self.model.qty).where(self.model.nm_id.in_(product_stocks))
+            )
+        }
+
+        if stale_keys := stored_stocks.keys() - stocks.keys():
+            await session.execute(
+                delete(self.model).where(tuple_(*key).in_(stale_keys))
+            )
+        if changed_stocks := [
+            {'nm_id': nm_id, 'size': size, 'warehouse': warehouse, 'qty': qty}
+            for (nm_id, size, warehouse), qty in stocks.items()
+            if stored_stocks.get((nm_id, size, warehouse)) != qty
+        ]:
+            stmt = pg_insert(self.model)
+            await session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=key, set_={'qty': stmt.excluded.qty}
+                ),
+                changed_stocks,
+            )
+
+        changed_ids = {nm_id for nm_id, *_ in stale_keys} | {
+            stock['nm_id'] for stock in changed_stocks
+        }
+        await self.update_warehouse_totals(changed_ids, session)
+        return changed_ids
+
+    async def update_warehouse_totals(
+        self, product_ids: set[int], session: AsyncSession
+    ) -> None:
+        """Recomputes the warehouse totals of products from their stocks.
+
+        Totals are upserted only where they changed and the totals of the
+        warehouses without stocks anymore are deleted.
+
+        Args:
+        - product_ids (set[int]): The ids of the products.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+        """
+        if not product_ids:
+            return
+
+        totals = self.totals_model
+        stmt = pg_insert(totals).from_select(
+            ['nm_id', 'warehouse', 'qty'],
+            select(self.model.nm_id, self.model.warehouse, func.sum(self.model.qty))
+            .where(self.model.nm_id.in_(product_ids))
+            .group_by(self.model.nm_id, self.model.warehouse),
+        )
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[totals.nm_id, totals.warehouse],
+                set_={'qty': stmt.excluded.qty},
+                where=totals.qty.is_distinct_from(stmt.excluded.qty),
+            )
+        )
+        await session.execute(
+            delete(totals).where(
+                totals.nm_id.in_(product_ids),
+                ~exists().where(
+                    self.model.nm_id == totals.nm_id,
+                    self.model.warehouse == totals.warehouse,
+                ),
+            )
+        )
+
+    async def get_stocks(
+        self, product_id: int, session: AsyncSession
+    ) -> dict[str, Any] | None:
+        """Retrieves the stocks of a product with its warehouse totals.
+
+        The totals are read from `product_warehouse_stock`, they are not summed
+        on read.
+
+        Args:
+        - product_id (int): The ID of the product.
+        - session (AsyncSession): The async SQLAlchemy session to use for database
+          operations.
+
+        Raises:
+        - None
+
+        Returns:
+        - Union[dict, None]: The fields of `ProductStocksResponse` if the product
+          exists in the database, or None if it does not exist.
+        """
+        quantity = await session.scalar(
+            select(Product.quantity).where(Product.nm_id == product_id)
+        )
+        if quantity is None:
+            return None
+
+        warehouses = await session.execute(
+            select(self.totals_model.warehouse, self.totals_model.qty)
+            .where(self.totals_model.nm_id == product_id)
+            .order_by(self.totals_model.warehouse)
+        )
+        stocks = await session.execute(
+            select(self.model.size, self.model.warehouse, self.model.qty)
+            .where(self.model.nm_id == product_id)
+            .order_by(self.model.size, self.model.warehouse)
+        )
+        return {
+            'nm_id': product_id,
+            'quantity': quantity,
+            'warehouses': [dict(row) for row in warehouses.mappings()],
+            'stocks': [dict(row) for row in stocks.mappings()],
+        }
+
+
+stock_service = StockService(ProductStock, ProductWarehouseStock)
@@ -1,13 +1,57 @@
-from typing import Any
+import asyncio
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Iterable, Iterator, Sequence
 
-import requests
+import httpx
+import orjson
 from fastapi import status
 
-from src.constants import RESPONSE_KEY_MAPPING, URL_LINK
-from src.exceptions import JSONKeyNotFound, ProductNotFound, SomethingWentWrong
+from src import cache
+from src.breaker import backoff_delay, upstream_breaker
+from src.client import upstream_client
+from src.config import settings
+from src.constants import UPSTREAM_CACHE_KEY, URL_LINK
+from src.exceptions import (
+    DetailedHTTPException,
+    ProductNotFound,
+    SomethingWentWrong,
+    UpstreamUnavailable,
+)
+from src.extractor import product_extractor
+from src.limiter import upstream_scheduler
+
+
+@dataclass
+class BatchResult:
+    """Per-id outcome of a batched request to the website.
+
+    Attributes:
+    - products: Successfully fetched (or parsed) products keyed by their id.
+    - errors: Exceptions describing why a product could not be obtained, keyed
+      by the id of the product.
+    """
+
+    products: dict[int, Any] = field(default_factory=dict)
+    errors: dict[int, DetailedHTTPException] = field(default_factory=dict)
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """Splits items into consecutive lists of at most `size` elements.
+
+    Args:
+    - items (Iterable): The items to split.
+    - size (int): The maximum length of a chunk.
+
+    Returns:
+    - Iterator[list]: An iterator over the chunks.
+    """
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
 
 
-def get_product_data_from_website(
+async def get_product_data_from_website(
     nm_id: int,
 ) -> tuple[list[str] | list[None], dict[str, Any]]:
     """
@@ -20,53 +64,56 @@ def get_product_data_from_website(
     - SomethingWentWrong: If there was an error while fetching the product data.
 
     Returns:
-    - Result of a functions `parse_fetched_product_data`,
-      `parse_fetched_product_colors`.
+    - Result of a function `parse_fetched_product`.
     """
-    fetched_product_data = fetch_product_data(nm_id)
+    fetched_product_data = await fetch_product_data(nm_id)
     if not fetched_product_data:
         raise ProductNotFound()
 
-    check_fetched_product_data_keys(fetched_product_data)
+    return parse_fetched_product(fetched_product_data)
 
-    parsed_product_data = parse_fetched_product_data(fetched_product_data)
 
-    product_colors = []
-    product_quantity = 0
-    if fetched_product_data['colors']:
-        product_colors = parse_fetched_product_colors(fetched_product_data['colors'])
+async def get_products_data_from_website(
+    nm_ids: Iterable[int], use_cache: bool = True
+) -> BatchResult:
+    """
+    Retrieve and parse data of many products from a website in batches.
 
-    if fetched_product_data['sizes']:
-        product_quantity = parse_fetched_product_quantity(fetched_product_data['sizes'])
+    Args:
+    - nm_ids (Iterable[int]): The IDs of the products to fetch.
+    - use_cache (bool): Whether products found in the upstream cache are used
+      instead of requesting them.
 
-    parsed_product_data['quantity'] = product_quantity
-    return product_colors, parsed_product_data
+    Returns:
+    - BatchResult: Results of a function `parse_fetched_product` keyed by product
+      id, and an exception for every id that could not be fetched or parsed.
+    """
+    batch = await fetch_products_data(nm_ids, use_cache)
+    products, errors = product_extractor.extract_many(batch.products)
+    return BatchResult(products=products, errors={**batch.errors, **errors})
 
 
-def check_fetched_product_data_keys(fetched_product_data: dict[str, Any]) -> None:
+def parse_fetched_product(
+    fetched_product_data: dict[str, Any]
+) -> tuple[list[str] | list[None], dict[str, Any]]:
     """
-    Checks if the required keys are present in the fetched product data dictionary.
+    Validates and parses a single product fetched from a website in one pass.
 
     Args:
-    - fetched_product_data: The dictionary containing the fetched product data.
+    - fetched_product_data (dict): The dictionary containing the fetched product data.
 
     Raises:
-    - JSONKeyNotFound: If any of the required keys from RESPONSE_KEY_MAPPING values,
-    'colors' and 'sizes', are not found.
-    """
-    for response_key in RESPONSE_KEY_MAPPING.values():
-        if fetched_product_data.get(response_key, None) is None:
-            raise JSONKeyNotFound()
+    - JSONKeyNotFound: If an expected key is missing in the fetched product data.
 
-    if fetched_product_data.get('colors', None) is None:
-        raise JSONKeyNotFound()
-
-    if fetched_product_data.get('sizes', None) is None:
-        raise JSONKeyNotFound()
+    Returns:
+    - A tuple of the product colors and the parsed product data including the
+      total quantity of the product.
+    """
+    return product_extractor.extract(fetched_product_data)
 
 
-def fetch_product_data(nm_id: int) -> dict[str, Any]:
-    """Fetches product data from the URL_LINK.
+async def fetch_product_data(nm_id: int) -> dict[str, Any]:
+    """Fetches product data from the URL_LINK with the shared upstream client.
 
     Args:
     - nm_id (int): The ID of the product to fetch.
@@ -77,96 +124,209 @@ def fetch_product_data(nm_id: int) -> dict[str, Any]:
     Raises:
     - SomethingWentWrong: If there was an error while fetching the product data.
     """
-    request_url = URL_LINK.format(nm_id=nm_id)
-    response = requests.get(request_url)
+    cached_products = await get_cached_products([nm_id])
+    if nm_id in cached_products:
+        return cached_products[nm_id]
 
-    if response.status_code != status.HTTP_200_OK:
-        raise SomethingWentWrong()
+    product_data = dict(*await request_products([nm_id]))
+    if product_data:
+        await cache_products({nm_id: product_data})
+    return product_data
 
-    json_response = response.json()
-    product_data = json_response['data']['products']
 
-    return dict(*product_data)
+async def fetch_products_data(
+    nm_ids: Iterable[int], use_cache: bool = True
+) -> BatchResult:
+    """Fetches data of many products from the URL_LINK.
 
+    The IDs are deduplicated and split into chunks of `UPSTREAM_BATCH_SIZE`,
+    every chunk is requested with a single call and all chunks are requested
+    concurrently. Products found in the upstream cache are not requested unless
+    `use_cache` is False, fetched products are cached either way.
 
-def parse_fetched_product_data(fetched_product_data: dict[str, Any]) -> dict[str, Any]:
+    Args:
+    - nm_ids (Iterable[int]): The IDs of the products to fetch.
+    - use_cache (bool): Whether products found in the upstream cache are used.
+
+    Returns:
+    - BatchResult: Fetched products keyed by product id. Every id missing from
+      the response is reported with `ProductNotFound`, every id of a chunk that
+      could not be requested is reported with the raised exception.
     """
-    Parses the fetched data from a product and extracts relevant information.
+    nm_ids = list(dict.fromkeys(nm_ids))
+    result = BatchResult(
+        products=await get_cached_products(nm_ids) if use_cache else {}
+    )
+    missing_ids = [nm_id for nm_id in nm_ids if nm_id not in result.products]
+
+    chunks = list(chunked(missing_ids, settings.UPSTREAM_BATCH_SIZE))
+    responses = await asyncio.gather(
+        *(request_products(chunk) for chunk in chunks), return_exceptions=True
+    )
+
+    fetched_products = {}
+    for chunk, response in zip(chunks, responses):
+        if isinstance(response, DetailedHTTPException):
+            result.errors.update(dict.fromkeys(chunk, response))
+            continue
+        if isinstance(response, BaseException):
+            raise response
+
+        requested_ids = set(chunk)
+        for product in response:
+            if product.get('id') in requested_ids:
+                fetched_products[product['id']] = product
+
+        for nm_id in chunk:
+            if nm_id not in fetched_products:
+                result.errors[nm_id] = ProductNotFound()
+
+    await cache_products(fetched_products)
+    result.products.update(fetched_products)
+    return result
+
+
+def is_overload_status(status_code: int) -> bool:
+    """Returns whether a response status code means the website is overloaded.
 
     Args:
-    - fetched_product_data (dict): The dictionary containing the fetched product data.
+    - status_code (int): The status code of a response.
 
     Returns:
-    - A dictionary with the following keys and values:
-        - nm_id (int): The product ID.
-        - name (str): The name of the product.
-        - brand (str): The brand name of the product.
-        - brand_id (int): The brand ID of the product.
-        - site_brand_id (int): The site brand ID of the product.
-        - supplier_id (int): The supplier ID of the product.
-        - sale (float): The discount percentage for the product.
-        - price (int): The original price of the product.
-        - sale_price (int): The sale price of the product.
-        - rating (float): The rating of the product.
-        - feedbacks (int): The number of feedbacks for the product.
+    - bool: True for 429 Too Many Requests and 5xx status codes.
     """
-    parsed_product_data = {}
-    for new_key, response_key in RESPONSE_KEY_MAPPING.items():
-        field_value = fetched_product_data.get(response_key)
-        parsed_product_data[new_key] = field_value
-
-    return parsed_product_data
+    return (
+        status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        or status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR
+    )
 
 
-def parse_fetched_product_colors(
-    fetched_product_colors: list[dict[str, Any]]
-) -> list[str]:
-    """
-    Parses the colors data from the fetched product data dictionary.
+async def get_cached_products(nm_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+    """Retrieves fetched product data from the upstream cache.
 
     Args:
-    - fetched_product_data (dict): The dictionary containing the fetched product data.
-
-    Raises:
-    - JSONKeyNotFound: If the 'name' key is not found in the 'colors' data.
+    - nm_ids (Iterable[int]): The IDs of the products to look up.
 
     Returns:
-    - A list of color names extracted from the fetched product data.
+    - dict[int, dict[str, Any]]: The cached product data keyed by product id.
     """
-    parsed_product_colors = []
-    for color in fetched_product_colors:
-        color_name = color.get('name', None)
+    if not settings.UPSTREAM_CACHE_ENABLED:
+        return {}
 
-        if color_name is None:
-            raise JSONKeyNotFound()
+    keys = {UPSTREAM_CACHE_KEY.format(nm_id=nm_id): nm_id for nm_id in nm_ids}
+    cached_values = await cache.upstream_cache.get_many(keys)
+    return {keys[key]: orjson.loads(value) for key, value in cached_values.items()}
 
-        parsed_product_colors.append(color_name)
-    return parsed_product_colors
 
+async def cache_products(products: dict[int, dict[str, Any]]) -> None:
+    """Stores fetched product data in the upstream cache.
 
-def parse_fetched_product_quantity(fetched_product_sizes: list[dict[str, Any]]) -> int:
+    Args:
+    - products (dict[int, dict[str, Any]]): The product data keyed by product id.
     """
-    Parses the total quantity of a product from the fetched product data dictionary.
+    if not settings.UPSTREAM_CACHE_ENABLED or not products:
+        return
+
+    await cache.upstream_cache.set_many(
+        {
+            UPSTREAM_CACHE_KEY.format(nm_id=nm_id): orjson.dumps(product_data)
+            for nm_id, product_data in products.items()
+        }
+    )
+
+
+async def request_products(nm_ids: Sequence[int]) -> list[dict[str, Any]]:
+    """Requests the products with the given IDs from the URL_LINK in one call.
+
+    Transport errors, timeouts, 429 and 5xx responses are retried up to
+    `UPSTREAM_RETRIES` times with jittered exponential backoff. Every attempt
+    goes through the upstream circuit breaker, which fails fast while the
+    website is down.
 
     Args:
-    - fetched_product_data (dict): The dictionary containing the fetched product data.
+    - nm_ids (Sequence[int]): The IDs of the products to request.
+
+    Returns:
+    - list[dict[str, Any]]: The products found by the website.
 
     Raises:
-    - JSONKeyNotFound: If the 'stocks' key or 'qty' key is not found in the
-    'sizes' data.
+    - SomethingWentWrong: If there was an error while fetching the product data.
+    - UpstreamUnavailable: If the circuit breaker does not allow the request.
+    """
+    request_url = URL_LINK.format(nm_id=';'.join(map(str, nm_ids)))
+    for attempt in range(settings.UPSTREAM_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(
+                backoff_delay(
+                    attempt - 1,
+                    settings.UPSTREAM_RETRY_BACKOFF_BASE,
+                    settings.UPSTREAM_RETRY_BACKOFF_MAX,
+                )
+            )
+        if not upstream_breaker.allow_request():
+            raise UpstreamUnavailable()
+
+        try:
+            response = await send_request(request_url)
+        except httpx.HTTPError:
+            upstream_breaker.record_failure()
+            continue
+        except BaseException:
+            upstream_breaker.release()
+            raise
+
+        if is_overload_status(response.status_code):
+            upstream_breaker.record_failure()
+            continue
+
+        upstream_breaker.record_success()
+        return decode_products(response)
+
+    raise SomethingWentWrong()
+
+
+def decode_products(response: httpx.Response) -> list[dict[str, Any]]:
+    """Decodes the products from a response of the website.
+
+    Args:
+    - response (httpx.Response): The response of the website.
 
     Returns:
-    - The total quantity of the product extracted from the fetched product data.
+    - list[dict[str, Any]]: The products found by the website.
+
+    Raises:
+    - SomethingWentWrong: If the response is not successful or its body does not
+      contain the list of products.
     """
-    total_quantity = 0
-    for size in fetched_product_sizes:
-        if size.get('stocks', None) is None:
-            raise JSONKeyNotFound()
+    if response.status_code != status.HTTP_200_OK:
+        raise SomethingWentWrong()
+    try:
+        return orjson.loads(response.content)['data']['products']
+    except (ValueError, KeyError, TypeError):
+        raise SomethingWentWrong()
+
 
-        for quantity in size['stocks']:
-            if quantity.get('qty', None) is None:
-                raise JSONKeyNotFound()
+async def send_request(request_url: str) -> httpx.Response:
+    """Sends a single request to the website through the upstream scheduler.
 
-            total_quantity += quantity['qty']
+    The scheduler shrinks its concurrency window when the request times out or
+    the website responds with 429 or 5xx.
 
-    return total_quantity
+    Args:
+    - request_url (str): The url to request.
+
+    Returns:
+    - httpx.Response: The response of the website.
+
+    Raises:
+    - httpx.HTTPError: If the request could not be completed.
+    """
+    async with upstream_scheduler.slot() as slot:
+        try:
+            response = await upstream_client.get(request_url)
+        except httpx.TimeoutException:
+            slot.overloaded = True
+            raise
+
+        slot.overloaded = is_overload_status(response.status_code)
+        return response
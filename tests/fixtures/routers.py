@@ -2,7 +2,7 @@ import pytest_asyncio
 from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import Product
+from src.models import Color, Product
 
 
 @pytest_asyncio.fixture
@@ -51,3 +51,26 @@ async def create_multiple_product(async_session: AsyncSession):
 
     products = await async_session.execute(insert(Product), products)
     await async_session.commit()
+
+
+@pytest_asyncio.fixture
+async def create_product_with_special_characters(async_session: AsyncSession):
+    product = await async_session.get(Product, 801)
+    if product is None:
+        product = Product(
+            nm_id=801,
+            name='Футболка "Классика"\n\\ \t\x01 \u2028 👕',
+            brand='</script>&amp;',
+            brand_id=0,
+            site_brand_id=2**31 - 1,
+            supplier_id=1,
+            sale=0,
+            price=0,
+            sale_price=0,
+            rating=0,
+            feedbacks=0,
+            quantity=0,
+        )
+        product.colors = [Color(name='ярко-"розовый"'), Color(name='\u00e9cru')]
+        async_session.add(product)
+        await async_session.commit()
@@ -1,22 +1,51 @@
-import requests
+import asyncio
 import pytest
+
+import httpx
+import pytest_asyncio
 from fastapi import status
 
+from benchmarks.stub_server import StubProfile, StubServer, create_app
+
 from src import utils
+from src.client import upstream_client
+from src.config import settings
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    def _mock_upstream(handler):
+        client = httpx.AsyncClient(
+            base_url=settings.UPSTREAM_BASE_URL,
+            transport=httpx.MockTransport(handler),
+        )
+        monkeypatch.setattr(upstream_client, '_client', client)
+
+    return _mock_upstream
 
 
-class MockResponse:
-    def __init__(self, json_response, status_code):
-        self.json_response = json_response
-        self.status_code = status_code
+@pytest_asyncio.fixture
+async def stub_upstream(monkeypatch):
+    """Points the upstream client at local stub servers started on free ports."""
+    servers = []
 
-    def json(self):
-        return self.json_response
+    def _stub_upstream(profile=StubProfile(), replay_dir=None):
+        server = StubServer(create_app(profile, replay_dir, seed=0)).__enter__()
+        servers.append(server)
+        client = httpx.AsyncClient(base_url=server.url)
+        monkeypatch.setattr(upstream_client, '_client', client)
+        return server
+
+    yield _stub_upstream
+
+    await upstream_client.close()
+    for server in servers:
+        server.__exit__(None, None, None)
 
 
 @pytest.fixture
-def response_successful(monkeypatch):
-    def mock_get(*args, **kwargs):
+def response_successful(mock_upstream):
+    def handler(request):
         json_response = {
             'data': {
                 'products': [
@@ -40,29 +69,72 @@ def response_successful(monkeypatch):
                 ],
             },
         }
-        status_code = status.HTTP_200_OK
-        return MockResponse(json_response, status_code)
+        return httpx.Response(status.HTTP_200_OK, json=json_response)
 
-    monkeypatch.setattr(requests, 'get', mock_get)
+    mock_upstream(handler)
 
 
 @pytest.fixture
-def response_failure(monkeypatch):
-    def mock_get(*args, **kwargs):
+def response_failure(mock_upstream):
+    def handler(request):
         json_response = {
             'data': {
                 'products': [],
             },
         }
-        status_code = status.HTTP_404_NOT_FOUND
-        return MockResponse(json_response, status_code)
+        return httpx.Response(status.HTTP_404_NOT_FOUND, json=json_response)
+
+    mock_upstream(handler)
+
+
+@pytest.fixture
+def response_connection_error(mock_upstream):
+    def handler(request):
+        raise httpx.ConnectError('Connection refused', request=request)
 
-    monkeypatch.setattr(requests, 'get', mock_get)
+    mock_upstream(handler)
+
+
+@pytest.fixture
+def response_batch(mock_upstream, fetched_whole_product_data):
+    """Serves every requested id except 404 and records the requested chunks."""
+    requested_chunks = []
+
+    def handler(request):
+        nm_ids = [int(nm_id) for nm_id in request.url.params['nm'].split(';')]
+        requested_chunks.append(nm_ids)
+        products = [
+            {**fetched_whole_product_data, 'id': nm_id}
+            for nm_id in nm_ids
+            if nm_id != 404
+        ]
+        return httpx.Response(status.HTTP_200_OK, json={'data': {'products': products}})
+
+    mock_upstream(handler)
+    return requested_chunks
+
+
+@pytest.fixture
+def response_slow(mock_upstream, fetched_whole_product_data):
+    """Serves every requested id with a delay and records the requested urls."""
+    requested_urls = []
+
+    async def handler(request):
+        requested_urls.append(request.url)
+        await asyncio.sleep(0.05)
+        nm_id = int(request.url.params['nm'])
+        return httpx.Response(
+            status.HTTP_200_OK,
+            json={'data': {'products': [{**fetched_whole_product_data, 'id': nm_id}]}},
+        )
+
+    mock_upstream(handler)
+    return requested_urls
 
 
 @pytest.fixture
 def fetch_empty_product_data(monkeypatch):
-    def mock_fetch_product_data(*args, **kwargs):
+    async def mock_fetch_product_data(*args, **kwargs):
         return []
 
     monkeypatch.setattr(utils, 'fetch_product_data', mock_fetch_product_data)
@@ -89,39 +161,50 @@ def fetched_whole_product_data():
         ],
         'sizes': [
             {
+                'name': '44',
                 'stocks': [
                     {
+                        'wh': 507,
                         'qty': 196,
                     },
                     {
+                        'wh': 117986,
                         'qty': 1,
                     },
                 ],
             },
             {
+                'name': '46',
                 'stocks': [
                     {
+                        'wh': 507,
                         'qty': 263,
                     }
                 ],
             },
             {
+                'name': '48',
                 'stocks': [
                     {
+                        'wh': 507,
                         'qty': 156,
                     }
                 ],
             },
             {
+                'name': '50',
                 'stocks': [
                     {
+                        'wh': 117986,
                         'qty': 143,
                     }
                 ],
             },
             {
+                'name': '52',
                 'stocks': [
                     {
+                        'wh': 507,
                         'qty': 147,
                     }
                 ],
@@ -151,6 +234,14 @@ def expected_result_product_data():
             'rating': 5,
             'feedbacks': 2240,
             'quantity': 906,
+            'stocks': [
+                ('44', 507, 196),
+                ('44', 117986, 1),
+                ('46', 507, 263),
+                ('48', 507, 156),
+                ('50', 117986, 143),
+                ('52', 507, 147),
+            ],
         },
     )
 
@@ -239,6 +330,7 @@ def expected_result_product_data_with_empty_sizes():
             'rating': 5,
             'feedbacks': 2240,
             'quantity': 0,
+            'stocks': [],
         },
     )
 
@@ -287,6 +379,7 @@ def expected_result_product_data_with_empty_colors():
             'rating': 5,
             'feedbacks': 2240,
             'quantity': 263,
+            'stocks': [('', 0, 263)],
         },
     )
 
@@ -452,7 +545,7 @@ def expected_result_fetched_valid_sizes():
 
 @pytest.fixture
 def mock_fetch_product_data_whole_product(monkeypatch, fetched_whole_product_data):
-    def mock_fetch_product_function(*args, **kwargs):
+    async def mock_fetch_product_function(*args, **kwargs):
         return fetched_whole_product_data
 
     monkeypatch.setattr(utils, 'fetch_product_data', mock_fetch_product_function)
@@ -462,7 +555,7 @@ def mock_fetch_product_data_whole_product(monkeypatch, fetched_whole_product_dat
 def mock_fetch_product_data_with_empty_colors(
     monkeypatch, fetched_product_data_with_empty_colors
 ):
-    def mock_fetch_product_function(*args, **kwargs):
+    async def mock_fetch_product_function(*args, **kwargs):
         return fetched_product_data_with_empty_colors
 
     monkeypatch.setattr(utils, 'fetch_product_data', mock_fetch_product_function)
@@ -472,7 +565,7 @@ def mock_fetch_product_data_with_empty_colors(
 def mock_fetch_product_data_with_empty_sizes(
     monkeypatch, fetched_product_data_with_empty_sizes
 ):
-    def mock_fetch_product_function(*args, **kwargs):
+    async def mock_fetch_product_function(*args, **kwargs):
         return fetched_product_data_with_empty_sizes
 
     monkeypatch.setattr(utils, 'fetch_product_data', mock_fetch_product_function)
@@ -0,0 +1,75 @@
+from src.breaker import CircuitBreaker, CircuitState, backoff_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """
+    Test case for CircuitBreaker moving from closed to open after consecutive
+    failures, to half-open after the recovery timeout and back to closed after
+    a successful probe.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=10, clock=clock)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+
+    clock.now = 10
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.metrics() == {'state': 'closed', 'failures': 0}
+
+
+def test_circuit_breaker_reopens_on_failed_probe():
+    """
+    Test case for CircuitBreaker opening again when a half-open probe fails.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 10
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+
+    clock.now = 15
+    assert not breaker.allow_request()
+
+
+def test_circuit_breaker_releases_probe_slot():
+    """
+    Test case for CircuitBreaker admitting a new probe once an admitted probe
+    ended without an outcome and released its slot.
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10, clock=clock)
+    breaker.record_failure()
+
+    clock.now = 10
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_backoff_delay_is_capped():
+    """
+    Test case for backoff_delay staying within the exponential backoff and cap.
+    """
+    assert all(0 <= backoff_delay(0, 0.1, 1) <= 0.1 for _ in range(100))
+    assert all(0 <= backoff_delay(10, 0.1, 1) <= 1 for _ in range(100))
@@ -0,0 +1,84 @@
+import pytest
+
+from src.cache import InMemoryCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+async def test_in_memory_cache_ttl(clock):
+    """
+    Test case for InMemoryCache expiring entries after their TTL.
+
+    Args:
+    - clock: pytest fixture that provides a controllable clock
+    """
+    cache = InMemoryCache(max_entries=10, max_bytes=1024, default_ttl=10, clock=clock)
+    await cache.set('default', b'value')
+    await cache.set('short', b'value', ttl=1)
+
+    clock.now = 5
+    assert await cache.get('default') == b'value'
+    assert await cache.get('short') is None
+
+    clock.now = 10
+    assert await cache.get('default') is None
+    assert cache.stats.as_dict() == {
+        'hits': 1,
+        'misses': 2,
+        'evictions': 0,
+        'entries': 0,
+        'size_bytes': 0,
+    }
+
+
+async def test_in_memory_cache_lru_eviction(clock):
+    """
+    Test case for InMemoryCache evicting the least recently used entries when
+    the entries limit is exceeded.
+
+    Args:
+    - clock: pytest fixture that provides a controllable clock
+    """
+    cache = InMemoryCache(max_entries=2, max_bytes=1024, default_ttl=10, clock=clock)
+    await cache.set('first', b'1')
+    await cache.set('second', b'2')
+    await cache.get('first')
+    await cache.set('third', b'3')
+
+    assert await cache.get_many(['first', 'second', 'third']) == {
+        'first': b'1',
+        'third': b'3',
+    }
+    assert cache.stats.evictions == 1
+
+
+async def test_in_memory_cache_memory_cap(clock):
+    """
+    Test case for InMemoryCache keeping the size of keys and values under the
+    memory cap.
+
+    Args:
+    - clock: pytest fixture that provides a controllable clock
+    """
+    cache = InMemoryCache(max_entries=10, max_bytes=10, default_ttl=10, clock=clock)
+    await cache.set_many({'a': b'1234', 'b': b'1234'})
+    await cache.set('c', b'1234')
+    await cache.set('huge', b'12345678910')
+
+    assert await cache.get_many(['a', 'b', 'c', 'huge']) == {
+        'b': b'1234',
+        'c': b'1234',
+    }
+    assert cache.stats.size_bytes == 10
+    assert cache.stats.evictions == 1
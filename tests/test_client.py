@@ -0,0 +1,17 @@
+from src.client import UpstreamClient
+
+
+async def test_upstream_client_is_shared():
+    """
+    Test case for UpstreamClient returning the same pooled client for every call
+    until it is closed.
+    """
+    upstream = UpstreamClient()
+    client = upstream.client
+    assert upstream.client is client
+
+    await upstream.close()
+    assert client.is_closed
+    assert upstream.client is not client
+
+    await upstream.close()
@@ -0,0 +1,63 @@
+from sqlalchemy import func, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.colors import ColorDictionary
+from src.models import Color
+
+
+async def test_color_dictionary_resolves_known_names_without_queries(
+    async_session: AsyncSession,
+):
+    """
+    Test case for ColorDictionary creating missing colors once and resolving
+    remembered names from memory.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    """
+    colors = ColorDictionary()
+    color_ids = await colors.resolve(['лиловый', 'охра'], async_session)
+    await async_session.commit()
+    colors.remember(color_ids)
+
+    assert set(color_ids) == {'лиловый', 'охра'}
+    assert await colors.resolve(['охра'], session=None) == {'охра': color_ids['охра']}
+
+
+async def test_color_dictionary_resolves_stored_names(async_session: AsyncSession):
+    """
+    Test case for ColorDictionary reusing colors stored by another process
+    instead of inserting duplicates.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    """
+    color_id = await async_session.scalar(
+        insert(Color).values(name='индиго').returning(Color.color_id)
+    )
+    await async_session.commit()
+
+    colors = ColorDictionary()
+    assert await colors.resolve(['индиго'], async_session) == {'индиго': color_id}
+    assert len(colors) == 1
+
+    colors.clear()
+    await colors.load(async_session)
+    assert len(colors) == await async_session.scalar(func.count(Color.color_id))
+
+
+async def test_color_dictionary_inserts_names_in_sorted_order(
+    async_session: AsyncSession,
+):
+    """
+    Test case for ColorDictionary inserting missing colors in the order of their
+    names, so concurrent transactions lock them in the same order.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    """
+    names = [f'оттенок {number}' for number in range(20, 0, -1)]
+    color_ids = await ColorDictionary().resolve(names, async_session)
+    await async_session.commit()
+
+    assert [color_ids[name] for name in sorted(names)] == sorted(color_ids.values())
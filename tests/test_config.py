@@ -0,0 +1,50 @@
+import pytest
+
+from pydantic import ValidationError
+from sqlalchemy.pool import NullPool
+
+from src.config import DB_PROFILES, AppSettings, DBProfile
+
+
+def test_engine_options_of_profiles():
+    """
+    Test case for AppSettings.engine_options following the DB_PROFILE and the
+    DB_* overrides.
+    """
+    options = AppSettings(DB_PROFILE='prod').engine_options
+    assert options['echo'] is False
+    assert options['pool_size'] == DB_PROFILES[DBProfile.PROD].pool_size
+
+    options = AppSettings(
+        DB_PROFILE='dev', DB_ECHO=False, DB_POOL_SIZE=2
+    ).engine_options
+    assert options['echo'] is False
+    assert options['pool_size'] == 2
+    assert options['max_overflow'] == DB_PROFILES[DBProfile.DEV].max_overflow
+
+    options = AppSettings(DB_PROFILE='pgbouncer').engine_options
+    assert options['poolclass'] is NullPool
+    assert 'pool_size' not in options
+    assert options['connect_args'] == {
+        'statement_cache_size': 0,
+        'prepared_statement_cache_size': 0,
+    }
+
+
+@pytest.mark.parametrize(
+    'overrides',
+    [
+        {'DB_PROFILE': 'staging'},
+        {'DB_POOL_SIZE': 0},
+        {'DB_POOL_TIMEOUT': 0},
+        {'DB_PROFILE': 'pgbouncer', 'DB_POOL_SIZE': 5},
+        {'DB_PROFILE': 'pgbouncer', 'DB_POOL_RECYCLE': 60},
+    ],
+)
+def test_engine_settings_validation(overrides):
+    """
+    Test case for AppSettings rejecting unknown profiles, invalid pool options
+    and pool options of a profile without a pool.
+    """
+    with pytest.raises(ValidationError):
+        AppSettings(**overrides)
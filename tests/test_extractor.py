@@ -0,0 +1,164 @@
+import pytest
+
+from src.exceptions import JSONKeyNotFound
+from src.extractor import aggregate_stocks, product_extractor
+
+
+def test_extract_whole_product(
+    fetched_whole_product_data, expected_result_product_data
+):
+    """
+    Test case for ProductExtractor.extract returning the colors and parsed data
+    of a fetched product.
+
+    Args:
+    - fetched_whole_product_data: Fixture that provides mock fetched product
+      data for testing.
+    - expected_result_product_data: Fixture that provides expected result for
+      comparison.
+    """
+    assert (
+        product_extractor.extract(fetched_whole_product_data)
+        == expected_result_product_data
+    )
+
+
+def test_extract_fields_and_colors(
+    fetched_whole_product_data,
+    expected_result_parse_fetched_product_data,
+    fetched_product_colors_valid,
+    expected_result_fetched_valid_colors,
+):
+    """
+    Test case for ProductExtractor.extract projecting the mapped fields and the
+    color names of a fetched product.
+
+    Args:
+    - fetched_whole_product_data: Fixture that provides mock fetched product
+      data for testing.
+    - expected_result_parse_fetched_product_data: Fixture that provides the
+      expected mapped fields.
+    - fetched_product_colors_valid: pytest fixture that provides valid colors data.
+    - expected_result_fetched_valid_colors: pytest fixture that provides the
+      expected color names.
+    """
+    colors, product_data = product_extractor.extract(
+        {**fetched_whole_product_data, 'colors': fetched_product_colors_valid}
+    )
+    assert colors == expected_result_fetched_valid_colors
+    assert {
+        key: value
+        for key, value in product_data.items()
+        if key not in ('quantity', 'stocks')
+    } == expected_result_parse_fetched_product_data
+
+
+@pytest.mark.parametrize(
+    'product_data',
+    [
+        'fetched_product_data_with_no_sizes',
+        'fetched_product_data_with_no_colors',
+        'fetched_product_data_wrong_keys',
+    ],
+)
+def test_extract_missing_keys(product_data, request):
+    """
+    Test case for ProductExtractor.extract when keys are not present in a
+    response JSON.
+
+    Args:
+    - product_data: Fixture that provides mock product data for testing.
+    - request: pytest fixture used to retrieve other fixtures.
+    """
+    with pytest.raises(JSONKeyNotFound):
+        product_extractor.extract(request.getfixturevalue(product_data))
+
+
+@pytest.mark.parametrize(
+    'key, value',
+    [
+        ('colors', 'fetched_product_colors_without_name_key'),
+        ('sizes', 'fetched_product_sizes_without_stocks_key'),
+        ('sizes', 'fetched_product_sizes_without_qty_key'),
+    ],
+)
+def test_extract_malformed_nested_data(key, value, fetched_whole_product_data, request):
+    """
+    Test case for ProductExtractor.extract when colors or sizes of a product miss
+    their nested keys.
+
+    Args:
+    - key: The key of the product data to replace.
+    - value: Fixture that provides malformed nested data.
+    - fetched_whole_product_data: Fixture that provides mock fetched product
+      data for testing.
+    - request: pytest fixture used to retrieve other fixtures.
+    """
+    fetched_whole_product_data[key] = request.getfixturevalue(value)
+    with pytest.raises(JSONKeyNotFound):
+        product_extractor.extract(fetched_whole_product_data)
+
+
+def test_aggregate_stocks(
+    fetched_product_sizes_valid,
+    fetched_product_sizes_without_stocks_key,
+    fetched_product_sizes_without_qty_key,
+    expected_result_fetched_valid_sizes,
+):
+    """
+    Test case for aggregate_stocks summing stocks of a product per size and
+    warehouse and reporting malformed sizes with None.
+
+    Args:
+    - fetched_product_sizes_valid: pytest fixture that provides valid sizes.
+    - fetched_product_sizes_without_stocks_key: pytest fixture that provides
+      sizes without 'stocks' key.
+    - fetched_product_sizes_without_qty_key: pytest fixture that provides sizes
+      without 'qty' key.
+    - expected_result_fetched_valid_sizes: pytest fixture that provides the
+      expected quantity of the valid sizes.
+    """
+    sizes = [
+        {'name': 'M', 'stocks': [{'wh': 2, 'qty': 1}, {'wh': 2, 'qty': 4}]},
+        {'name': 'L', 'stocks': [{'wh': 1, 'qty': 0}, {'wh': 2, 'qty': 3}]},
+    ]
+    assert aggregate_stocks(fetched_product_sizes_valid) == [
+        ('', 0, expected_result_fetched_valid_sizes)
+    ]
+    assert aggregate_stocks(fetched_product_sizes_without_stocks_key) is None
+    assert aggregate_stocks([]) == []
+    assert aggregate_stocks(fetched_product_sizes_without_qty_key) is None
+    assert aggregate_stocks(sizes) == [('L', 2, 3), ('M', 2, 5)]
+
+
+def test_extract_many(
+    fetched_whole_product_data,
+    fetched_product_sizes_without_qty_key,
+    expected_result_product_data,
+):
+    """
+    Test case for ProductExtractor.extract_many parsing valid products and
+    reporting malformed ones with JSONKeyNotFound.
+
+    Args:
+    - fetched_whole_product_data: Fixture that provides mock fetched product
+      data for testing.
+    - fetched_product_sizes_without_qty_key: pytest fixture that provides sizes
+      without 'qty' key.
+    - expected_result_product_data: Fixture that provides expected result for
+      comparison.
+    """
+    products, errors = product_extractor.extract_many(
+        {
+            1: fetched_whole_product_data,
+            2: {**fetched_whole_product_data, 'sizes': None},
+            3: {
+                **fetched_whole_product_data,
+                'sizes': fetched_product_sizes_without_qty_key,
+            },
+        }
+    )
+
+    assert products == {1: expected_result_product_data}
+    assert sorted(errors) == [2, 3]
+    assert all(isinstance(error, JSONKeyNotFound) for error in errors.values())
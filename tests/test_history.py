@@ -0,0 +1,186 @@
+from datetime import datetime, timezone
+
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import delete, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.constants import ErrorCodes
+from src.history import product_history
+from src.models import ProductSnapshot
+from src.service import product_service
+
+
+def utc(*args: int) -> datetime:
+    """Builds a moment in UTC."""
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def snapshot(nm_id: int, price: int, quantity: int = 5) -> dict[str, int]:
+    """Builds the data of a product written to its history."""
+    return {
+        'nm_id': nm_id,
+        'price': price,
+        'sale_price': price,
+        'sale': 0,
+        'quantity': quantity,
+    }
+
+
+async def get_snapshots(nm_id: int, session: AsyncSession) -> list[ProductSnapshot]:
+    """Retrieves the history of a product in time order."""
+    session.expire_all()
+    return list(
+        await session.scalars(
+            select(ProductSnapshot)
+            .where(ProductSnapshot.nm_id == nm_id)
+            .order_by(ProductSnapshot.captured_at)
+        )
+    )
+
+
+async def test_history_partitions_are_created_and_dropped(async_session: AsyncSession):
+    """
+    Test case for ProductHistory creating monthly partitions once, moving the
+    snapshots of a new partition out of the default one and dropping expired
+    partitions.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    """
+    await product_history.add_snapshots(
+        [snapshot(911, 100)], async_session, captured_at=utc(2031, 5, 10)
+    )
+    await async_session.commit()
+
+    created = await product_history.ensure_partitions(
+        utc(2031, 4, 15), utc(2031, 7, 1), async_session
+    )
+    assert created == [
+        'product_snapshot_p2031_04',
+        'product_snapshot_p2031_05',
+        'product_snapshot_p2031_06',
+    ]
+    assert not await product_history.ensure_partitions(
+        utc(2031, 4, 1), utc(2031, 7, 1), async_session
+    )
+    partition = await async_session.scalar(
+        text('SELECT tableoid::regclass::text FROM product_snapshot WHERE nm_id = 911')
+    )
+    assert partition == 'product_snapshot_p2031_05'
+
+    dropped = await product_history.drop_partitions_before(
+        utc(2031, 6, 1), async_session
+    )
+    assert {'product_snapshot_p2031_04', 'product_snapshot_p2031_05'} <= set(dropped)
+    assert 'product_snapshot_p2031_06' not in dropped
+    assert not await get_snapshots(911, async_session)
+
+
+async def test_refresh_writes_snapshots_of_changed_products(
+    async_session: AsyncSession, expected_result_product_data
+):
+    """
+    Test case for product creation writing the first snapshot of a product and
+    refreshes writing one only when its price, sale or quantity changed.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    product_data = {**product_data, 'nm_id': 921}
+    await product_service.create_product(product_data, colors, async_session)
+    assert len(await get_snapshots(921, async_session)) == 1
+
+    assert not await product_service.refresh_products(
+        [(colors, product_data)], async_session
+    )
+    renamed = {**product_data, 'name': 'Другое название'}
+    assert await product_service.refresh_products([(colors, renamed)], async_session)
+    assert len(await get_snapshots(921, async_session)) == 1
+
+    discounted = {**renamed, 'sale_price': product_data['sale_price'] - 100}
+    assert await product_service.refresh_products([(colors, discounted)], async_session)
+    snapshots = await get_snapshots(921, async_session)
+    assert [item.sale_price for item in snapshots] == [
+        product_data['sale_price'],
+        discounted['sale_price'],
+    ]
+
+    assert await product_service.remove_product(921, async_session)
+    assert len(await get_snapshots(921, async_session)) == 2
+    await async_session.execute(
+        delete(ProductSnapshot).where(ProductSnapshot.nm_id == 921)
+    )
+    await async_session.commit()
+
+
+async def test_get_product_history(
+    async_client: AsyncClient, async_session: AsyncSession, monkeypatch
+):
+    """
+    Test case for the history endpoint downsampling snapshots into buckets with
+    the minimum, maximum and last values, returning every snapshot with the
+    raw interval and flagging a history cut at `HISTORY_MAX_POINTS`.
+
+    Args:
+    - async_client: pytest fixture providing an HTTP client for the app
+    - async_session: pytest fixture providing a database session
+    - monkeypatch: pytest fixture for patching objects
+    """
+    for captured_at, price, quantity in (
+        (utc(2026, 9, 1, 0), 100, 5),
+        (utc(2026, 9, 1, 12), 80, 3),
+        (utc(2026, 9, 1, 18), 90, 4),
+        (utc(2026, 9, 2, 6), 120, 0),
+        (utc(2026, 9, 5), 70, 9),
+    ):
+        await product_history.add_snapshots(
+            [snapshot(931, price, quantity)], async_session, captured_at=captured_at
+        )
+    await async_session.commit()
+    url = 'products/931/history?start=2026-09-01T00:00:00Z&end=2026-09-03T00:00:00Z'
+
+    response = await async_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    history = response.json()
+    assert history['interval'] == 'day'
+    assert [point['time'] for point in history['points']] == [
+        '2026-09-01T00:00:00+00:00',
+        '2026-09-02T00:00:00+00:00',
+    ]
+    first_day = history['points'][0]
+    assert first_day['price'] == {'min': 80, 'max': 100, 'last': 90}
+    assert first_day['quantity'] == {'min': 3, 'max': 5, 'last': 4}
+    assert not history['truncated']
+
+    response = await async_client.get(f'{url}&interval=raw')
+    prices = [point['price'] for point in response.json()['points']]
+    assert prices == [
+        {'min': price, 'max': price, 'last': price} for price in (100, 80, 90, 120)
+    ]
+    assert not response.json()['truncated']
+
+    monkeypatch.setattr(settings, 'HISTORY_MAX_POINTS', 4)
+    response = await async_client.get(f'{url}&interval=raw')
+    assert len(response.json()['points']) == 4
+    assert not response.json()['truncated']
+
+    monkeypatch.setattr(settings, 'HISTORY_MAX_POINTS', 3)
+    response = await async_client.get(f'{url}&interval=raw')
+    prices = [point['price']['last'] for point in response.json()['points']]
+    assert prices == [100, 80, 90]
+    assert response.json()['truncated']
+
+    response = await async_client.get(
+        'products/931/history?start=2026-09-03T00:00:00&end=2026-09-01T00:00:00'
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()['detail'] == ErrorCodes.INVALID_TIME_RANGE
+
+    await async_session.execute(
+        delete(ProductSnapshot).where(ProductSnapshot.nm_id == 931)
+    )
+    await async_session.commit()
@@ -0,0 +1,84 @@
+import asyncio
+
+from src.limiter import AdaptiveConcurrencyLimiter, TokenBucket, UpstreamScheduler
+
+
+async def test_adaptive_limiter_aimd():
+    """
+    Test case for AdaptiveConcurrencyLimiter growing the window additively on
+    success and shrinking it multiplicatively on overload.
+    """
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, min_limit=1, max_limit=5)
+
+    for _ in range(4):
+        await limiter.acquire()
+        await limiter.release(True)
+    assert 4.9 < limiter.window < 5
+
+    await limiter.acquire()
+    await limiter.release(False)
+    assert 2.4 < limiter.window < 2.5
+
+    await limiter.acquire()
+    await limiter.release(None)
+    assert 2.4 < limiter.window < 2.5
+    assert limiter.in_flight == 0
+
+
+async def test_adaptive_limiter_caps_concurrency():
+    """
+    Test case for AdaptiveConcurrencyLimiter not letting more operations than the
+    current limit run at once.
+    """
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_limit=2)
+    running = []
+    peak = 0
+
+    async def operation():
+        nonlocal peak
+        await limiter.acquire()
+        running.append(1)
+        peak = max(peak, len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+        await limiter.release(True)
+
+    await asyncio.gather(*(operation() for _ in range(6)))
+    assert peak == 2
+
+
+async def test_token_bucket_limits_rate():
+    """
+    Test case for TokenBucket spending the burst at once and then waiting for
+    new tokens.
+    """
+    bucket = TokenBucket(rate=100, capacity=2)
+    loop = asyncio.get_running_loop()
+
+    started_at = loop.time()
+    for _ in range(4):
+        await bucket.acquire()
+
+    assert loop.time() - started_at >= 0.015
+
+
+async def test_upstream_scheduler_reports_overload():
+    """
+    Test case for UpstreamScheduler shrinking the window of an overloaded
+    request and exposing its metrics.
+    """
+    scheduler = UpstreamScheduler(
+        bucket=TokenBucket(rate=0, capacity=0),
+        limiter=AdaptiveConcurrencyLimiter(initial_limit=8, min_limit=1, max_limit=8),
+    )
+    async with scheduler.slot() as slot:
+        assert scheduler.metrics()['in_flight'] == 1
+        slot.overloaded = True
+
+    assert scheduler.metrics() == {
+        'queue_depth': 0,
+        'in_flight': 0,
+        'window': 4,
+        'limit': 4,
+        'tokens': 0,
+    }
@@ -0,0 +1,44 @@
+import asyncio
+
+from src.client import upstream_client
+from src.config import settings
+from src.database import engine
+from src.main import app, lifespan
+from src.product_cache import product_cache
+from src.refresher import product_refresher
+
+
+async def test_lifespan_releases_resources(monkeypatch):
+    """
+    Test case for the lifespan of the app starting the background tasks and
+    the shared upstream client, then cancelling the tasks, closing the client
+    and disposing the database engine on shutdown.
+    """
+    started, cancelled = [], []
+
+    def background(name: str):
+        async def run(*args, **kwargs) -> None:
+            started.append(name)
+            try:
+                await asyncio.Future()
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+
+        return run
+
+    monkeypatch.setattr(settings, 'REFRESH_ENABLED', True)
+    monkeypatch.setattr(product_cache, 'channel', 'test_lifespan')
+    monkeypatch.setattr(product_refresher, 'run', background('refresher'))
+    monkeypatch.setattr(product_cache, 'listen', background('listener'))
+
+    async with lifespan(app):
+        await asyncio.sleep(0)
+        client = upstream_client.client
+        assert not client.is_closed
+        assert sorted(started) == ['listener', 'refresher']
+        assert engine.sync_engine.pool.checkedin() > 0
+
+    assert sorted(cancelled) == ['listener', 'refresher']
+    assert client.is_closed
+    assert engine.sync_engine.pool.checkedin() == 0
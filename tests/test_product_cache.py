@@ -0,0 +1,214 @@
+import asyncio
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from src import Base
+from src.cache import InMemoryCache
+from src.config import settings
+from src.models import Color, Product, product_color_bridge_table
+from src.product_cache import ProductCache, SerializedProduct, product_cache
+from src.replicas import ReplicaSet, RoutingSession
+from src.service import product_service
+
+PRODUCT = SerializedProduct(datetime(2026, 10, 18, tzinfo=timezone.utc), b'{}')
+
+
+def make_product_cache(channel: str | None = None) -> ProductCache:
+    """Builds an empty product cache."""
+    return ProductCache(
+        InMemoryCache(max_entries=10, max_bytes=1024, default_ttl=60),
+        channel=channel,
+    )
+
+
+async def test_get_product_json_reads_through_cache(
+    async_session: AsyncSession, expected_result_product_data
+):
+    """
+    Test case for get_product_json serving repeated reads from the product
+    cache and reading a product again once it was removed.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    await product_service.create_product(
+        {**product_data, 'nm_id': 711}, colors, async_session
+    )
+    product = await product_service.get_product_json(711, async_session)
+    assert await product_cache.get(711) == product
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = async_session.sync_session.bind
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    try:
+        async_session.info.clear()
+        assert await product_service.get_product_json(711, async_session) == product
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+    assert not statements, 'Cached products must be served without queries.'
+
+    assert await product_service.remove_product(711, async_session)
+    assert await product_cache.get(711) is None
+    assert await product_service.get_product_json(711, async_session) is None
+
+
+async def test_get_product_json_fills_cache_from_primary(
+    monkeypatch, async_session: AsyncSession, expected_result_product_data
+):
+    """
+    Test case for get_product_json caching the product read from the primary
+    database while a replica still serves the product before its refresh.
+
+    The lagging replica is simulated by a schema holding a copy of the product
+    tables taken before the refresh.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    product_data = {**product_data, 'nm_id': 721}
+    await product_service.create_product(product_data, colors, async_session)
+
+    primary = async_session.bind
+    replica = create_async_engine(primary.url).execution_options(
+        schema_translate_map={None: 'lagging_replica'}
+    )
+    tables = [Product.__table__, Color.__table__, product_color_bridge_table]
+    async with replica.begin() as connection:
+        await connection.execute(text('CREATE SCHEMA lagging_replica'))
+        await connection.run_sync(Base.metadata.create_all, tables=tables)
+        for table in tables:
+            await connection.execute(
+                text(
+                    f'INSERT INTO lagging_replica.{table.name} '
+                    f'SELECT * FROM public.{table.name}'
+                )
+            )
+
+    refreshed = {**product_data, 'name': 'Новое название'}
+    assert await product_service.refresh_products([(colors, refreshed)], async_session)
+    replica_session = async_sessionmaker(
+        primary,
+        sync_session_class=RoutingSession,
+        replica_set=ReplicaSet(primary, [replica]),
+    )
+    try:
+        monkeypatch.setattr(settings, 'PRODUCT_CACHE_ENABLED', False)
+        async with replica_session() as session:
+            product = await product_service.get_product_json(721, session)
+        assert orjson.loads(product.body)['name'] == product_data['name']
+
+        monkeypatch.setattr(settings, 'PRODUCT_CACHE_ENABLED', True)
+        async with replica_session() as session:
+            product = await product_service.get_product_json(721, session)
+        assert orjson.loads(product.body)['name'] == refreshed['name']
+        assert await product_cache.get(721) == product
+    finally:
+        async with replica.begin() as connection:
+            await connection.execute(text('DROP SCHEMA lagging_replica CASCADE'))
+        await replica.dispose()
+        assert await product_service.remove_product(721, async_session)
+
+
+async def test_product_cache_drops_values_read_before_invalidation():
+    """
+    Test case for ProductCache not storing a product read before an
+    invalidation applied while it was being read.
+    """
+    cache = make_product_cache()
+    generation = cache.generation
+    await cache.invalidate([1])
+    await cache.set(1, PRODUCT, generation)
+    assert await cache.get(1) is None
+
+    await cache.set(1, PRODUCT, cache.generation)
+    assert await cache.get(1) == PRODUCT
+
+
+async def test_product_cache_invalidates_other_workers(async_session: AsyncSession):
+    """
+    Test case for ProductCache removing products changed by another worker
+    once their transaction publishing the change commits.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    """
+    publisher = make_product_cache(channel='test_product_cache')
+    listener = make_product_cache(channel='test_product_cache')
+    listening = asyncio.create_task(listener.listen(async_session.bind))
+    try:
+        await asyncio.sleep(0.1)
+        for product_id in (1, 2):
+            await listener.set(product_id, PRODUCT, listener.generation)
+        await publisher.publish([1], async_session)
+        await asyncio.sleep(0.1)
+        assert await listener.get(1) == PRODUCT, 'Notified before commit.'
+
+        await async_session.commit()
+        for _ in range(50):
+            if await listener.get(1) is None:
+                break
+            await asyncio.sleep(0.02)
+        assert await listener.get(1) is None
+        assert await listener.get(2) == PRODUCT
+    finally:
+        listening.cancel()
+
+
+async def test_product_cache_listener_reconnects(
+    monkeypatch, async_session: AsyncSession
+):
+    """
+    Test case for ProductCache listening again after its connection was
+    terminated, clearing the products cached while it was not listening.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    """
+    monkeypatch.setattr(settings, 'PRODUCT_CACHE_RECONNECT_DELAY', 0.01)
+    publisher = make_product_cache(channel='test_product_cache_reconnect')
+    listener = make_product_cache(channel='test_product_cache_reconnect')
+
+    async def wait_for_generation(generation: int) -> None:
+        for _ in range(100):
+            if listener.generation >= generation:
+                return
+            await asyncio.sleep(0.02)
+        raise AssertionError('The listener did not start listening.')
+
+    listening = asyncio.create_task(listener.listen(async_session.bind))
+    try:
+        await wait_for_generation(1)
+        await listener.set(1, PRODUCT, listener.generation)
+        await listener.set(2, PRODUCT, listener.generation)
+
+        await async_session.execute(
+            text(
+                'SELECT pg_terminate_backend(pid) FROM pg_stat_activity '
+                "WHERE query LIKE 'LISTEN %test_product_cache_reconnect%'"
+            )
+        )
+        await async_session.commit()
+        await wait_for_generation(2)
+        assert await listener.get(1) is None, 'Missed invalidations were kept.'
+
+        await listener.set(2, PRODUCT, listener.generation)
+        await publisher.publish([2], async_session)
+        await async_session.commit()
+        for _ in range(50):
+            if await listener.get(2) is None:
+                break
+            await asyncio.sleep(0.02)
+        assert await listener.get(2) is None
+    finally:
+        listening.cancel()
@@ -0,0 +1,202 @@
+import asyncio
+import pytest
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.stub_server import StubProfile
+
+from src.database import async_session as session_factory
+from src.database import engine
+from src.exceptions import UpstreamUnavailable
+from src.models import Product, product_color_bridge_table
+from src.product_cache import product_cache
+from src.refresher import ProductRefresher
+from src.service import content_hash, product_service
+from src.utils import BatchResult, get_products_data_from_website
+
+PRODUCT_IDS = [901, 902, 903, 904, 905]
+
+
+async def test_refresh_all_updates_changed_products(
+    stub_upstream, async_session: AsyncSession
+):
+    """
+    Test case for ProductRefresher walking all stored products in batches,
+    writing every batch with a single update that changes only the products
+    whose content hash differs, restoring their colors and invalidating their
+    cached responses.
+
+    Args:
+    - stub_upstream: pytest fixture starting a stub of the website
+    - async_session: pytest fixture providing a database session
+    """
+    stub_upstream(StubProfile(missing_every=3))
+    batch = await get_products_data_from_website(PRODUCT_IDS)
+    await product_service.create_products_bulk(batch.products.values(), async_session)
+    await async_session.execute(
+        insert(Product).values(
+            nm_id=903,
+            name='',
+            brand='',
+            brand_id=0,
+            site_brand_id=0,
+            supplier_id=0,
+            price=0,
+            sale_price=0,
+        )
+    )
+    await async_session.execute(
+        update(Product)
+        .where(Product.nm_id.in_([901, 902]))
+        .values(price=1, content_hash=None)
+    )
+    await async_session.execute(
+        delete(product_color_bridge_table).where(
+            product_color_bridge_table.c.nm_id == 902
+        )
+    )
+    await async_session.commit()
+    await product_service.get_product_json(901, async_session)
+    versions = dict(
+        (await async_session.execute(select(Product.nm_id, Product.updated_at))).all()
+    )
+
+    statements = []
+
+    def count_update(conn, cursor, statement, *args):
+        if statement.startswith('UPDATE'):
+            statements.append(statement)
+
+    refresher = ProductRefresher(
+        session_factory, interval=60, batch_size=2, concurrency=2
+    )
+    event.listen(engine.sync_engine, 'before_cursor_execute', count_update)
+    try:
+        stats = await refresher.refresh_all()
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', count_update)
+
+    assert (stats.batches, stats.changed) == (3, 2)
+    assert (stats.unchanged, stats.not_found) == (2, 1)
+    assert len(statements) == stats.batches, 'Every batch must be a single update.'
+    assert refresher.last_stats is stats
+    assert await product_cache.get(901) is None
+
+    async_session.expire_all()
+    products = {
+        product.nm_id: product
+        for product in await async_session.scalars(
+            select(Product).where(Product.nm_id.in_(PRODUCT_IDS))
+        )
+    }
+    for nm_id in (901, 902):
+        colors, product_data = batch.products[nm_id]
+        assert products[nm_id].price == product_data['price']
+        assert products[nm_id].content_hash == content_hash(product_data, colors)
+        assert products[nm_id].updated_at > versions[nm_id]
+    product = await product_service.get_product(902, async_session)
+    assert {color['name'] for color in product['colors']} == set(batch.products[902][0])
+    for nm_id in (903, 904, 905):
+        assert products[nm_id].updated_at == versions[nm_id]
+
+    await async_session.execute(delete(Product).where(Product.nm_id.in_(PRODUCT_IDS)))
+    await async_session.commit()
+
+
+def make_refresher(
+    monkeypatch, batches: list[list[int]], concurrency: int = 2
+) -> ProductRefresher:
+    """Builds a refresher walking the given batches of ids."""
+    refresher = ProductRefresher(
+        session_factory, interval=60, batch_size=2, concurrency=concurrency
+    )
+    pending = iter(batches)
+
+    async def get_ids_after(last_id):
+        return next(pending, [])
+
+    monkeypatch.setattr(refresher, '_get_ids_after', get_ids_after)
+    return refresher
+
+
+async def test_refresh_all_counts_failed_batches(monkeypatch):
+    """
+    Test case for ProductRefresher logging and counting a batch that fails
+    instead of failing the whole pass.
+
+    Args:
+    - monkeypatch: pytest fixture for patching objects
+    """
+
+    async def fetch(nm_ids, use_cache=True):
+        if 911 in nm_ids:
+            raise UpstreamUnavailable()
+        return BatchResult()
+
+    monkeypatch.setattr('src.refresher.get_products_data_from_website', fetch)
+    refresher = make_refresher(monkeypatch, [[911, 912], [913, 914]])
+
+    stats = await refresher.refresh_all()
+
+    assert (stats.batches, stats.failed_batches, stats.failed) == (1, 1, 2)
+
+
+async def test_refresh_all_cancels_batches(monkeypatch):
+    """
+    Test case for ProductRefresher cancelling and awaiting the running batches
+    when the pass is cancelled while waiting for a free slot.
+
+    Args:
+    - monkeypatch: pytest fixture for patching objects
+    """
+    started, cancelled = [], []
+
+    async def fetch(nm_ids, use_cache=True):
+        started.append(nm_ids)
+        try:
+            await asyncio.Future()
+        except asyncio.CancelledError:
+            cancelled.append(nm_ids)
+            raise
+
+    monkeypatch.setattr('src.refresher.get_products_data_from_website', fetch)
+    refresher = make_refresher(monkeypatch, [[911, 912], [913, 914]], concurrency=1)
+
+    refresh = asyncio.create_task(refresher.refresh_all())
+    while not started:
+        await asyncio.sleep(0.01)
+    refresh.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await refresh
+
+    assert cancelled == started == [[911, 912]]
+
+
+def test_content_hash_is_stable():
+    """
+    Test case for content_hash ignoring the order and duplicates of colors and
+    changing with any refreshed field or stock.
+    """
+    product_data = {
+        'name': 'Товар',
+        'brand': 'Бренд',
+        'brand_id': 1,
+        'site_brand_id': 2,
+        'supplier_id': 3,
+        'sale': 10,
+        'price': 1000,
+        'sale_price': 900,
+        'rating': 5,
+        'feedbacks': 7,
+        'quantity': 8,
+        'stocks': [('S', 507, 8)],
+    }
+    digest = content_hash(product_data, ['серый', 'белый'])
+
+    assert len(digest) == 16
+    assert content_hash(product_data, ['белый', 'серый', 'белый']) == digest
+    assert content_hash(product_data, ['белый']) != digest
+    assert content_hash({**product_data, 'quantity': 9}, ['белый', 'серый']) != digest
+    moved = {**product_data, 'stocks': [('S', 117986, 8)]}
+    assert content_hash(moved, ['белый', 'серый']) != digest
@@ -1,7 +1,21 @@
+import asyncio
+import json
 import pytest
 
 from fastapi import status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from httpx import AsyncClient
+from sqlalchemy import event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.database import engine
+from src.models import Color, Product
+from src.pagination import encode_cursor
+from src.product_cache import product_cache
+from src.schemas import ProductResponse
+from src.service import product_service
 
 
 @pytest.mark.asyncio
@@ -16,6 +30,7 @@ async def test_products_all_endpoint_no_products(async_client: AsyncClient):
         'pages': 0,
         'size': 10,
         'total': 0,
+        'total_strategy': 'exact',
     }
 
 
@@ -54,7 +69,8 @@ async def test_get_existing_product(create_new_product, async_client: AsyncClien
 
 
 @pytest.mark.asyncio
-async def test_create_product(async_client: AsyncClient):
+async def test_create_product(stub_upstream, async_client: AsyncClient):
+    stub_upstream()
     product_id = 139760619
     response = await async_client.post('products/', json={'nm_id': product_id})
     assert (
@@ -83,7 +99,8 @@ async def test_delete_not_existing_product(async_client: AsyncClient):
 
 
 @pytest.mark.asyncio
-async def test_create_product_twice(async_client: AsyncClient):
+async def test_create_product_twice(stub_upstream, async_client: AsyncClient):
+    stub_upstream()
     product_id = 139760619
     response = await async_client.post('products/', json={'nm_id': product_id})
     response = await async_client.post('products/', json={'nm_id': product_id})
@@ -91,3 +108,293 @@ async def test_create_product_twice(async_client: AsyncClient):
         response.status_code == status.HTTP_400_BAD_REQUEST
     ), 'Response status code differs fromn expected status code 400.'
     assert response.json() == {'detail': 'Product with this id already exists.'}
+
+
+@pytest.mark.asyncio
+async def test_create_products_bulk(
+    create_new_product, response_batch, async_client: AsyncClient
+):
+    response = await async_client.post(
+        'products/bulk', json=[143422485, 501, 502, 404, 501]
+    )
+    assert (
+        response.status_code == status.HTTP_200_OK
+    ), 'Response status code differs fromn expected status code 200.'
+    assert response.headers['content-type'] == 'application/x-ndjson'
+
+    results = {
+        line['nm_id']: line['status']
+        for line in map(json.loads, response.text.splitlines())
+    }
+    assert results == {
+        143422485: 'already_exists',
+        501: 'created',
+        502: 'created',
+        404: 'not_found',
+    }
+
+    response = await async_client.get('products/501')
+    assert response.status_code == status.HTTP_200_OK
+    assert {color['name'] for color in response.json()['colors']} == {
+        'синий',
+        'серый',
+        'красный',
+    }
+
+
+@pytest.mark.asyncio
+async def test_create_products_bulk_ndjson(response_batch, async_client: AsyncClient):
+    response = await async_client.post(
+        'products/bulk',
+        content='{"nm_id": 503}\n504\n\n',
+        headers={'content-type': 'application/x-ndjson'},
+    )
+    assert (
+        response.status_code == status.HTTP_200_OK
+    ), 'Response status code differs fromn expected status code 200.'
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {'nm_id': 503, 'status': 'created', 'detail': None},
+        {'nm_id': 504, 'status': 'created', 'detail': None},
+    ]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('body', ['{"nm_id": 1}', '[-1]', '["1"]', 'not json'])
+async def test_create_products_bulk_invalid_body(body, async_client: AsyncClient):
+    response = await async_client.post('products/bulk', content=body)
+    assert (
+        response.status_code == status.HTTP_400_BAD_REQUEST
+    ), 'Response status code differs fromn expected status code 400.'
+
+
+@pytest.mark.asyncio
+async def test_create_product_concurrently(response_slow, async_client: AsyncClient):
+    product_id = 505
+    responses = await asyncio.gather(
+        *(async_client.post('products/', json={'nm_id': product_id}) for _ in range(5))
+    )
+    status_codes = [response.status_code for response in responses]
+    assert status.HTTP_201_CREATED in status_codes
+    assert set(status_codes) <= {
+        status.HTTP_201_CREATED,
+        status.HTTP_400_BAD_REQUEST,
+    }, 'Concurrent creates of the same product must not fail with 500.'
+    assert len(response_slow) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_creates_share_colors(
+    stub_upstream, async_client: AsyncClient, async_session: AsyncSession
+):
+    stub_upstream()
+    responses = await asyncio.gather(
+        *(
+            async_client.post('products/', json={'nm_id': nm_id})
+            for nm_id in range(601, 611)
+        )
+    )
+    assert [response.status_code for response in responses] == [
+        status.HTTP_201_CREATED
+    ] * 10
+    assert all(response.json()['colors'] for response in responses)
+
+    duplicates = await async_session.scalar(
+        select(func.count()).select_from(
+            select(Color.name).group_by(Color.name).having(func.count() > 1).subquery()
+        )
+    )
+    assert duplicates == 0
+
+
+@pytest.mark.asyncio
+async def test_products_cursor_pagination(async_client: AsyncClient):
+    response = await async_client.get(
+        'products/all/cursor', params={'size': 3, 'count': 'exact'}
+    )
+    assert (
+        response.status_code == status.HTTP_200_OK
+    ), 'Response status code differs fromn expected status code 200.'
+    page = response.json()
+    assert page['total_strategy'] == 'exact'
+    total, items = page['total'], page['items']
+    while page['next_cursor'] is not None:
+        page = (
+            await async_client.get(
+                'products/all/cursor', params={'size': 3, 'cursor': page['next_cursor']}
+            )
+        ).json()
+        assert page['total'] is None
+        items.extend(page['items'])
+
+    keys = [(item['sale_price'], -item['nm_id']) for item in items]
+    assert len(items) == total > 3
+    assert keys == sorted(set(keys))
+    assert all(
+        set(color) == {'color_id', 'name'} for item in items for color in item['colors']
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        'not-a-cursor',
+        'WzFd',
+        'eyJhIjoxfQ==',
+        encode_cursor(1, 2**31),
+        encode_cursor(-(2**31) - 1, 1),
+    ],
+)
+async def test_products_cursor_pagination_invalid_cursor(
+    cursor, async_client: AsyncClient
+):
+    response = await async_client.get('products/all/cursor', params={'cursor': cursor})
+    assert (
+        response.status_code == status.HTTP_400_BAD_REQUEST
+    ), 'Response status code differs fromn expected status code 400.'
+    assert response.json() == {'detail': 'The pagination cursor is invalid.'}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'url',
+    [
+        'products/all?page=1&size=50',
+        'products/all?page=2&size=3&count=cached',
+        'products/all?page=100&size=50',
+        'products/all/cursor?size=50&count=exact',
+        'products/all/cursor?size=2',
+    ],
+)
+async def test_raw_responses_are_byte_identical(
+    url, create_product_with_special_characters, monkeypatch, async_client: AsyncClient
+):
+    response = await async_client.get(url)
+    monkeypatch.setattr(settings, 'PRODUCT_RAW_RESPONSES', True)
+    raw_response = await async_client.get(url)
+
+    assert raw_response.status_code == response.status_code == status.HTTP_200_OK
+    assert raw_response.headers['content-type'] == response.headers['content-type']
+    assert raw_response.content == response.content
+
+
+@pytest.mark.asyncio
+async def test_cached_product_is_byte_identical(
+    create_product_with_special_characters,
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+):
+    product = await product_service.get_product(801, async_session, primary=True)
+    product = {name: value for name, value in product.items() if name != 'updated_at'}
+    expected = JSONResponse(jsonable_encoder(ProductResponse.parse_obj(product))).body
+
+    await product_cache.invalidate([801])
+    for _ in range(2):
+        response = await async_client.get('products/801')
+        assert response.headers['content-type'] == 'application/json'
+        assert response.content == expected
+    assert (await product_cache.get(801)).body == expected
+
+
+@pytest.mark.asyncio
+async def test_get_product_conditional_requests(
+    create_product_with_special_characters,
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+):
+    response = await async_client.get('products/801')
+    etag, last_modified = response.headers['etag'], response.headers['last-modified']
+    assert response.headers['cache-control'] == settings.PRODUCT_CACHE_CONTROL
+
+    await product_cache.invalidate([801])
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', count_statement)
+    try:
+        response = await async_client.get(
+            'products/801', headers={'If-None-Match': f'"other", {etag}'}
+        )
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', count_statement)
+    assert (
+        response.status_code == status.HTTP_304_NOT_MODIFIED
+    ), 'Response status code differs fromn expected status code 304.'
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    assert len(statements) == 1 and 'json_agg' not in statements[0]
+
+    response = await async_client.get(
+        'products/801', headers={'If-Modified-Since': last_modified}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    response = await async_client.get(
+        'products/801',
+        headers={'If-None-Match': '"other"', 'If-Modified-Since': last_modified},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    await async_session.execute(
+        update(Product).where(Product.nm_id == 801).values(rating=1)
+    )
+    await async_session.commit()
+    await product_cache.invalidate([801])
+    response = await async_client.get('products/801', headers={'If-None-Match': etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['rating'] == 1
+    assert response.headers['etag'] != etag
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'url, product_id',
+    [('products/all?page=1&size=10', 811), ('products/all/cursor?size=10', 812)],
+)
+async def test_products_list_conditional_requests(
+    url,
+    product_id,
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    expected_result_product_data,
+):
+    etag = (await async_client.get(url)).headers['etag']
+    response = await async_client.get(url, headers={'If-None-Match': etag})
+    assert (
+        response.status_code == status.HTTP_304_NOT_MODIFIED
+    ), 'Response status code differs fromn expected status code 304.'
+    assert response.headers['etag'] == etag
+
+    other_page = await async_client.get(f'{url}&count=cached')
+    assert other_page.headers['etag'] != etag
+
+    colors, product_data = expected_result_product_data
+    product_data = {**product_data, 'nm_id': product_id}
+    await product_service.create_product(product_data, colors, async_session)
+    response = await async_client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == status.HTTP_200_OK
+    created_etag = response.headers['etag']
+    assert created_etag != etag
+
+    # A refresh that commits late keeps both the number of products and the
+    # latest `updated_at`, the list must still get a new version.
+    updated_at = await async_session.scalar(
+        select(Product.updated_at).where(Product.nm_id == product_id)
+    )
+    refreshed = {**product_data, 'name': 'Новое название'}
+    assert await product_service.refresh_products([(colors, refreshed)], async_session)
+    await async_session.execute(
+        update(Product).where(Product.nm_id == product_id).values(updated_at=updated_at)
+    )
+    await async_session.commit()
+    response = await async_client.get(url, headers={'If-None-Match': created_etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['etag'] != created_etag
+
+    await async_client.delete(f'products/{product_id}')
+    response = await async_client.get(
+        url, headers={'If-None-Match': response.headers['etag']}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['etag'] not in (etag, created_etag)
@@ -0,0 +1,200 @@
+import asyncio
+import pytest
+
+from sqlalchemy import delete, event, insert, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.exceptions import ProductAlreadyExists
+from src.models import Product
+from src.pagination import ProductCounter
+from src.schemas import CountStrategy
+from src.service import product_row, product_service
+
+
+async def test_create_product_conflict(
+    async_session: AsyncSession, expected_result_product_data
+):
+    """
+    Test case for create_product reporting an existing product from the insert
+    itself and product_exists probing the stored product.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    product_data = {**product_data, 'nm_id': 701}
+    assert not await product_service.product_exists(701, async_session)
+
+    product = await product_service.create_product(product_data, colors, async_session)
+    assert product.nm_id == 701
+    assert [color.name for color in product.colors] == colors
+    assert await product_service.product_exists(701, async_session)
+
+    with pytest.raises(ProductAlreadyExists):
+        await product_service.create_product(product_data, colors, async_session)
+
+
+async def test_get_and_remove_product(
+    async_session: AsyncSession, expected_result_product_data
+):
+    """
+    Test case for get_product reading a product with its colors in one query,
+    serving repeated lookups from the session and remove_product reporting
+    whether a row was deleted.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    await product_service.create_product(
+        {**product_data, 'nm_id': 702}, colors, async_session
+    )
+
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = async_session.sync_session.bind
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    try:
+        product = await product_service.get_product(702, async_session)
+        assert await product_service.get_product(702, async_session) is product
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+    assert len(statements) == 1, 'Colors must be read with the product.'
+    assert {color['name'] for color in product['colors']} == set(colors)
+
+    assert await product_service.remove_product(702, async_session)
+    assert not await product_service.remove_product(702, async_session)
+    assert await product_service.get_product(703, async_session) is None
+
+
+async def test_product_counter_strategies(async_session: AsyncSession):
+    """
+    Test case for ProductCounter reusing cached counts until they expire or are
+    invalidated and falling back to exact counts without planner statistics.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    """
+    now = [0.0]
+    counter = ProductCounter(ttl=10, clock=lambda: now[0])
+    total, strategy = await counter.count(CountStrategy.EXACT, async_session)
+    assert strategy == CountStrategy.EXACT
+
+    assert await counter.count(CountStrategy.CACHED, async_session) == (
+        total,
+        CountStrategy.CACHED,
+    )
+    await async_session.execute(text('DELETE FROM product WHERE nm_id = 701'))
+    await async_session.commit()
+    assert (await counter.count(CountStrategy.CACHED, async_session))[0] == total
+    now[0] = 10
+    assert (await counter.count(CountStrategy.CACHED, async_session))[0] == total - 1
+
+    await async_session.execute(text('ANALYZE product'))
+    assert await counter.count(CountStrategy.ESTIMATE, async_session) == (
+        total - 1,
+        CountStrategy.ESTIMATE,
+    )
+
+
+async def test_concurrent_bulk_creates_do_not_deadlock(
+    async_session: AsyncSession, expected_result_product_data
+):
+    """
+    Test case for concurrent create_products_bulk calls with overlapping ids
+    in opposite orders creating every product once instead of deadlocking.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    ids = range(20000, 20500)
+    chunks = [
+        [(colors, {**product_data, 'nm_id': nm_id}) for nm_id in ids],
+        [(colors, {**product_data, 'nm_id': nm_id}) for nm_id in reversed(ids)],
+    ]
+    session_maker = async_sessionmaker(async_session.bind, expire_on_commit=False)
+
+    async def create(chunk) -> set[int]:
+        async with session_maker() as session:
+            return await product_service.create_products_bulk(chunk, session)
+
+    # A third transaction holds a product in the middle of the range, so both
+    # imports stop at it with half of their rows written and resume together.
+    blocker = session_maker()
+    await blocker.execute(
+        insert(Product).values(product_row({**product_data, 'nm_id': 20250}, colors))
+    )
+    try:
+        creates = asyncio.gather(*(create(chunk) for chunk in chunks))
+        for _ in range(100):
+            waiting = await async_session.scalar(
+                text(
+                    'SELECT count(*) FROM pg_stat_activity '
+                    "WHERE wait_event_type = 'Lock' "
+                    "AND query LIKE 'INSERT INTO product %'"
+                )
+            )
+            await async_session.commit()
+            if waiting == 2:
+                break
+            await asyncio.sleep(0.02)
+        await blocker.rollback()
+        first, second = await creates
+        assert not first & second
+        assert first | second == set(ids)
+    finally:
+        await blocker.close()
+        await async_session.execute(delete(Product).where(Product.nm_id.in_(ids)))
+        await async_session.commit()
+
+
+async def test_concurrent_writers_both_commit(
+    async_session: AsyncSession, expected_result_product_data
+):
+    """
+    Test case for a writer committing and bumping the version of the product
+    list while another writer has not committed yet, then both changes being
+    counted by the version.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    for nm_id in (20600, 20601):
+        await product_service.create_product(
+            {**product_data, 'nm_id': nm_id}, colors, async_session
+        )
+    session_maker = async_sessionmaker(async_session.bind, expire_on_commit=False)
+    committing, released = asyncio.Event(), asyncio.Event()
+
+    async with session_maker() as first, session_maker() as second:
+        commit = first.commit
+
+        async def delayed_commit() -> None:
+            committing.set()
+            await released.wait()
+            await commit()
+
+        first.commit = delayed_commit
+        removal = asyncio.create_task(product_service.remove_product(20600, first))
+        await committing.wait()
+        version = await product_service.get_products_version(async_session)
+        await async_session.commit()
+
+        assert await asyncio.wait_for(
+            product_service.remove_product(20601, second), timeout=5
+        )
+        released.set()
+        assert await removal
+
+    assert await product_service.get_products_version(async_session) == version + 2
+    assert not await product_service.product_exists(20600, async_session)
+    assert not await product_service.product_exists(20601, async_session)
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+
+from src.singleflight import SingleFlight
+
+
+async def test_single_flight_shares_result():
+    """
+    Test case for SingleFlight running one call for concurrent callers of the
+    same key.
+    """
+    flight = SingleFlight()
+    calls = []
+
+    async def func():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return object()
+
+    results = await asyncio.gather(*(flight.do('key', func) for _ in range(5)))
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+    await flight.do('key', func)
+    assert len(calls) == 2
+
+
+async def test_single_flight_shares_exception():
+    """
+    Test case for SingleFlight raising the exception of the call to every caller.
+    """
+    flight = SingleFlight()
+
+    async def func():
+        await asyncio.sleep(0.01)
+        raise ValueError()
+
+    results = await asyncio.gather(
+        *(flight.do('key', func) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+    with pytest.raises(ValueError):
+        await flight.do('key', func)
@@ -0,0 +1,116 @@
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.constants import ErrorCodes
+from src.models import Product
+from src.service import product_service
+from src.stocks import stock_service
+
+
+async def get_row_versions(nm_id: int, session: AsyncSession) -> dict[tuple, str]:
+    """Retrieves the transaction ids that wrote the stocks of a product."""
+    rows = await session.execute(
+        text(
+            'SELECT size, warehouse, xmin::text FROM product_stock '
+            'WHERE nm_id = :nm_id'
+        ),
+        {'nm_id': nm_id},
+    )
+    return {(size, warehouse): xmin for size, warehouse, xmin in rows}
+
+
+async def test_get_product_stocks(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    expected_result_product_data,
+):
+    """
+    Test case for the stocks endpoint returning the stocks of a created product
+    per size and warehouse with the precomputed warehouse totals.
+
+    Args:
+    - async_client: pytest fixture providing an HTTP client for the app
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    await product_service.create_product(
+        {**product_data, 'nm_id': 941}, colors, async_session
+    )
+
+    response = await async_client.get('products/941/stocks')
+    assert response.status_code == status.HTTP_200_OK
+    stocks = response.json()
+    assert stocks['quantity'] == product_data['quantity']
+    assert stocks['warehouses'] == [
+        {'warehouse': 507, 'qty': 762},
+        {'warehouse': 117986, 'qty': 144},
+    ]
+    assert [
+        (stock['size'], stock['warehouse'], stock['qty']) for stock in stocks['stocks']
+    ] == product_data['stocks']
+
+    response = await async_client.get('products/942/stocks')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json()['detail'] == ErrorCodes.PRODUCT_DOES_NOT_EXIST
+
+    assert await product_service.remove_product(941, async_session)
+
+
+async def test_refresh_writes_changed_stocks(
+    async_session: AsyncSession, expected_result_product_data
+):
+    """
+    Test case for refreshes writing only the changed stocks of a product,
+    keeping its warehouse totals and its quantity equal to the sum of them.
+
+    Args:
+    - async_session: pytest fixture providing a database session
+    - expected_result_product_data: pytest fixture with parsed product data
+    """
+    colors, product_data = expected_result_product_data
+    product_data = {**product_data, 'nm_id': 951}
+    await product_service.create_product(product_data, colors, async_session)
+    versions = await get_row_versions(951, async_session)
+    assert not await stock_service.replace_stocks(
+        {951: product_data['stocks']}, async_session
+    )
+
+    stocks = [
+        ('44', 507, 190),
+        ('44', 117986, 1),
+        ('46', 507, 263),
+        ('48', 507, 156),
+        ('50', 117986, 143),
+        ('54', 1733, 5),
+    ]
+    refreshed = {
+        **product_data,
+        'quantity': sum(qty for *_, qty in stocks),
+        'stocks': stocks,
+    }
+    assert await product_service.refresh_products(
+        [(colors, refreshed)], async_session
+    ) == {951}
+
+    new_versions = await get_row_versions(951, async_session)
+    assert new_versions.keys() == {(size, warehouse) for size, warehouse, _ in stocks}
+    for key in (('44', 117986), ('46', 507), ('48', 507), ('50', 117986)):
+        assert new_versions[key] == versions[key], 'Unchanged stocks were written.'
+    assert new_versions[('44', 507)] != versions[('44', 507)]
+
+    stocks = await stock_service.get_stocks(951, async_session)
+    assert stocks['warehouses'] == [
+        {'warehouse': 507, 'qty': 609},
+        {'warehouse': 1733, 'qty': 5},
+        {'warehouse': 117986, 'qty': 144},
+    ]
+    quantity = await async_session.scalar(
+        select(Product.quantity).where(Product.nm_id == 951)
+    )
+    assert quantity == stocks['quantity'] == 758
+
+    assert await product_service.remove_product(951, async_session)
+    assert await stock_service.get_stocks(951, async_session) is None
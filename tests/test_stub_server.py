@@ -0,0 +1,99 @@
+import asyncio
+import json
+import pytest
+
+import httpx
+
+from benchmarks.stub_server import StubProfile, generate_product
+
+from src.breaker import CircuitState, upstream_breaker
+from src.exceptions import ProductNotFound, SomethingWentWrong
+from src.utils import fetch_product_data, fetch_products_data
+
+
+async def test_stub_serves_multi_id_requests(stub_upstream):
+    """
+    Test case for fetch_products_data over real HTTP with one request per batch
+    and missing products reported separately.
+
+    Args:
+    - stub_upstream: pytest fixture that starts the stub of the website
+    """
+    server = stub_upstream(StubProfile(missing_every=3))
+
+    result = await fetch_products_data([1, 2, 3, 4, 6])
+
+    assert result.products == {nm_id: generate_product(nm_id) for nm_id in (1, 2, 4)}
+    assert set(result.errors) == {3, 6}
+    assert all(isinstance(error, ProductNotFound) for error in result.errors.values())
+    assert server.app.state.requests == [[1, 2, 3, 4, 6]]
+
+
+async def test_stub_serves_concurrent_requests(stub_upstream):
+    """
+    Test case for concurrent fetch_product_data calls sharing the pooled client
+    against a slow website.
+
+    Args:
+    - stub_upstream: pytest fixture that starts the stub of the website
+    """
+    server = stub_upstream(StubProfile(latency=0.05))
+
+    products = await asyncio.gather(*map(fetch_product_data, range(1, 21)))
+
+    assert [product['id'] for product in products] == list(range(1, 21))
+    assert len(server.app.state.requests) == 20
+
+
+async def test_stub_error_rate(stub_upstream):
+    """
+    Test case for fetch_product_data retrying a failing website and counting
+    the failures in the circuit breaker.
+
+    Args:
+    - stub_upstream: pytest fixture that starts the stub of the website
+    """
+    server = stub_upstream(StubProfile(error_rate=1))
+
+    with pytest.raises(SomethingWentWrong):
+        await fetch_product_data(1)
+
+    assert len(server.app.state.requests) == 3
+    assert upstream_breaker.metrics() == {
+        'state': CircuitState.CLOSED.value,
+        'failures': 3,
+    }
+
+
+async def test_stub_throttling(stub_upstream):
+    """
+    Test case for the stub answering 429 once the rate limit is exhausted.
+
+    Args:
+    - stub_upstream: pytest fixture that starts the stub of the website
+    """
+    server = stub_upstream(StubProfile(rate_limit=2))
+
+    async with httpx.AsyncClient(base_url=server.url) as client:
+        statuses = [
+            (await client.get('/cards/detail', params={'nm': 1})).status_code
+            for _ in range(3)
+        ]
+
+    assert statuses == [200, 200, 429]
+
+
+async def test_stub_replays_recorded_products(stub_upstream, tmp_path):
+    """
+    Test case for the stub serving products recorded on disk as they are.
+
+    Args:
+    - stub_upstream: pytest fixture that starts the stub of the website
+    - tmp_path: pytest fixture providing a temporary directory
+    """
+    recorded = {**generate_product(7), 'name': 'Записанный товар'}
+    (tmp_path / '7.json').write_text(json.dumps(recorded, ensure_ascii=False))
+    stub_upstream(replay_dir=tmp_path)
+
+    assert await fetch_product_data(7) == recorded
+    assert await fetch_product_data(8) == generate_product(8)
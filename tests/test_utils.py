@@ -1,17 +1,25 @@
+import asyncio
 import pytest
 
-from src.exceptions import JSONKeyNotFound, ProductNotFound, SomethingWentWrong
+import httpx
+
+from src.breaker import CircuitState, upstream_breaker
+from src.config import settings
+from src.exceptions import (
+    ProductNotFound,
+    SomethingWentWrong,
+    UpstreamUnavailable,
+)
+from src.limiter import upstream_scheduler
 from src.utils import (
-    check_fetched_product_data_keys,
     fetch_product_data,
+    fetch_products_data,
     get_product_data_from_website,
-    parse_fetched_product_colors,
-    parse_fetched_product_data,
-    parse_fetched_product_quantity,
+    get_products_data_from_website,
 )
 
 
-def test_get_product_data_from_website_no_product(fetch_empty_product_data):
+async def test_get_product_data_from_website_no_product(fetch_empty_product_data):
     """
     Test case for get_product_data_from_website when no product is found on the website.
 
@@ -19,7 +27,7 @@ def test_get_product_data_from_website_no_product(fetch_empty_product_data):
     - fetch_empty_product_data: pytest fixture that provides mocked empty product data
     """
     with pytest.raises(ProductNotFound):
-        get_product_data_from_website(12345)
+        await get_product_data_from_website(12345)
 
 
 @pytest.mark.parametrize(
@@ -36,7 +44,9 @@ def test_get_product_data_from_website_no_product(fetch_empty_product_data):
         ),
     ],
 )
-def test_get_product_data_from_website_success(product_data, expected_result, request):
+async def test_get_product_data_from_website_success(
+    product_data, expected_result, request
+):
     """
     Test case for get_product_data_from_website when the function returns expected
     results.
@@ -48,32 +58,10 @@ def test_get_product_data_from_website_success(product_data, expected_result, re
     """
     product_data = request.getfixturevalue(product_data)
     expected_result = request.getfixturevalue(expected_result)
-    assert get_product_data_from_website(product_data) == expected_result
-
-
-@pytest.mark.parametrize(
-    'product_data',
-    [
-        'fetched_product_data_with_no_sizes',
-        'fetched_product_data_with_no_colors',
-        'fetched_product_data_wrong_keys',
-    ],
-)
-def test_check_fetched_product_data_keys(product_data, request):
-    """
-    Test case for check_fetched_product_data_keys when keys are not present in a
-    response JSON.
-
-    Args:
-    - product_data: Fixture that provides mock product data for testing.
-    - request: pytest fixture used to retrieve other fixtures.
-    """
-    product_fixture = request.getfixturevalue(product_data)
-    with pytest.raises(JSONKeyNotFound):
-        check_fetched_product_data_keys(product_fixture)
+    assert await get_product_data_from_website(product_data) == expected_result
 
 
-def test_fetch_product_data_success(response_successful):
+async def test_fetch_product_data_success(response_successful):
     """
     Test case for fetch_product_data when the response is successful and all product
     data is fetched.
@@ -82,11 +70,11 @@ def test_fetch_product_data_success(response_successful):
     - response_successful: pytest fixture that provides mocked successful response
     """
     product_id = 123123123
-    fetched_product_data = fetch_product_data(product_id)
+    fetched_product_data = await fetch_product_data(product_id)
     assert fetched_product_data['id'] == product_id
 
 
-def test_fetch_product_data_failure(response_failure):
+async def test_fetch_product_data_failure(response_failure):
     """
     Test case for fetch_product_data when the response status code differs from 200.
 
@@ -94,105 +82,193 @@ def test_fetch_product_data_failure(response_failure):
     - response_failure: pytest fixture that provides mocked failure response
     """
     with pytest.raises(SomethingWentWrong):
-        fetch_product_data(12345)
+        await fetch_product_data(12345)
 
 
-def test_parse_fetched_product_data(
-    fetched_whole_product_data, expected_result_parse_fetched_product_data
-):
+async def test_fetch_product_data_throttled(mock_upstream):
+    """
+    Test case for fetch_product_data shrinking the upstream concurrency window
+    when the website throttles requests.
+
+    Args:
+    - mock_upstream: pytest fixture that mocks responses of the website
+    """
+    mock_upstream(lambda request: httpx.Response(429))
+    window = upstream_scheduler.limiter.window
+
+    with pytest.raises(SomethingWentWrong):
+        await fetch_product_data(12345)
+    assert upstream_scheduler.limiter.window < window
+
+    upstream_scheduler.limiter.window = window
+
+
+async def test_fetch_product_data_retries(mock_upstream, fetched_whole_product_data):
     """
-    Test case for parse_fetched_product_data when the function successfully parses
-    fetched product data.
+    Test case for fetch_product_data retrying requests failed with 5xx status
+    codes.
 
     Args:
+    - mock_upstream: pytest fixture that mocks responses of the website
     - fetched_whole_product_data: Fixture that provides mock fetched product
       data for testing.
-    - expected_result_parse_fetched_product_data: Fixture that provides expected
-      result for comparison.
     """
-    assert (
-        parse_fetched_product_data(fetched_whole_product_data)
-        == expected_result_parse_fetched_product_data
-    )
+    status_codes = [503, 502]
 
+    def handler(request):
+        if status_codes:
+            return httpx.Response(status_codes.pop())
+        return httpx.Response(
+            200, json={'data': {'products': [fetched_whole_product_data]}}
+        )
 
-def test_parse_fetched_product_colors_success(
-    fetched_product_colors_valid, expected_result_fetched_valid_colors
-):
+    mock_upstream(handler)
+    assert await fetch_product_data(143422485) == fetched_whole_product_data
+    assert upstream_breaker.state == CircuitState.CLOSED
+
+
+async def test_fetch_product_data_circuit_open(monkeypatch, mock_upstream):
     """
-    Test case for parse_fetched_product_colors with valid colors data of a fetched
-    product.
+    Test case for fetch_product_data failing fast once the circuit breaker opens.
 
     Args:
-    - fetched_product_colors_valid: pytest fixture that provides valid colors data.
-    - expected_result_fetched_valid_colors: pytest fixture that provides the expected
-      result for the test.
+    - mock_upstream: pytest fixture that mocks responses of the website
     """
-    assert (
-        parse_fetched_product_colors(fetched_product_colors_valid)
-        == expected_result_fetched_valid_colors
-    )
+    requested_urls = []
+
+    def handler(request):
+        requested_urls.append(request.url)
+        return httpx.Response(500)
 
+    mock_upstream(handler)
+    monkeypatch.setattr(upstream_breaker, 'failure_threshold', 3)
+
+    with pytest.raises(SomethingWentWrong):
+        await fetch_product_data(12345)
+    assert upstream_breaker.state == CircuitState.OPEN
 
-def test_parse_fetched_product_colors_failure_no_name_key(
-    fetched_product_colors_without_name_key,
+    with pytest.raises(UpstreamUnavailable):
+        await fetch_product_data(12345)
+    assert len(requested_urls) == 3
+
+
+async def test_cancelled_probe_releases_half_open_breaker(
+    monkeypatch, mock_upstream, fetched_whole_product_data
 ):
     """
-    Test case for parse_fetched_product_colors when the colors data of a fetched product
-    does not contain the 'name' key.
+    Test case for a half-open probe cancelled while waiting for the website
+    freeing its slot, so the next call can probe the website again.
+
+    Args:
+    - mock_upstream: pytest fixture that mocks responses of the website
+    - fetched_whole_product_data: Fixture that provides mock fetched product
+      data for testing.
+    """
+    requested = asyncio.Event()
+    responding = asyncio.Event()
+
+    async def handler(request):
+        requested.set()
+        await responding.wait()
+        return httpx.Response(
+            200, json={'data': {'products': [fetched_whole_product_data]}}
+        )
+
+    mock_upstream(handler)
+    monkeypatch.setattr(upstream_breaker, 'failure_threshold', 1)
+    monkeypatch.setattr(upstream_breaker, 'recovery_timeout', 0)
+    upstream_breaker.record_failure()
+    assert upstream_breaker.state == CircuitState.HALF_OPEN
+
+    probe = asyncio.create_task(fetch_product_data(143422485))
+    await requested.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert upstream_breaker.state == CircuitState.HALF_OPEN
+
+    responding.set()
+    assert await fetch_product_data(143422485) == fetched_whole_product_data
+    assert upstream_breaker.state == CircuitState.CLOSED
+
+
+async def test_fetch_product_data_connection_error(response_connection_error):
+    """
+    Test case for fetch_product_data when the website can not be reached.
 
     Args:
-    - fetched_product_colors_without_name_key: pytest fixture that provides
-    colors data without 'name' key.
+    - response_connection_error: pytest fixture that provides a mocked transport
+      raising a connection error
     """
-    with pytest.raises(JSONKeyNotFound):
-        parse_fetched_product_colors(fetched_product_colors_without_name_key)
+    with pytest.raises(SomethingWentWrong):
+        await fetch_product_data(12345)
 
 
-def test_parse_fetched_product_quantity_success(
-    fetched_product_sizes_valid, expected_result_fetched_valid_sizes
-):
+async def test_fetch_products_data_in_chunks(monkeypatch, response_batch):
     """
-    Test case for parse_fetched_product_quantity when the fetched product has
-    valid 'sizes' data.
+    Test case for fetch_products_data splitting deduplicated ids into chunks and
+    reporting ids missing from the response.
 
     Args:
-    - fetched_product_sizes_valid: pytest fixture that provides fetched product data
-      with valid 'sizes'.
-    - expected_result_fetched_valid_sizes: pytest fixture that provides the expected
-      result for the test.
-    """
-    assert (
-        parse_fetched_product_quantity(fetched_product_sizes_valid)
-        == expected_result_fetched_valid_sizes
-    )
+    - response_batch: pytest fixture that provides mocked batch responses and
+      the list of requested chunks
+    """
+    monkeypatch.setattr(settings, 'UPSTREAM_BATCH_SIZE', 2)
+    result = await fetch_products_data([1, 2, 3, 2, 404])
 
+    assert sorted(response_batch) == [[1, 2], [3, 404]]
+    assert sorted(result.products) == [1, 2, 3]
+    assert result.products[3]['id'] == 3
+    assert list(result.errors) == [404]
+    assert isinstance(result.errors[404], ProductNotFound)
 
-def test_parse_fetched_product_quantity_failure_no_stocks_key(
-    fetched_product_sizes_without_stocks_key,
-):
+
+async def test_fetch_products_data_uses_cache(response_batch):
+    """
+    Test case for fetch_products_data requesting only the products missing from
+    the upstream cache.
+
+    Args:
+    - response_batch: pytest fixture that provides mocked batch responses and
+      the list of requested chunks
     """
-    Test case for parse_fetched_product_quantity when the 'stocks' key is not present
-    in the product 'sizes'.
+    await fetch_products_data([1, 2])
+    result = await fetch_products_data([1, 2, 3])
+    fetched_product_data = await fetch_product_data(3)
+
+    assert response_batch == [[1, 2], [3]]
+    assert sorted(result.products) == [1, 2, 3]
+    assert fetched_product_data == result.products[3]
+
+
+async def test_fetch_products_data_failure(response_failure):
+    """
+    Test case for fetch_products_data reporting every id of a failed chunk.
 
     Args:
-    - fetched_product_sizes_without_stocks_key: pytest fixture that provides
-    fetched product data without 'stocks' key.
+    - response_failure: pytest fixture that provides mocked failure response
     """
-    with pytest.raises(JSONKeyNotFound):
-        parse_fetched_product_quantity(fetched_product_sizes_without_stocks_key)
+    result = await fetch_products_data([1, 2])
+    assert result.products == {}
+    assert sorted(result.errors) == [1, 2]
+    assert all(
+        isinstance(error, SomethingWentWrong) for error in result.errors.values()
+    )
 
 
-def test_parse_fetched_product_quantity_failure_no_qty_key(
-    fetched_product_sizes_without_qty_key,
+async def test_get_products_data_from_website(
+    response_batch, expected_result_product_data
 ):
     """
-    Test case for parse_fetched_product_quantity when the 'qty' key is not present
-    in the product 'sizes'.
+    Test case for get_products_data_from_website parsing every fetched product.
 
     Args:
-    - fetched_product_sizes_without_qty_key: pytest fixture that provides
-    fetched product data without 'qty' key.
+    - response_batch: pytest fixture that provides mocked batch responses
+    - expected_result_product_data: Fixture that provides expected result for
+      comparison.
     """
-    with pytest.raises(JSONKeyNotFound):
-        parse_fetched_product_quantity(fetched_product_sizes_without_qty_key)
+    colors, product_data = expected_result_product_data
+    result = await get_products_data_from_website([143422485, 404])
+
+    assert result.products == {143422485: (colors, product_data)}
+    assert isinstance(result.errors[404], ProductNotFound)